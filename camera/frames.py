@@ -0,0 +1,211 @@
+"""
+Sources of camera frames shared by every part of the program
+Input:
+- the drone's camera (Tello), a video file or generated frames
+Output:
+- numbered, timestamped frames kept in a small ring buffer
+
+A capture thread reads frames as soon as they are available, so
+nothing that needs a frame waits for the camera: it gets the latest
+frame captured (older frames are overwritten, latest frame wins)
+Frames aren't copied, every reader gets the array that was captured
+(a reader that draws on a frame should copy it first if other
+readers need the original)
+"""
+
+import threading, time
+from abc import ABC, abstractmethod
+from typing import NamedTuple
+import cv2
+import numpy as np
+
+
+
+class Frame(NamedTuple):
+	id: int #number of the frame (increases by 1 with every frame captured)
+	time: float #time.monotonic() when the frame was captured
+	img: np.ndarray #BGR image
+
+
+
+class FrameSource(ABC):
+	"""
+	Parent class of the sources: runs the capture thread and holds the
+	ring buffer, subclasses only implement read()
+	"""
+	def __init__(self, buffer=4):
+		self.buffer = [None]*buffer #ring buffer holding the last frames
+		self.count = 0 #frames captured
+		self.condition = threading.Condition() #notifies readers waiting for a new frame
+		self.running = False
+		self.thread = None
+
+
+
+	@abstractmethod
+	def read(self):
+		"""
+		Output: next image of the source, None if there isn't a new
+		one yet, False once the source has finished
+		"""
+
+
+
+	def start(self):
+		#starts the capture thread
+		if not self.running:
+			self.running = True
+			self.thread = threading.Thread(target=self.run, daemon=True)
+			self.thread.start()
+
+		return self
+
+
+
+	def stop(self):
+		self.running = False
+		if self.thread is not None and self.thread is not threading.current_thread():
+			self.thread.join()
+
+
+
+	def run(self):
+		#capture thread: every new image is stored in the ring buffer
+		while self.running:
+			img = self.read()
+
+			if img is False:
+				self.running = False
+			elif img is None:
+				time.sleep(0.002) #no new image yet
+			else:
+				with self.condition:
+					self.buffer[self.count % len(self.buffer)] = Frame(self.count, time.monotonic(), img)
+					self.count += 1
+					self.condition.notify_all()
+
+		with self.condition:
+			self.condition.notify_all()
+
+
+
+	def latest(self):
+		"""
+		Output: latest frame captured, None if there isn't one yet
+		(doesn't wait for the camera)
+		"""
+		with self.condition:
+			if self.count == 0:
+				return None
+			return self.buffer[(self.count-1) % len(self.buffer)]
+
+
+
+	def wait(self, after=-1, timeout=None):
+		"""
+		Waits for a frame newer than the frame with id after
+		Output: latest frame, None if none arrived before the timeout
+		"""
+		with self.condition:
+			self.condition.wait_for(lambda: self.count-1 > after or not self.running, timeout)
+			if self.count-1 <= after:
+				return None
+			return self.buffer[(self.count-1) % len(self.buffer)]
+
+
+
+	def frames(self):
+		#frames in the ring buffer, from oldest to newest
+		with self.condition:
+			n = min(self.count, len(self.buffer))
+			return [self.buffer[i % len(self.buffer)] for i in range(self.count-n, self.count)]
+
+
+
+class TelloSource(FrameSource):
+	"""
+	Frames of the drone's camera (the stream has to be on)
+	"""
+	def __init__(self, drone, buffer=4):
+		FrameSource.__init__(self, buffer)
+		self.drone = drone #drone object (from tello.Tello())
+		self.reader = None
+		self.previous = None #last image read
+
+
+
+	def read(self):
+		if self.reader is None:
+			self.reader = self.drone.get_frame_read()
+
+		img = self.reader.frame
+		#the reader returns the same image until a new one is decoded
+		if img is None or img is self.previous:
+			return None
+
+		self.previous = img
+
+		return img
+
+
+
+class VideoSource(FrameSource):
+	"""
+	Frames of a video file, at the video's frame rate (realtime)
+	or as fast as they can be decoded
+	"""
+	def __init__(self, path, realtime=True, loop=False, buffer=4):
+		FrameSource.__init__(self, buffer)
+		self.capture = cv2.VideoCapture(path)
+		self.realtime = realtime
+		self.loop = loop #start again at the end of the video
+		self.interval = 1 / (self.capture.get(cv2.CAP_PROP_FPS) or 30)
+		self.next = time.monotonic() #time the next frame is due
+
+
+
+	def read(self):
+		if self.realtime:
+			wait = self.next - time.monotonic()
+			if wait > 0:
+				time.sleep(wait)
+			self.next = max(self.next + self.interval, time.monotonic())
+
+		ok, img = self.capture.read()
+		if not ok and self.loop:
+			self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+			ok, img = self.capture.read()
+
+		return img if ok else False
+
+
+
+class SyntheticSource(FrameSource):
+	"""
+	Generated frames (a square moving across a gradient), used
+	to run the program without the drone
+	"""
+	def __init__(self, size=(960, 720), fps=30, buffer=4):
+		FrameSource.__init__(self, buffer)
+		self.size = size #(width, height) of the frames
+		self.interval = 1 / fps
+		self.next = time.monotonic()
+		w, h = size
+		self.background = np.dstack([np.tile(np.linspace(0, 255, w, dtype=np.uint8), (h, 1))]*3)
+
+
+
+	def read(self):
+		wait = self.next - time.monotonic()
+		if wait > 0:
+			time.sleep(wait)
+		self.next = max(self.next + self.interval, time.monotonic())
+
+		w, h = self.size
+		side = h // 6
+		x = int((self.count * 4) % (w - side))
+		y = int((h - side) / 2 * (1 + np.sin(self.count / 20)))
+		img = self.background.copy()
+		img[y:y+side, x:x+side] = (0, 0, 255)
+
+		return img
@@ -0,0 +1,205 @@
+"""
+Runs the perception of the drone off the control loop
+Input:
+- frames of a camera (see frames.FrameSource)
+- the Threat and Map objects used by the drone
+- obstacles detected by the control loop (threats and the proximity sensor)
+Output:
+- latest result of every stage, read by the control loop
+  without waiting
+
+Stages run on their own threads, connected by bounded queues:
+capture --> threat detection/tracking
+control loop --> map update (raycast, log-odds update and sync of the grid)
+Every queue only holds the latest items (older ones are dropped),
+so a slow stage works on the newest frame instead of falling behind
+The map stage holds the map's lock while updating it, so the control
+loop holds it too while it reads the grid (e.g. to plan a path)
+
+Only the threat stage's thread calls Threat.analyse (detection and
+tracking state), the control loop only reads the Analysis it
+publishes and records the video (Threat.record_video), so no part
+of the Threat object is changed by both threads
+There is no depth stage: threats.depth_map is a standalone script
+(it reads the keyboard and needs modules that aren't in the program)
+"""
+
+import queue, threading, time
+
+
+
+class Stage():
+	def __init__(self, name, work, size=1):
+		"""
+		name --> name of the stage (used to read its results)
+		work --> function run on every item, its output is passed to the
+		next stages (nothing is passed if it returns None)
+		size --> items that can wait in the stage's queue
+		"""
+		self.name = name
+		self.work = work
+		self.queue = queue.Queue(maxsize=size)
+		self.outputs = [] #stages the results are passed to
+		self.result = None #latest result of the stage
+		self.processed = 0 #items processed
+		self.dropped = 0 #items dropped because the stage was busy
+		self.busy = 0.0 #seconds spent working
+		self.thread = threading.Thread(target=self.run, daemon=True)
+
+
+
+	def put(self, item):
+		"""
+		Adds an item without waiting: if the queue is full the oldest
+		item is dropped (only this stage's thread takes items out)
+		"""
+		while True:
+			try:
+				self.queue.put_nowait(item)
+				return
+			except queue.Full:
+				try:
+					self.queue.get_nowait()
+					self.dropped += 1
+				except queue.Empty:
+					pass
+
+
+
+	def run(self):
+		while True:
+			item = self.queue.get()
+			if item is None:
+				break
+
+			t = time.perf_counter()
+			try:
+				result = self.work(item)
+			except Exception as e:
+				#a failing frame shouldn't stop the stage
+				print(f"{self.name} stage failed: {e}")
+				result = None
+			self.busy += time.perf_counter() - t
+			self.processed += 1
+
+			if result is not None:
+				self.result = result
+				for stage in self.outputs:
+					stage.put(result)
+
+		for stage in self.outputs:
+			stage.put(None)
+
+
+
+	def stats(self):
+		return {
+			"processed": self.processed,
+			"dropped": self.dropped,
+			"ms_per_item": 1000*self.busy/self.processed if self.processed else 0.0,
+		}
+
+
+
+class Pipeline():
+	def __init__(self, camera, threat, map_=None, min_distance=35, max_distance=40):
+		"""
+		camera --> frames.FrameSource the frames are read from
+		threat --> Threat object (threats/follow_threat.py) detecting and tracking threats
+		map_ --> Map object obstacles are added to (no map stage if None)
+		"""
+		self.camera = camera
+		self.threat = threat
+		self.map = map_
+		self.min_distance = min_distance #accepted distance range to the threat
+		self.max_distance = max_distance
+		self.running = False
+
+		self.stages = {"threat": Stage("threat", self.detect)}
+		if map_ is not None:
+			#obstacles arrive at the control loop's rate, a few can wait
+			self.stages["map"] = Stage("map", self.update_map, size=16)
+
+		self.feeder = threading.Thread(target=self.feed, daemon=True)
+
+
+
+	def start(self):
+		self.running = True
+		for stage in self.stages.values():
+			stage.thread.start()
+		self.feeder.start()
+
+		return self
+
+
+
+	def stop(self):
+		#the stages finish once the end (None) reaches them
+		self.running = False
+		self.feeder.join()
+		if "map" in self.stages:
+			self.stages["map"].put(None)
+
+
+
+	def feed(self):
+		#capture stage: every new frame of the camera is passed to the threat stage
+		last = -1
+		while self.running:
+			frame = self.camera.wait(last, timeout=0.1)
+			if frame is not None:
+				last = frame.id
+				self.stages["threat"].put(frame)
+
+		self.stages["threat"].put(None)
+
+
+
+	def detect(self, frame):
+		"""
+		Threat stage: detection/tracking, distance, angle and commands of the frame
+		Output: frame, its Analysis and a copy of its image with the threats
+		drawn on it (the frame itself is shared with every reader of the camera)
+		"""
+		img = frame.img.copy()
+		analysis = self.threat.analyse(img, frame.id, self.min_distance, self.max_distance)
+
+		return frame, analysis, img
+
+
+
+	def add_obs(self, distance, angle, error, sensor="proximity"):
+		"""
+		Queues an obstacle to be added to the map by the map stage
+		(called by the control loop, which doesn't wait for the update)
+		The drone's position is read now, so the obstacle is placed
+		relative to where the drone was when it was detected
+		"""
+		pose = (self.map.x, self.map.y, self.map.angle)
+		self.stages["map"].put((distance, angle, error, sensor, pose))
+
+
+
+	def update_map(self, item):
+		"""
+		Map stage: the obstacle is added to the map (see Map.add_scan)
+		Output: cells added to and removed from the obstacles
+		"""
+		distance, angle, error, sensor, pose = item
+
+		return self.map.add_scan([distance], [angle], error, sensor, pose=pose)
+
+
+
+	def latest(self, stage):
+		"""
+		Output: latest result of a stage, None if there isn't one yet
+		(never waits for the stage)
+		"""
+		return self.stages[stage].result if stage in self.stages else None
+
+
+
+	def stats(self):
+		return {name: stage.stats() for name, stage in self.stages.items()}
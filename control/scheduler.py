@@ -0,0 +1,227 @@
+"""
+Runs the tasks of the drone at fixed rates
+Input:
+- tasks (functions) and the rate (Hz) each one runs at
+Output:
+- every task is run when its deadline arrives, with the time
+  since it last ran (dt), so anything integrated over time (e.g.
+  the drone's position in the map) doesn't depend on how long
+  the rest of the loop takes
+- missed deadlines and jitter of every task
+
+Deadlines are kept on a fixed grid of a monotonic clock: a task that
+runs late doesn't shift its next deadline, and if it's late by more
+than its period the periods it missed are skipped (not run in a burst)
+"""
+
+import time
+
+
+
+class Histogram():
+	"""
+	Counts values (in seconds) in buckets of milliseconds
+	"""
+	def __init__(self, edges=(1, 2, 5, 10, 20, 50, 100)):
+		self.edges = edges #upper edges of the buckets (ms), the last bucket has no limit
+		self.counts = [0]*(len(edges) + 1)
+		self.total = 0.0
+		self.max = 0.0
+		self.n = 0
+
+
+
+	def add(self, value):
+		ms = value * 1000
+		for i, edge in enumerate(self.edges):
+			if ms < edge:
+				self.counts[i] += 1
+				break
+		else:
+			self.counts[-1] += 1
+
+		self.total += value
+		self.max = max(self.max, value)
+		self.n += 1
+
+
+
+	def buckets(self):
+		"""
+		Output: dictionary of the buckets, e.g. {"<1ms": 10, "1-2ms": 3, ..., ">=100ms": 0}
+		"""
+		names = [f"<{self.edges[0]}ms"]
+		names += [f"{a}-{b}ms" for a, b in zip(self.edges, self.edges[1:])]
+		names.append(f">={self.edges[-1]}ms")
+
+		return dict(zip(names, self.counts))
+
+
+
+	def stats(self):
+		return {
+			"mean_ms": 1000*self.total/self.n if self.n else 0.0,
+			"max_ms": 1000*self.max,
+			"buckets": self.buckets(),
+		}
+
+
+
+class Task():
+	def __init__(self, name, work, rate):
+		"""
+		name --> name of the task
+		work --> function run with the seconds since the task last ran (dt)
+		rate --> times per second the task runs
+		"""
+		self.name = name
+		self.work = work
+		self.period = 1/rate
+		self.next = None #deadline of the next run (the first run is due whenever the task is first checked)
+		self.last = None #time the task last ran
+		self.runs = 0 #times the task has run
+		self.missed = 0 #deadlines skipped because the task was late by more than its period
+		self.late = Histogram() #how late every run started (jitter)
+		self.duration = Histogram() #how long every run took
+		self.overruns = 0 #runs that took longer than the period
+
+
+
+	@property
+	def rate(self):
+		return 1/self.period
+
+
+
+	def due(self, now):
+		return self.next is None or now >= self.next
+
+
+
+	def run(self, now, clock):
+		if self.next is None:
+			self.next = now
+		lateness = now - self.next
+		self.late.add(lateness)
+
+		#the next deadline stays on the grid, skipping the ones already missed
+		skipped = int(lateness // self.period)
+		self.missed += skipped
+		self.next += (skipped + 1) * self.period
+
+		dt = self.period if self.last is None else now - self.last
+		self.last = now
+
+		self.work(dt)
+
+		duration = clock() - now
+		self.duration.add(duration)
+		if duration > self.period:
+			self.overruns += 1
+		self.runs += 1
+
+
+
+	def stats(self):
+		return {
+			"rate": self.rate,
+			"runs": self.runs,
+			"missed": self.missed,
+			"overruns": self.overruns,
+			"jitter": self.late.stats(),
+			"duration": self.duration.stats(),
+		}
+
+
+
+class Scheduler():
+	def __init__(self, clock=time.monotonic):
+		self.clock = clock #monotonic clock the deadlines are measured with
+		self.tasks = {} #tasks by name, run in the order they were added
+		self.now = clock() #time the current (or last) call to run_pending started
+
+
+
+	def add(self, name, work, rate):
+		"""
+		Adds a task (replacing any task with the same name), its
+		first run is due the first time the tasks are run
+		Output: the task
+		"""
+		if rate <= 0:
+			raise ValueError(f"Rate of {name} must be positive, not {rate}")
+
+		self.tasks[name] = Task(name, work, rate)
+
+		return self.tasks[name]
+
+
+
+	def remove(self, name):
+		self.tasks.pop(name, None)
+
+
+
+	def set_rate(self, name, rate):
+		#the new period is used from the next deadline on
+		if rate <= 0:
+			raise ValueError(f"Rate of {name} must be positive, not {rate}")
+		self.tasks[name].period = 1/rate
+
+
+
+	def run_pending(self):
+		"""
+		Runs every task whose deadline has arrived (never waits)
+		Output: number of tasks run
+		"""
+		self.now = self.clock()
+		n = 0
+
+		for task in list(self.tasks.values()):
+			now = self.clock()
+			if task.due(now):
+				task.run(now, self.clock)
+				n += 1
+
+		return n
+
+
+
+	def until_next(self):
+		#seconds until the next deadline (0 if a task is due)
+		if not self.tasks:
+			return None
+
+		if any(task.next is None for task in self.tasks.values()):
+			return 0
+
+		return max(min(task.next for task in self.tasks.values()) - self.clock(), 0)
+
+
+
+	def run(self, duration=None):
+		"""
+		Runs the tasks, sleeping between deadlines
+		duration --> seconds to run for (forever if None)
+		"""
+		end = None if duration is None else self.clock() + duration
+
+		while end is None or self.clock() < end:
+			self.run_pending()
+
+			wait = self.until_next()
+			if wait is None:
+				break
+			if end is not None:
+				wait = min(wait, max(end - self.clock(), 0))
+			time.sleep(wait)
+
+
+
+	def stats(self):
+		"""
+		Output: dictionary with the rate, missed deadlines and
+		jitter/duration histograms of every task
+		"""
+		return {name: task.stats() for name, task in self.tasks.items()}
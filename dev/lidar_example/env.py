@@ -1,9 +1,52 @@
 import pygame, sys, math
+import numpy as np
+
+
+class PointCloud():
+	"""
+	Stores every point seen only once: the map is split into voxels
+	(squares of voxel pixels) and a point is only added if its voxel
+	is empty, so checking for duplicates doesn't depend on the size
+	of the cloud
+	"""
+	def __init__(self, map_dimensions, voxel=1):
+		self.voxel = voxel
+		w, h = map_dimensions
+		self.voxels = np.zeros((math.ceil(h/voxel), math.ceil(w/voxel)), bool) #indexed [y][x]
+		self.points = np.zeros((0, 2), int) #(x, y) of every point, in the order they were added
+
+	def add(self, points):
+		"""
+		Input: (x, y) points
+		Output: points that weren't in the cloud
+		"""
+		points = np.asarray(points, dtype=int).reshape(-1, 2)
+		v = points // self.voxel
+		inside = (v[:, 0] >= 0) & (v[:, 0] < self.voxels.shape[1]) & (v[:, 1] >= 0) & (v[:, 1] < self.voxels.shape[0])
+		points, v = points[inside], v[inside]
+
+		#only the first point of every empty voxel is kept
+		_, first = np.unique(v, axis=0, return_index=True)
+		first = np.sort(first)
+		new = first[~self.voxels[v[first, 1], v[first, 0]]]
+
+		self.voxels[v[new, 1], v[new, 0]] = True
+		self.points = np.concatenate((self.points, points[new]))
+
+		return points[new]
+
+	def __len__(self):
+		return len(self.points)
+
+	def __iter__(self):
+		for x, y in self.points:
+			yield (int(x), int(y))
+
 
 class Environment():
 	def __init__(self, map_dimensions):
 		pygame.init()
-		self.point_cloud = []
+		self.point_cloud = PointCloud(map_dimensions)
 		self.map_img = pygame.image.load("maps/map_1.png")
 		self.mapw, self.maph = map_dimensions
 		self.map_window_name = "MAP"
@@ -12,20 +55,26 @@ class Environment():
 		self.map.blit(self.map_img, (0, 0))
 
 	def ad2pos(self, distance, angle, robot_pos):
-		x = distance * math.cos(angle) + robot_pos[0]
-		y = -distance * math.sin(angle) + robot_pos[1]
+		#works with single values or arrays of distances and angles
+		x = distance * np.cos(angle) + robot_pos[0]
+		y = -distance * np.sin(angle) + robot_pos[1]
 
-		return int(x), int(y)
+		return np.asarray(x).astype(int), np.asarray(y).astype(int)
 
 	def data_storage(self, data):
 		print(len(self.point_cloud))
 
-		for element in data:
-			point = self.ad2pos(element[0], element[1], element[2])
-			if point not in self.point_cloud:
-				self.point_cloud.append(point)
+		if not data:
+			return
+
+		distance, angle = np.array([element[:2] for element in data], dtype=float).T
+		robot_pos = np.array([element[2] for element in data], dtype=float).T
+		self.point_cloud.add(np.column_stack(self.ad2pos(distance, angle, robot_pos)))
 
 	def show_sensor_data(self):
 		self.infomap = self.map.copy()
-		for point in self.point_cloud:
-			self.infomap.set_at((int(point[0]), int(point[1])) , (255, 0, 0))
+		#every point is coloured at once through the pixels of the surface
+		pixels = pygame.surfarray.pixels3d(self.infomap)
+		points = self.point_cloud.points
+		pixels[points[:, 0], points[:, 1]] = (255, 0, 0)
+		del pixels
@@ -1,24 +1,33 @@
-import pygame, sys, math
+import pygame, sys, os, math
 import numpy as np
 
+#the raycasting engine is shared with the map module in the repository's root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from map import raycast
+
 
 def uncertainty_add(distance, angle, sigma):
-	mean = np.array([distance, angle])
-	covariance = np.diag(sigma**2)
-	distance, angle = np.random.multivariate_normal(mean, covariance)
-	distance = max(distance, 0)
-	angle = max(angle, 0)
-	return [distance, angle]
+	"""
+	Adds gaussian noise to the distances and angles of every beam at once
+	(sigma holds the standard deviation of the distance and of the angle)
+	"""
+	distance = np.maximum(np.random.normal(distance, sigma[0]), 0)
+	angle = np.maximum(np.random.normal(angle, sigma[1]), 0)
+	return distance, angle
 
 
 class Sensor():
-	def __init__(self, range_, map_, uncertainty):
+	def __init__(self, range_, map_, uncertainty, beams=60, dropout=0.0):
 		self.range = range_
+		self.beams = beams #number of beams cast around the sensor
+		self.dropout = dropout #probability of a beam not returning (e.g. dark surfaces)
 		self.speed = 4
 		self.sigma = np.array([uncertainty[0], uncertainty[1]])
 		self.pos = (0, 0)
 		self.map = map_
 		self.w, self.h = pygame.display.get_surface().get_size()
+		#black pixels of the map are obstacles (indexed [y][x], read only once)
+		self.occupied = np.all(pygame.surfarray.array3d(map_) == 0, axis=2).T
 		self.obstacles = []
 
 
@@ -26,26 +35,17 @@ class Sensor():
 		return math.sqrt(((obs_pos[0] - self.pos[0])**2) +  ((obs_pos[1] - self.pos[1])**2))
 
 	def sense_obstacles(self):
-		data = []
 		x1, y1 = self.pos[0], self.pos[1]
 
-		for angle in np.linspace(0, 2*math.pi, 60, False):
-			x2, y2 = (x1 + self.range*math.cos(angle), y1 - self.range*math.sin(angle))
-			for i in range(0, 100):
-				u = i / 100
-				x = int(x2*u + x1*(1 - u))
-				y = int(y2*u + y1*(1 - u))
-
-				if 0 < x < self.w and 0 < y < self.h:
-					colour = self.map.get_at((x, y))
-					if (colour[0], colour[1], colour[2]) == (0, 0, 0):
-						distance = self.distance((x, y))
-						output = uncertainty_add(distance, angle, self.sigma)
-						output.append(self.pos)
-						data.append(output)
-						break
-
-		if len(data) >= 0:
-			return data
-		else:
-			return False 
\ No newline at end of file
+		#every beam is cast at once through the map
+		angles = np.linspace(0, 2*math.pi, self.beams, False)
+		ends = np.column_stack((x1 + self.range*np.cos(angles), y1 - self.range*np.sin(angles)))
+		cells, hits = raycast.first_hit(self.occupied, (x1, y1), ends)
+
+		if self.dropout > 0:
+			hits &= np.random.random(self.beams) >= self.dropout
+
+		distances = np.hypot(cells[hits, 0] - x1, cells[hits, 1] - y1)
+		distances, angles = uncertainty_add(distances, angles[hits], self.sigma)
+
+		return [[d, a, self.pos] for d, a in zip(distances, angles)]
@@ -8,10 +8,17 @@ import serial
 from djitellopy import tello
 from map import map_
 from path import main as path
+from path import planners
 from obstacles import proximity_sensor as proximity
 from threats import follow_threat as threat
 from manual_control import key_press_module as kp
 from manual_control import manual_control as mc
+from camera import frames
+from camera import pipeline
+from control import scheduler
+
+
+LARGE = 160000 #cells in the map above which A* is used (faster than Theta* on path.benchmark's 400x400 maps)
  
 
 
@@ -24,22 +31,41 @@ class Drone:
 		self.dims = [self.area[0]//10, self.area[1]//10] #dimensions of the map
 		self.start = (5, 5) #start position of path
 		self.end = (150, 200) #end position of path
+		#path planning algorithm used (one of path.planners.PLANNERS)
+		#(on large areas, pruned A* paths are almost as short as Theta*'s and found several times faster)
+		self.planner = "astar" if self.dims[0]*self.dims[1] > LARGE else "theta_star"
+		self.replanner = None #incremental planner kept between replans (if self.planner is one)
 
 		#create object of Map class (polymorphism)
 		self.map = map_.Map(self.dims, self.screen, self.area)
+		#frames of the drone's camera, captured by their own thread once the stream is on
+		self.camera = frames.TelloSource(self.drone)
+		self.frame = None #frame used in the current iteration of the main loop
+		#threat detection and map updates run on their own threads once
+		#the camera starts (set to False to run them in the main loop)
+		self.concurrent = True
+		self.pipeline = None
+		self.threat_frame = -1 #id of the last frame handle_threat used
+		#seconds without a new analysis from the pipeline before the threat is treated as lost
+		self.threat_timeout = 0.5
 		#create manual control object and set the keyboards to control drone
-		self.mc = mc.ManualControl([["d", "a"], ["w", "s"], ["UP", "DOWN"], ["RIGHT", "LEFT"]], 50, self.drone)
+		self.mc = mc.ManualControl([["d", "a"], ["w", "s"], ["UP", "DOWN"], ["RIGHT", "LEFT"]], 50, self.drone, self.camera)
 		#create object of Threat class
-		self.threat = threat.Threat()
+		#(full detection every 5 frames, the threat is tracked in between)
+		self.threat = threat.Threat(detect_every=5)
 		#use pyserial to connect to microcontroller
 		#self.sr = serial.Serial("/dev/ttyACM0", 9600)
 
-		np.savetxt("map/map.txt", self.map.map, delimiter = ",", fmt = "%i") #clear all obstacles
-		path.main(self.start, self.end, self.dims, self.screen) #create initial path
+		self.map.grid.clear() #clear all obstacles
+		path.main(self.start, self.end, self.dims, self.screen, self.map.grid, display=False, planner=self.planner) #create initial path
 
 		self.connected = False #connected to drone
 		self.takeoff = False #drone has taken off
+		self.takeoff_time = None #time (monotonic) the drone took off
+		self.stabilize = 5 #seconds the drone is left to stabilize after taking off
 		self.key_control = False #drone is being controlled with keys
+		self.frame_id = -1 #id of the frame in self.frame
+		self.skipped = 0 #seconds of control ticks skipped while waiting for a new frame
 
 		self.speed = 100 #speed of drone
 		self.angle = 0 #angle it is following
@@ -54,6 +80,14 @@ class Drone:
 		#up/down speed
 		self.ud_speed = 0
 
+		#the control loop (commands and dead reckoning) runs at a fixed rate,
+		#other tasks at their own rates (see control.scheduler)
+		self.control_rate = 20 #Hz
+		self.decay_rate = 2 #Hz
+		self.scheduler = scheduler.Scheduler()
+		self.scheduler.add("control", self.control, self.control_rate)
+		self.scheduler.add("decay", self.decay, self.decay_rate)
+
 		#time it will take to travel from one node to the next one
 		self.time = 0
 		#time when drone is at a new node
@@ -93,6 +127,9 @@ class Drone:
 
 			#activate stream to be able to retrieve camera feed
 			self.drone.streamon()
+			self.camera.start()
+			if self.concurrent:
+				self.pipeline = pipeline.Pipeline(self.camera, self.threat, self.map).start()
 
 			#time.sleep(0.5)
 			self.connected = True #set connected status to True
@@ -103,12 +140,33 @@ class Drone:
 
 
 
+	def grab_frame(self):
+		"""
+		Takes the latest frame captured by the camera's thread for this
+		iteration of the main loop, so every part of the program reads
+		the same frame (never waits for the camera)
+		Output: True if there is a new frame since the last call
+		"""
+		frame = self.camera.latest()
+		if frame is None or frame.id == self.frame_id:
+			return False
+
+		self.frame = frame
+		self.frame_id = frame.id
+
+		return True
+
+
+
 	def get_frame(self):
 		"""
-		Gets the drone's camera feed using
-		Tello class method from api
+		Gets the drone's camera feed (the frame
+		of the current iteration of the main loop)
 		"""
-		return self.drone.get_frame_read().frame
+		if self.frame is None:
+			self.grab_frame()
+
+		return self.frame.img if self.frame is not None else None
 
 
 
@@ -120,14 +178,20 @@ class Drone:
 		if not self.takeoff:
 			self.drone.takeoff()
 			self.takeoff = True
-
-			#delay to stabilize drone
-			time.sleep(5)
+			#the drone is left to stabilize (see stable), the
+			#main loop keeps running instead of waiting
+			self.takeoff_time = self.scheduler.clock()
 
 		return self.takeoff
 
 
 
+	def stable(self):
+		#whether the drone has taken off and had time to stabilize
+		return self.takeoff and self.scheduler.clock() - self.takeoff_time >= self.stabilize
+
+
+
 	def land(self):
 		"""
 		Makes drone land safely using
@@ -136,14 +200,20 @@ class Drone:
 		if self.takeoff:
 			self.drone.land()
 			self.takeoff = False
+			#the map is kept so paths can be planned on it later (see path.main)
+			self.map.grid.snapshot()
+			#the video being recorded is finished and written before the program exits
+			self.threat.recorder.close()
 
 
 	
-	def manual_control(self):
+	def manual_control(self, dt=None):
 		"""
 		Allows user to control the drone with
 		their keyboard using "WASD" and the
 		arrows
+		dt is the time since the last call (seconds), used
+		to map the drone's position
 		"""
 		#If user has pressed the manual control button
 		#on the user interface
@@ -152,8 +222,9 @@ class Drone:
 			#a separate screen
 			fvel = 12 #forward velocity
 			avel = 360/10 #angular velocity
+			#time step used to map the drone if dt isn't given
+			#(see ManualControl.update_pos)
 			interval = 0.2
-			#'interval' accounts for the slower speed in real life
 
 			#initalise the key press module to be able to identify key presses
 			kp.init(self.ui_screen)
@@ -169,7 +240,7 @@ class Drone:
 			self.yaw = dirs[3]
 
 			#update the drone's position in the screen by using the mapping constants
-			self.mc.update_pos(self.mc.vel_converter(self.mc.velocity), fvel, avel, interval)
+			self.mc.update_pos(self.mc.vel_converter(self.mc.velocity), fvel, avel, interval, dt)
 			#draw the calculated position
 			self.mc.draw_points()
 
@@ -212,15 +283,36 @@ class Drone:
 		A new path is found from the drone's current position to
 		the current end position by running the path planning
 		algorithm and getting the bézier curve of the path
+		Output: False if no path was found (the current path is kept)
 		"""
+		start = (round(self.map.x), round(self.map.y))
+		planner = self.planner
+
+		if self.planner in planners.INCREMENTAL:
+			#the same planner is kept while the end doesn't change, so
+			#only the part of the path affected by new obstacles is repaired
+			if self.replanner is None or self.replanner.end != self.end:
+				self.replanner = planners.PLANNERS[self.planner](start, self.end, self.screen, self.dims, self.map.grid)
+			with self.map.lock:
+				self.replanner.update_obs(self.map.obs)
+			planner = self.replanner
+
 		#get new path (taking into account any obstacles)
-		path.main((round(self.map.x), round(self.map.y)), self.end, self.dims, self.screen)
+		#planning is done headless so it can run on the companion computer
+		#(the lock keeps the pipeline's map stage from changing the map while it's read)
+		with self.map.lock:
+			found = path.main(start, self.end, self.dims, self.screen, self.map.grid, display=False, planner=planner)
+		if found is None:
+			return False
+
 		#update path
 		self.map.update_path()
 		self.map.curve = []
 		#get bézier curve of path
 		self.map.get_bezier_curve(degree=3)
 
+		return True
+
 
 
 
@@ -236,15 +328,32 @@ class Drone:
 		While following, the drone's position is also updated
 		in the map
 		"""
-		#get the frame captured by the drone
-		img = self.get_frame()
+		if self.pipeline is not None:
+			#the threat is detected by the pipeline's thread, the latest
+			#result is used (nothing changes until there is a new one)
+			result = self.pipeline.latest("threat")
+			if result is not None and result[0].id != self.threat_frame:
+				frame, analysis, img = result
+				self.threat_frame = frame.id
+			elif result is None or self.scheduler.clock() - result[0].time < self.threat_timeout:
+				return self.is_threat
+			else:
+				#no new frame has been analysed for a while (e.g. the
+				#stream stopped), so the threat is treated as lost
+				analysis = img = None
+		else:
+			#get the frame captured by the drone
+			img = self.get_frame()
+
+			#detect the threat and get the distance and angle to it, and the
+			#velocity commands to follow it (done only once for this frame)
+			analysis = self.threat.analyse(img, self.frame_id, 35, 40)
 
-		#get the distance and angle to threat
-		#get the forwards/backward velocity command to follow the drone
-		distance, angle, self.fspeed = self.threat.follow(img, 35, 40)
+		if analysis is not None:
+			distance, angle, self.fspeed = analysis.distance, analysis.angle, analysis.vz
 
-		#if there is a threat, record the video
-		self.threat.record_video(self.is_threat, img)
+			#if there is a threat, record the video
+			self.threat.record_video(self.is_threat, img)
 
 		#the threat timer is the time after a threat has stopped being detected
 		#used to avoid saving multiple videos and following the path too early and miss the threat
@@ -253,21 +362,23 @@ class Drone:
 			#path has to be done again, since position has changed
 			self.redo_path()
 			#store the video that has been recorded
-			self.threat.store_video((img.shape[1], img.shape[0]))
+			self.threat.store_video()
 			self.is_threat = False
+			#the threat has been dealt with, so this is only done once
+			self.threat_timer = 0
 
 
-		if self.is_threat:
+		if self.is_threat and img is not None:
 			#the camera's feed is shown with text indicating the user that a threat is being detected
 			image = cv2.putText(img, "Threat detected!", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 0), 2, cv2.LINE_AA)
 			#cv2.imshow("threat", image)
 
 
-		if self.threat.is_threat: #checks if a threat is detected
+		if analysis is not None and analysis.distance is not None: #checks if a threat is detected
 			self.is_threat = True
 
 			#get velocity commands for the yaw (angle) and the up/down speed
-			self.yaw, self.ud_speed = self.threat.vector(img)
+			self.yaw, self.ud_speed = analysis.yaw, analysis.ud
 			#update the angle of the drone in the map
 			self.map.angle += angle
 
@@ -292,9 +403,19 @@ class Drone:
 
 
 
+	def map_obs(self, distance, angle, error, sensor="proximity"):
+		#obstacles are added to the map by the pipeline's map stage
+		#if it's running, so the control loop doesn't wait for the update
+		if self.pipeline is not None and "map" in self.pipeline.stages:
+			self.pipeline.add_obs(distance, angle, error, sensor)
+		else:
+			self.map.add_obs(distance, angle, error, sensor)
+
+
+
 	def map_threat(self, distance, angle):
 		#map the threat at the distance and angle to the threat
-		self.map.add_obs(distance, angle, error=4)
+		self.map_obs(distance, angle, error=4, sensor="threat")
 
 
 
@@ -317,18 +438,6 @@ class Drone:
 
 
 
-	def map_obs(self):
-		img = self.get_frame()
-		dist, ang = depth_map.main(img)
-
-
-		if (dist, ang) != (None, None):
-			print("Add obstacle.")	
-			self.map.add_obs(dist, ang, error=2)
-
-
-
-
 	def proximity_obstacle(self, error):
 		"""
 		Gets the sensor values from the proximity sensor
@@ -361,7 +470,7 @@ class Drone:
 			#obs.add_obs(error)
 
 			#obstacle is mapped
-			self.map.add_obs(distance, 0, error)
+			self.map_obs(distance, 0, error)
 			#collision with obstacle is avoided
 			self.avoid_obs(distance=2)
 
@@ -398,11 +507,12 @@ class Drone:
 
 
 	
-	def drone_dir(self):
+	def drone_dir(self, dt):
 		"""
 		Gets the position in the area of the node and the next node
 		Synchronises drone movement in real life and movement in the
 		map to find the position of the drone in the map
+		dt is the time since the last control tick (seconds)
 		"""
 		try:
 			if not self.at_node:
@@ -410,7 +520,7 @@ class Drone:
 				#the position is of the drone in the
 				#map is updated according to the velocity
 				#commands (self.fspeed)
-				self.map.map_drone(self.map.curve[0], self.map.curve[1], self.at_node, self.time, self.fspeed)
+				self.map.map_drone(self.map.curve[0], self.map.curve[1], self.at_node, self.time, self.fspeed, dt)
 				self.map.draw_map(self.map.pos, (255, 0, 0))
 
 			else:
@@ -418,8 +528,8 @@ class Drone:
 				if self.at_node:
 					#if drone is at a node, then that node
 					#is visited, so it is dequeued from
-					#the self.map.curve queue
-					self.map.curve.pop(0) 
+					#the self.map.curve queue (array view, nothing is copied)
+					self.map.curve = self.map.curve[1:]
 
 			#the position of the last visited node and the node
 			#it is currently going to is turned into a position
@@ -451,7 +561,7 @@ class Drone:
 		#shows the drone's video stream in real time
 		image = self.get_frame()
 		#resize image
-		image = cv2.resize(img, (360, 240))
+		image = cv2.resize(image, (360, 240))
 		#show image
 		cv2.imshow("feed", image)
 		
@@ -469,12 +579,16 @@ class Drone:
 		if self.at_node:
 			#if drone is at node, rotate drone so it points towards the next node
 			#angle-self.angle is the angle difference between nodes (degree of rotation)
-			if (angle - self.angle) < 0:
+			turn = int(math.degrees(angle - self.angle))
+			if turn == 0:
+				#turns of less than a degree are skipped (the drone rejects them)
+				pass
+			elif turn < 0:
 				#if degree of rotation is negative rotate counter clockwise
-				self.drone.rotate_counter_clockwise(int(abs(math.degrees(angle - self.angle))))
+				self.drone.rotate_counter_clockwise(abs(turn))
 			else:
 				#if degree of rotation is positive rotate clockwise
-				self.drone.rotate_clockwise(int(math.degrees(angle - self.angle)))
+				self.drone.rotate_clockwise(turn)
 
 			#wait to let rotation fully finish (so velocity
 			#commands/processes don't interfere with each other)
@@ -484,14 +598,14 @@ class Drone:
 			self.angle = angle
 			#calculate time by using speed = distance / time
 			self.time = distance/self.speed
-			#start the timer
-			self.start = time.time()
+			#start the timer (time of the current control tick)
+			self.start = self.scheduler.now
 			#set self.at_node to False so that drone starts moving towards next node
 			self.at_node = False
 
 		else:
 			#set second time to calculate the time passed since leaving the node
-			self.curr = time.time()
+			self.curr = self.scheduler.now
 
 			#if time passed since leaving the node is less than the calculated time,
 			#then velocity commands are sent to the drone to go forward at self.speed
@@ -507,6 +621,47 @@ class Drone:
 
 
 
+	def control(self, dt):
+		"""
+		Control tick, run at self.control_rate by the scheduler
+		dt is the time since the last tick (seconds)
+		"""
+		#every part of the program reads the same (latest) frame in this tick,
+		#the tick is skipped if the camera hasn't sent a new one (its time
+		#is added to the next tick, so dead reckoning doesn't lose it)
+		if not self.grab_frame():
+			self.skipped += dt
+			return
+		dt, self.skipped = dt + self.skipped, 0
+
+		if self.key_control:
+			self.manual_control(dt)
+
+		else:
+			#handle threats
+			self.handle_threat()
+
+			#follows the path
+			if not self.is_threat and not self.new_obs:
+				n0, n1 = self.drone_dir(dt)
+				self.follow_path(n0, n1)
+
+			#maps and avoids obstacles
+			self.proximity_obstacle(error=2)
+
+		#moves drone
+		self.move()
+
+
+
+	def decay(self, dt):
+		#obstacles that haven't been seen for a while fade out of the map
+		if not self.key_control:
+			self.map.decay()
+
+
+
+
 	def move(self):
 		#moves the drone at the specified velocity commands
 		#uses tellopy's API to do so
@@ -534,25 +689,10 @@ def main(drone):
 		#drone takes off
 		drone.take_off()
 
-		if drone.takeoff:
-			if drone.key_control:
-				drone.manual_control()
-
-			else:
-				#handle threats
-				drone.handle_threat()
-
-				#follows the path
-				if not drone.is_threat and not drone.new_obs:
-					n0, n1 = drone.drone_dir()
-					drone.follow_path(n0, n1)
-
-
-				#maps and avoids obstacles
-				drone.proximity_obstacle(error=2)
-
-			#moves drone
-			drone.move()
+		if drone.stable():
+			#runs the tasks that are due (control tick, map decay...),
+			#without waiting for the next one
+			drone.scheduler.run_pending()
 
 
 if __name__ == "__main__":
@@ -33,10 +33,11 @@ import numpy as np
 
 
 class ManualControl():
-    def __init__(self, controls, vel, drone):
+    def __init__(self, controls, vel, drone, camera=None):
         self.controls = controls #keys to be used to control the drone
         self.vel = vel #velocity at which drone moves (in all directions)
         self.drone = drone #drone object (from tello.Tello())
+        self.camera = camera #source of the drone's frames (camera.frames.FrameSource), if there is one
         self.key_presses = [] #holds keys being pressed (only ones that matter)
         self.velocity = [0]*4 #holds velocity commands for drone: [0, 0, 0, 0]
         self.pos = [400]*2 #drone's position (initial pos is at centre of screen)
@@ -114,8 +115,14 @@ class ManualControl():
         The picture is stored in the 'images' folder
         """
 
-        #get frame captured by drone
-        img = self.drone.get_frame_read().frame
+        #get frame captured by drone (the latest one, without waiting for the camera)
+        if self.camera is not None:
+            frame = self.camera.latest()
+            if frame is None:
+                return
+            img = frame.img
+        else:
+            img = self.drone.get_frame_read().frame
         img = cv2.resize(img, (360, 240))
 
         #if 'p' is pressed, store image
@@ -129,21 +136,28 @@ class ManualControl():
 
 
 
-    def update_pos(self, dir, fvel, avel, interval):
+    def update_pos(self, dir, fvel, avel, interval, dt=None):
         """"
         Updates drone's position in the screen
         Takes directions (dir --> 2d array w/ booleans, form:
         [[right, left], [forward, backward], [up, down], [turn right, turn left]])
         fvel: forward/backward velocity
         avel: angular velocity
-        interval: rate at which position changes
+        interval: time step (seconds) used only when dt isn't given,
+        e.g. by the standalone loop at the bottom of this file
+        dt: time since the last update (measured by the caller's scheduler)
         """
+        #the caller runs this at a fixed rate, so it doesn't wait here
+        if dt is None:
+            dt = interval
+
         #initialize variables and set intervals for accurate mapping
+        #(the position changes by the distance covered in dt)
         lr, fb, ud, yv = 0, 0, 0, 0
         d = 0
         yaw = 0
-        d_interval = fvel * interval
-        a_interval = avel * interval
+        d_interval = fvel * dt
+        a_interval = avel * dt
 
         #updates d and self.a values as the directions given to the drone change
         #self.a and d used to map the drone
@@ -172,17 +186,15 @@ class ManualControl():
 
         #update the x and y position of the drone in the screen by using trigonometry
         self.a += self.yaw
-        self.x += int(d*math.cos(math.radians(self.a)))
-        self.y += int(d*math.sin(math.radians(self.a)))
+        #(kept as floats, since a short dt moves the drone less than a pixel)
+        self.x += d*math.cos(math.radians(self.a))
+        self.y += d*math.sin(math.radians(self.a))
 
         #append points that the drone is covering to self.points
         #used to draw the path followed by user on the screen
-        if self.points[-1][0] != self.x or self.points[-1][1] != self.y:
-            self.points.append((self.x, self.y))
-
-        #sleep for self.interval
-        #used for accurate mapping
-        time.sleep(self.interval) 
+        point = (round(self.x), round(self.y))
+        if self.points[-1] != point:
+            self.points.append(point)
 
         return self.x, self.y
 
@@ -200,10 +212,10 @@ class ManualControl():
         for point in self.points:
             cv2.circle(screen, point, 5, (0, 0, 255), cv2.FILLED)
         #draw the point (with a different colour) of the drone's current position
-        cv2.circle(screen, (self.x, self.y), 8, (217, 82, 24), cv2.FILLED)
+        cv2.circle(screen, self.points[-1], 8, (217, 82, 24), cv2.FILLED)
         #show the distance travelled relative to the start
         cv2.putText(screen, f"({(self.points[-1][0] - self.screen[0]//2)/100}, {(self.points[-1][1] - self.screen[1]//2)/100})m",
-                    (self.x + 10, self.y + 30), cv2.FONT_HERSHEY_PLAIN, 1, (255, 0, 255), 1)
+                    (self.points[-1][0] + 10, self.points[-1][1] + 30), cv2.FONT_HERSHEY_PLAIN, 1, (255, 0, 255), 1)
         #show screen
         cv2.imshow("Ouput", screen)
         cv2.waitKey(1)
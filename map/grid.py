@@ -0,0 +1,304 @@
+"""
+In-memory occupancy grid shared between the map and
+path planning modules
+Input:
+- obstacles and drone positions marked by the map module
+Output:
+- grid read directly by the path planning module (no text files)
+- optional binary snapshot of the grid for persistence
+"""
+
+import numpy as np
+import functools
+import collections
+
+
+#snapshot of the last map, written when the drone lands
+SNAPSHOT = "map/snapshot.npy"
+#map bundled with the repository, used until a snapshot has been written
+LEGACY = "map/map.txt"
+
+#values stored in each cell of the grid
+FREE = 0
+DRONE = 1
+OBSTACLE = 2
+
+#probability that a cell is occupied when each sensor detects an obstacle in it
+#(the sensors' reliability, used to update the log-odds of the cell)
+#with LogOddsGrid's threshold of 0.8, a cell is marked after 1 proximity hit,
+#2 depth hits or 4 threat hits, and with a half life of 60 s a wall seen only
+#once drops below the threshold again after about 40 s (90 s once saturated)
+SENSORS = {
+	"proximity": 0.9,
+	"depth": 0.7,
+	"threat": 0.6,
+}
+
+
+
+def logit(p):
+	#turns a probability into log-odds
+	return float(np.log(p / (1 - p)))
+
+
+
+@functools.lru_cache(maxsize=None)
+def diamond(radius):
+	"""
+	Input: radius (Manhattan distance)
+	Output: (2*radius+1, 2*radius+1) boolean mask, True at every cell
+	within that distance of the centre (cached, so it is only built once)
+	"""
+	i = np.abs(np.arange(-radius, radius+1))
+	mask = (i[:, None] + i[None, :]) <= radius
+	mask.setflags(write=False)
+
+	return mask
+
+
+
+class OccupancyGrid():
+	def __init__(self, dims, data=None):
+		self.dims = dims #dimensions of the grid (same as the map's dimensions)
+
+		#the grid is stored as a 2d array of bytes indexed as [y][x]
+		#(the same way self.map was indexed in the Map class)
+		if data is None:
+			data = np.zeros((dims[0], dims[1]), np.uint8)
+		self.data = data
+
+		#incremented every time the grid changes so that planners
+		#can check if the grid has changed since they last read it
+		self.version = 0
+
+
+
+	def mark(self, cells, value=OBSTACLE):
+		"""
+		Input: list of (x, y) cells and the value to set them to
+		Output: grid with the cells updated
+		"""
+		cells = np.asarray(cells, dtype=int).reshape(-1, 2)
+		self.data[cells[:, 1], cells[:, 0]] = value
+		self.version += 1
+
+		return self.data
+
+
+
+	def window(self, cell, radius):
+		"""
+		Input: (x, y) cell and radius
+		Output: slices of the grid around the cell and the part of
+		the diamond mask that fits inside the grid
+		"""
+		h, w = self.data.shape
+		x0, x1 = max(cell[0]-radius, 0), min(cell[0]+radius+1, w)
+		y0, y1 = max(cell[1]-radius, 0), min(cell[1]+radius+1, h)
+
+		if x0 >= x1 or y0 >= y1:
+			#the cell and its neighbours are outside the grid
+			return (slice(0, 0), slice(0, 0)), np.zeros((0, 0), bool)
+
+		mask = diamond(radius)[y0-(cell[1]-radius):y1-(cell[1]-radius), x0-(cell[0]-radius):x1-(cell[0]-radius)]
+
+		return (slice(y0, y1), slice(x0, x1)), mask
+
+
+
+	def clear(self):
+		"""
+		Removes all obstacles and drone positions from the grid
+		"""
+		self.data[:] = FREE
+		self.version += 1
+
+
+
+	def occupied(self):
+		"""
+		Returns a boolean array which is True
+		at every cell holding an obstacle
+		"""
+		return self.data == OBSTACLE
+
+
+
+	def snapshot(self, directory=SNAPSHOT):
+		"""
+		Saves the grid as a binary .npy file so that it can be
+		loaded again (or memory-mapped) without parsing any text
+		"""
+		np.save(directory, self.data)
+
+
+
+	@classmethod
+	def load(cls, directory, mmap=False):
+		"""
+		Input: directory of a snapshot (.npy) or of a legacy map (.txt)
+		mmap --> memory-map the snapshot instead of reading it into memory
+		Output: OccupancyGrid object holding the loaded map
+		"""
+		if directory.endswith(".txt"):
+			data = np.loadtxt(directory, delimiter=",", dtype=np.uint8, ndmin=2)
+		else:
+			data = np.load(directory, mmap_mode="r+" if mmap else None)
+
+		return cls(data.shape, data)
+
+
+
+class ObstacleSet():
+	"""
+	Holds every obstacle cell only once, as a bitmap aligned with
+	the map, so re-observed obstacles don't use any extra memory
+	Keeps the last changes so that planners can get only the
+	cells added since they last read it
+	"""
+	def __init__(self, dims, history=256):
+		self.bitmap = np.zeros((dims[0], dims[1]), bool) #True at every obstacle, indexed [y][x]
+		self.count = 0 #number of obstacle cells
+		self.version = 0 #incremented every time cells are added or removed
+		#(version, cells added or removed) of the last changes
+		self.changes = collections.deque(maxlen=history)
+
+
+
+	def add(self, cells):
+		"""
+		Input: (x, y) cells of obstacles
+		Output: cells that weren't already in the set
+		"""
+		cells = np.asarray(cells, dtype=int).reshape(-1, 2)
+		h, w = self.bitmap.shape
+		inside = (cells[:, 0] >= 0) & (cells[:, 0] < w) & (cells[:, 1] >= 0) & (cells[:, 1] < h)
+		cells = np.unique(cells[inside], axis=0)
+
+		new = cells[~self.bitmap[cells[:, 1], cells[:, 0]]]
+
+		if len(new) > 0:
+			self.bitmap[new[:, 1], new[:, 0]] = True
+			self.count += len(new)
+			self.version += 1
+			self.changes.append((self.version, new))
+
+		return new
+
+
+
+	def remove(self, cells):
+		"""
+		Input: (x, y) cells that are no longer obstacles
+		Output: cells that were in the set
+		"""
+		cells = np.asarray(cells, dtype=int).reshape(-1, 2)
+		h, w = self.bitmap.shape
+		inside = (cells[:, 0] >= 0) & (cells[:, 0] < w) & (cells[:, 1] >= 0) & (cells[:, 1] < h)
+		cells = np.unique(cells[inside], axis=0)
+
+		old = cells[self.bitmap[cells[:, 1], cells[:, 0]]]
+
+		if len(old) > 0:
+			self.bitmap[old[:, 1], old[:, 0]] = False
+			self.count -= len(old)
+			self.version += 1
+			self.changes.append((self.version, old))
+
+		return old
+
+
+
+	def changed_since(self, version):
+		"""
+		Input: version of the set when it was last read
+		Output: cells added or removed since then, or None
+		if the changes are older than the history kept
+		"""
+		if version == self.version:
+			return np.zeros((0, 2), int)
+		if not self.changes or self.changes[0][0] > version + 1:
+			return None
+
+		return np.concatenate([cells for v, cells in self.changes if v > version])
+
+
+
+	def __contains__(self, cell):
+		h, w = self.bitmap.shape
+
+		return 0 <= cell[0] < w and 0 <= cell[1] < h and bool(self.bitmap[cell[1], cell[0]])
+
+
+
+	def __len__(self):
+		return self.count
+
+
+
+	def __iter__(self):
+		#(x, y) of every obstacle cell
+		for y, x in np.argwhere(self.bitmap):
+			yield (int(x), int(y))
+
+
+
+class LogOddsGrid():
+	"""
+	Probabilistic occupancy of every cell, stored as log-odds so that
+	a Bayesian update is just an addition (done for many cells at once)
+	0 means unknown, positive values mean the cell is likely occupied
+	Cells that aren't observed decay back towards unknown
+	"""
+	def __init__(self, dims, threshold=0.8, limit=4.0, half_life=60.0):
+		self.data = np.zeros((dims[0], dims[1]), np.float32) #indexed [y][x]
+		self.threshold = logit(threshold) #cells above it are treated as obstacles
+		self.limit = limit #log-odds are clamped so cells can still change quickly
+		self.half_life = half_life #seconds for the log-odds of a cell to halve
+
+
+
+	def update(self, window, mask, probability):
+		"""
+		Input: slices of the grid, cells of the window observed
+		and the probability that they are occupied
+		"""
+		cells = self.data[window]
+		cells[mask] = np.clip(cells[mask] + logit(probability), -self.limit, self.limit)
+
+
+
+	def update_cells(self, cells, probability):
+		"""
+		Input: (x, y) cells observed (can repeat) and the
+		probability that they are occupied
+		"""
+		cells = np.asarray(cells, dtype=int).reshape(-1, 2)
+		y, x = cells[:, 1], cells[:, 0]
+		np.add.at(self.data, (y, x), logit(probability))
+		#only the cells updated can have gone past the limit
+		self.data[y, x] = np.clip(self.data[y, x], -self.limit, self.limit)
+
+
+
+	def decay(self, dt):
+		"""
+		Moves every cell towards unknown according
+		to the time dt passed (in seconds)
+		"""
+		self.data *= np.float32(0.5 ** (dt / self.half_life))
+
+
+
+	def occupied(self, window=(slice(None), slice(None))):
+		"""
+		Thresholded view used by the planners:
+		True where a cell is likely to be an obstacle
+		"""
+		return self.data[window] > self.threshold
+
+
+
+	def probability(self):
+		#probability that every cell is occupied
+		return 1 / (1 + np.exp(-self.data))
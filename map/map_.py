@@ -13,21 +13,24 @@ import numpy as np
 import math
 import collections
 import time
-from path import main as path
+import threading
+from map import grid
+from map import trajectory
+from map import raycast
 from scipy.interpolate import BPoly
-import itertools
 
 
 def read_path(path):
 	"""
 	reads nodes of RRT algorithm from path.txt file
+	(the grid planners write the centres of cells, which aren't whole pixels)
 	"""
 	path_list = []
 	f = open(path, "r")
 	contents = f.readlines()
 	for x in contents:
 		i = x.split(",")
-		i = [int(i[0]), int(i[1][:-1])]
+		i = [float(i[0]), float(i[1][:-1])]
 		path_list.append(i)   
 
 	return path_list
@@ -50,11 +53,21 @@ class Map():
 
 
 		#create the map (initially just 0s)
-		self.map = np.zeros((dims[0], dims[1]))
+		#the map is an occupancy grid shared by reference with the
+		#path planning module, so no map file has to be written or read
+		self.grid = grid.OccupancyGrid(dims)
+		self.map = self.grid.data
 
 		#np array to represent map on the screen
 		self.img = np.zeros((self.screen[0], self.screen[1], 3), np.uint8)
-		self.obs = [] #holds all the obstacle's positions
+		self.obs = grid.ObstacleSet(dims) #holds all the obstacle's positions (each one only once)
+		self.inflation = 0 #extra cells set as obstacles around every obstacle
+		#probability of every cell being an obstacle (self.map holds the thresholded view)
+		self.logodds = grid.LogOddsGrid(dims)
+		self.last_decay = time.monotonic() #last time the log-odds decayed
+		#held while the grid is updated or read, since obstacles are
+		#added by camera.pipeline's map stage (its own thread)
+		self.lock = threading.RLock()
 
 		self.speed = 0 #speed of drone in the map
 		self.angle = 0 #angle the drone is following in the map
@@ -128,172 +141,202 @@ class Map():
 
 
 
-	def get_bezier_curve(self, degree):
+	def get_bezier_curve(self, degree, spacing=None):
 		"""
 		Smooths out the path found by applying a bezier curve to
 		the nodes, making the drone's trajectory more natural to follow
 
-		Input: degree --> the rate at which the bezier curve meets a node
+		Input: degree --> the rate at which the bezier curve meets a node,
+		spacing --> distance between the points of the curve (in the map),
+		by default the average distance between the nodes of the path
 		Output: connected bézier curves forming a spline of the entire path
+		as an (N, 2) array of positions in the map (not rounded to a cell)
 		"""
+		#turn the nodes of the path (in the screen) into positions in the map
+		nodes = np.asarray(self.path, dtype=float).reshape(-1, 2) * [self.dims[0]/self.screen[0], self.dims[1]/self.screen[1]]
 
-		#separate path's nodes into chunks of length equal to the degree
-		chunks = [self.path[x:x+degree] for x in range(0, len(self.path), degree)]
-
+		#every curve is evaluated at once and the points are spaced evenly
+		self.curve = trajectory.bezier_spline(nodes, degree, spacing)
 
-		#create a common node for every chunk so that the bézier curves connect
-		#more smoothly, creating a spline
-		"""
-		for count, i in enumerate(chunks):
-			if count != 0:
-				cmn = chunks[count-1][-1] #get last element from previous chunk
-				chunks[count].insert(0, cmn) #insert last element into current chunk at index 0
-		"""
-
-
-		for c in chunks:
-			#create bézier curve for each chunk and join them
-			self.bezier_curve_2( [[[i[0]], [i[1]]] for i in c], 2)
-
-		#remove duplicate points in the curve by converting it into a dictionary
-		#(dictionaries can't have duplicate keys) and convert back to a list
-		self.curve = list(dict.fromkeys(self.curve))
+		#draw curve and original path on map
+		self.draw_cells(self.curve, (255, 255, 255))
+		self.draw_cells(nodes, (255, 0, 255))
 
 		return self.curve
 
 
 
 
-	def bezier_curve_2(self, points, num_points):
+	def draw_cells(self, points, colour):
 		"""
-		Creates bézier curve of the given points
-		Creates num_points of points forming the curve
-		Uses De Casteljau's algorithm to do so
+		Represents positions in the map in the screen, drawing
+		each cell only once even if several points fall in it
 		"""
+		points = np.asarray(points).reshape(-1, 2)
+		for x, y in np.unique(np.floor(points).astype(int), axis=0):
+			self.draw_map((int(x), int(y)), colour)
 
-		#base case of recursive algorithm:
-		#if there is only one set of points,
-		#the points represent the curve
-		if len(points) == 1:
 
-			#convert points into positions in the map
-			for count, p in enumerate(points[0][0]):
-				pos = self.get_pos(p, points[0][1][count])
-				self.curve.append((pos[0], pos[1]))
-				self.draw_map(pos, (255, 255, 255)) #draw curve on map
 
-			for i in self.path:
-				#draw original path
-				self.draw_map(self.get_pos(i[0], i[1]), (255, 0, 255))
 
-			return self.curve
+	def inflate(self, obs_pos, error, sensor="proximity"):
+		"""
+		Updates the probability of the obstacle's cell and the neighbouring
+		elements up to a distance of error-1 (plus self.inflation) at once,
+		according to how reliable the sensor that detected it is
 
-		else:
-			temp = [] #temporary list holding the points in each iteration
+		Used for uncertainties in obstacle mapping,
+		threat mapping and collision avoidance
+		"""
+		radius = max(error - 1 + self.inflation, 0)
+		window, mask = self.grid.window(obs_pos, radius)
 
-			for count, p in enumerate(points):
+		with self.lock:
+			self.logodds.update(window, mask, grid.SENSORS[sensor])
+			added, removed = self.sync(window)
 
-				if count != len(points)-1:
-					#temporary lists holding x and y values for each lerp
-					x = []
-					y = []
+			#draw all the obstacles on the screen in one go
+			self.draw_mask(window, mask & self.logodds.occupied(window), (0, 255, 0))
 
-					for i in range(0, num_points+1):
-						#calculates lerp value for num_points
-						t = i/num_points #scalar multiplier in lerp
+		return added
 
-						for (x1, x2, y1, y2) in zip(p[0], points[count+1][0], p[1], points[count+1][1]):
-							#calculate lerp for each point and the next one
-							#so the length of lerps to do each iteration
-							#decreases by one
-							x.append( self.lerp(x1, x2, t) ) #interpolates x values
-							y.append( self.lerp(y1, y2, t) ) #interpolates y values
 
-					temp.append([x, y]) #append x and y values for next iteration
 
-			self.bezier_curve_2(temp, num_points) #recursive step
 
+	def sync(self, window=(slice(None), slice(None))):
+		"""
+		Updates the map (and self.obs) in window from the log-odds:
+		cells likely to be occupied become obstacles and obstacles
+		that are no longer likely to be there are removed
+		Output: (x, y) cells added and removed
+		"""
+		occupied = self.logodds.occupied(window)
+		data = self.grid.data[window]
 
+		added = occupied & (data != grid.OBSTACLE)
+		removed = ~occupied & (data == grid.OBSTACLE)
 
+		#position of the window in the map, to turn the masks into (x, y) cells
+		offset = [window[1].start or 0, window[0].start or 0]
+		added_cells = np.argwhere(added)[:, ::-1] + offset
+		removed_cells = np.argwhere(removed)[:, ::-1] + offset
 
-	def lerp(self, p0, p1, t):
-		"""
-		Returns the value of the linear interpolation at t
-		between p0 and p1 using interpolation formula
-		"""
-		return ((1-t)*p0) + (t*p1)
+		if len(added_cells) > 0 or len(removed_cells) > 0:
+			data[added] = grid.OBSTACLE
+			data[removed] = grid.FREE
+			#the grid's version is updated so the path planning module knows the map has changed
+			self.grid.version += 1
+			self.obs.add(added_cells)
+			self.obs.remove(removed_cells)
 
+		return added_cells, removed_cells
 
 
 
-	def offset(self, pos, distance):
-		"""
-		Gets the indices of the neighbouring elements
-		of an element at position pos that are at the
-		required distance
 
-		Used for uncertainties in obstacle mapping,
-		threat mapping and collision avoidance
+	def decay(self):
+		"""
+		Cells that haven't been observed for a while become
+		less likely to be obstacles, so phantom obstacles
+		(e.g. from a wrong reading) are eventually removed
 		"""
-		row = pos[0]
-		col = pos[1]
+		with self.lock:
+			now = time.monotonic()
+			self.logodds.decay(now - self.last_decay)
+			self.last_decay = now
 
-		indices = []
-		for r in range(row-distance, row+distance+1):
-			for c in range(col-distance, col+distance+1):
-				# Skip the element itself
-				if r == row and c == col:
-					continue
-				# Check if the element is within the bounds of the array
-				if r >= 0 and r < self.map.shape[0] and c >= 0 and c < self.map.shape[1]:
-					# Calculate the distance from the element
-					d = abs(row - r) + abs(col - c)
-					# Check if the distance is equal to the desired distance
-					if d == distance:
-						indices.append((r, c))
+			added, removed = self.sync()
+			for cell in removed:
+				self.draw_map((int(cell[0]), int(cell[1])), (0, 0, 0)) #remove obstacle from the screen
 
-		return indices
+		return removed
 
 
 
 
-	def add_obs(self, distance, angle, error):
+	def add_obs(self, distance, angle, error, sensor="proximity", pose=None):
 		"""
 		Calculates position of a detected obstacle at a
 		given distance and angle and adds it to the map
+		sensor is the sensor that detected it (see map.grid.SENSORS)
+		pose is the drone's (x, y, angle) when it was detected (see add_scan)
 
 		Error accounts for the uncertainty of the measurement
 		and drone's position during the flight by setting the
 		neighbouring elements as obstacles too
+		The cells between the drone and the obstacle are seen as free
 		"""
 
-		#turn distance in cm into distance in relation to the screen's dimensions
-		distance = distance * (self.screen[0] / self.area[0])
+		#the proximity sensor is a scan of a single beam
+		self.add_scan([distance], [angle], error, sensor, pose=pose)
 
-		#Calculate position of obstacle by using trigonometry
-		obs = [int(self.x + (distance*math.cos(self.angle + angle))), int(self.y + (distance*math.sin(self.angle + angle)))]
-		obs_pos = self.get_pos(obs[0], obs[1]) #turns position into a position in the map (instead of screen)
+		return self.obs
 
-		print("Obs pos: ", obs)
 
-		#set neighbour elements at distance of the value error as obstacles
-		for d in range(1, error):
-			for i in self.offset(obs_pos, d):
-				self.map[i[1]][i[0]] = 2 #add obstacle to the map
-				self.obs.append(i)
-				self.draw_map(i, (0, 255, 0)) #draw obstacle on the screen
 
-		#save map as a text file, with each element separated by a comma ','
-		#to be opened by path plannning module to create new path
-		np.savetxt("map/map.txt", self.map, delimiter = ",", fmt = "%i")
 
+	def add_scan(self, distances, angles, error, sensor="proximity", hits=None, pose=None):
+		"""
+		Adds the beams of a sensor to the map at once
+		Input: distance (cm) and angle (relative to the drone's angle) of every
+		beam, e.g. one beam for the proximity sensor or a fan from a depth image
+		(see raycast.fan), and whether every beam hit an obstacle (all by default)
+		pose --> (x, y, angle) of the drone in the screen when the beams were
+		measured (its current position by default, the map can be updated later
+		by another thread)
+
+		The cells every beam passes through become more likely to be free,
+		so obstacles that moved are cleared, and the cells around the end of
+		the beams that hit something more likely to be obstacles
+		Output: (x, y) cells added to and removed from the obstacles
+		"""
+		#the drone's position is read and the map updated while holding the
+		#lock, so the beams start where the drone is when they are added
+		with self.lock:
+			x, y, angle = pose if pose is not None else (self.x, self.y, self.angle)
+			#turn distances in cm into distances in relation to the screen's dimensions
+			distances = np.asarray(distances, dtype=float) * (self.screen[0] / self.area[0])
+			angles = angle + np.asarray(angles, dtype=float)
 
-		return self.obs
-	
+			#positions of the drone and the end of the beams in the map (instead of screen)
+			scale = np.array([self.dims[0]/self.screen[0], self.dims[1]/self.screen[1]])
+			ends = (np.array([x, y]) + distances[:, None]*np.column_stack((np.cos(angles), np.sin(angles)))) * scale
+			origin = np.array([x, y]) * scale
+
+			free, hit = raycast.cast(origin, ends, hits)
+			free = free[raycast.inside(free, self.map.shape)]
+
+			#window of the map holding every beam and the cells around the obstacles hit
+			radius = max(error - 1 + self.inflation, 0)
+			cells = np.concatenate((free, hit, np.floor(origin).astype(int)[None]))
+			x0, y0 = np.maximum(cells.min(axis=0) - radius, 0)
+			x1, y1 = np.minimum(cells.max(axis=0) + radius + 1, (self.map.shape[1], self.map.shape[0]))
+			if x0 >= x1 or y0 >= y1:
+				return np.zeros((0, 2), int), np.zeros((0, 2), int)
+			window = (slice(y0, y1), slice(x0, x1))
+
+			#cells around the obstacles hit (not carved out by the other beams)
+			around = np.zeros((y1-y0, x1-x0), bool)
+			for cell in hit:
+				w, mask = self.grid.window(cell, radius)
+				around[w[0].start-y0:w[0].stop-y0, w[1].start-x0:w[1].stop-x0] |= mask
+
+			free = np.unique(free[~around[free[:, 1]-y0, free[:, 0]-x0]], axis=0)
+			self.logodds.update_cells(free, 1 - grid.SENSORS[sensor])
+			self.logodds.update(window, around, grid.SENSORS[sensor])
+			added, removed = self.sync(window)
 
+			#draw the obstacles and remove the cleared ones from the screen
+			self.draw_mask(window, around & self.logodds.occupied(window), (0, 255, 0))
+			for cell in removed:
+				self.draw_map((int(cell[0]), int(cell[1])), (0, 0, 0))
 
+			return added, removed
 
-	def map_drone(self, n1, n2, at_node, time, speed_cmd):
+
+
+
+	def map_drone(self, n1, n2, at_node, time, speed_cmd, dt):
 		"""
 		Maps the drone's position in the map while it flies
 
@@ -302,6 +345,8 @@ class Map():
 		at_node - boolean value to check if the drone has reached n2
 		time - the time it is going to take to get to n2
 		speed_cmd - velocity command sent to the drone while flying
+		dt - seconds since the position was last updated (the control
+		loop's tick, see control.scheduler)
 
 		Output:
 		Drone's position in the map (updated every iteration)
@@ -317,7 +362,7 @@ class Map():
 			distance = math.dist(n1, n2) * (self.dims[0]/self.area[0]) * (self.screen[0]/self.area[0]) * (117/150) * 1.07
 
 			#calculate the speed for which the drone travels that distance
-			#in the time required by using formula v = d/t
+			#in the time required by using formula v = d/t (per second)
 			self.speed = (distance/time)
 
 
@@ -325,10 +370,10 @@ class Map():
 			#calculate the angle between the nodes by using trigonometry
 			self.angle = math.atan2(n2[1]-n1[1], n2[0]-n1[0])
 
-			#get x and y components of self.speed by using trigonometry
-			#add the value to the current position in the screen
-			self.x += math.cos(self.angle)*self.speed
-			self.y += math.sin(self.angle)*self.speed
+			#get x and y components of the distance travelled in dt by using
+			#trigonometry, add the value to the current position in the screen
+			self.x += math.cos(self.angle)*self.speed*dt
+			self.y += math.sin(self.angle)*self.speed*dt
 
 			#convert (self.x, self.y) position into a position in the map (dims)
 			self.pos = self.get_pos(self.x, self.y)
@@ -356,6 +401,24 @@ class Map():
 
 
 
+	def draw_mask(self, window, mask, colour):
+		"""
+		Represents a block of cells of the map in the screen at once
+		window --> slices of the map, mask --> cells of the window to draw
+		"""
+		if mask.size == 0:
+			return
+
+		#top left and bottom right positions in the screen of the whole window
+		start = self.start_end((window[1].start, window[0].start))[0]
+		end = self.start_end((window[1].stop-1, window[0].stop-1))[1]
+
+		#scale the mask up to the screen and colour every pixel covered
+		pixels = cv2.resize(mask.astype(np.uint8), (end[0]-start[0], end[1]-start[1]), interpolation=cv2.INTER_NEAREST)
+		self.img[start[1]:end[1], start[0]:end[0]][pixels.astype(bool)] = colour
+
+
+
 	def draw_map(self, point, colour):
 		"""
 		Represents a point in the map in the screen
@@ -394,11 +457,7 @@ class Obstacle(Map):
 
 		print("Obs pos: ", obs_pos)
 
-		for d in range(1, error):
-			for i in self.offset(obs_pos, d):
-				self.map[i[1]][i[0]] = 2 
-				self.obs.append(i)
-				self.draw_map(i, (0, 255, 0))
+		self.inflate(obs_pos, error)
 
 
 		return self.obs
@@ -409,7 +468,7 @@ class Obstacle(Map):
 if __name__ == "__main__":
 
 	while True:
-		m.bezier_curve_2(degree=3)
+		m.get_bezier_curve(degree=3)
 
 		"""
 		face_cascade = cv2.CascadeClassifier("obstacles/resources/face_tracking_file.xml")
@@ -0,0 +1,140 @@
+"""
+Batch raycasting over the occupancy grid
+Input:
+- position of the sensor and the end of every beam, in grid coordinates
+  (one beam for the proximity sensor, a fan of beams for a depth image)
+Output:
+- cells every beam passes through (free space) and the cells where
+  the beams hit an obstacle, found for all beams at once
+"""
+
+import numpy as np
+
+
+
+def traverse(origin, ends):
+	"""
+	Input: origin of the beams (one position, or one per beam) and
+	(N, 2) array with the end of every beam
+	Output: (x, y) cells crossed by the beams, in order from the origin,
+	and the index of the beam every cell belongs to
+
+	Same cells as collision.segment_cells (exact traversal, the cells of
+	both ends always included), but every grid line crossed by every beam
+	is found in a single vectorized step
+	"""
+	ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+	origin = np.broadcast_to(np.asarray(origin, dtype=float), ends.shape)
+	d = ends - origin
+	n = len(ends)
+
+	#every beam is parametrised as origin + t*d, for t between 0 and 1
+	beams = [np.arange(n), np.arange(n)]
+	t = [np.zeros(n), np.ones(n)]
+
+	for axis in range(2):
+		#grid lines strictly between both ends of every beam
+		lo = np.minimum(origin[:, axis], ends[:, axis])
+		hi = np.maximum(origin[:, axis], ends[:, axis])
+		first = np.floor(lo) + 1
+		counts = np.maximum(np.ceil(hi) - first, 0).astype(int)
+		counts[d[:, axis] == 0] = 0
+
+		beam = np.repeat(np.arange(n), counts)
+		#position of every line in its beam's run of lines
+		offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+		lines = first[beam] + offset
+
+		beams.append(beam)
+		t.append((lines - origin[beam, axis]) / d[beam, axis])
+
+	beams = np.concatenate(beams)
+	t = np.concatenate(t)
+	order = np.lexsort((t, beams))
+	beams, t = beams[order], t[order]
+
+	#the midpoint between two consecutive crossings of a beam lies inside one cell
+	pair = (beams[:-1] == beams[1:]) & (t[1:] > t[:-1])
+	mid = (t[:-1][pair] + t[1:][pair]) / 2
+	beam = beams[:-1][pair]
+	cells = np.floor(origin[beam] + mid[:, None]*d[beam]).astype(int)
+
+	#an end on a grid line is in a cell no midpoint falls in, so the cells
+	#of the origin and the end are added to every beam (in that order)
+	cells = np.concatenate((np.floor(origin).astype(int), cells, np.floor(ends).astype(int)))
+	beam = np.concatenate((np.arange(n), beam, np.arange(n)))
+	rank = np.repeat([0, 1, 2], [n, len(cells)-2*n, n])
+	order = np.lexsort((rank, beam))
+	cells, beam = cells[order], beam[order]
+
+	#cells repeated one after the other in the same beam are removed
+	keep = np.ones(len(cells), bool)
+	keep[1:] = (beam[1:] != beam[:-1]) | np.any(cells[1:] != cells[:-1], axis=1)
+	cells, beam = cells[keep], beam[keep]
+
+	return cells, beam
+
+
+
+def inside(cells, shape):
+	#True at the (x, y) cells inside a grid of shape (rows, columns)
+	return (cells[:, 0] >= 0) & (cells[:, 0] < shape[1]) & (cells[:, 1] >= 0) & (cells[:, 1] < shape[0])
+
+
+
+def cast(origin, ends, hits=None):
+	"""
+	Input: origin and ends of the beams, and whether every beam hit an
+	obstacle at its end (all of them by default)
+	Output: cells the beams passed through (free) and the cells hit
+	(occupied), as (x, y) arrays
+
+	Beams that didn't hit anything (e.g. out of range) only carve free space
+	"""
+	ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+	hits = np.ones(len(ends), bool) if hits is None else np.asarray(hits, bool).reshape(-1)
+
+	cells, beam = traverse(origin, ends)
+	end_cells = np.floor(ends).astype(int)
+
+	#the cell at the end of a beam that hit something isn't free
+	hit = hits[beam] & np.all(cells == end_cells[beam], axis=1)
+
+	return cells[~hit], end_cells[hits]
+
+
+
+def first_hit(occupied, origin, ends):
+	"""
+	Input: boolean occupancy array (indexed [y][x]), origin and ends of the beams
+	Output: cell where every beam first meets an obstacle and whether
+	it met one at all (the end of the beam is returned if it didn't)
+	"""
+	ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+	cells, beam = traverse(origin, ends)
+
+	valid = inside(cells, occupied.shape)
+	blocked = np.zeros(len(cells), bool)
+	blocked[valid] = occupied[cells[valid, 1], cells[valid, 0]]
+
+	#cells are in order along every beam, so the first blocked cell
+	#of a beam is the first time the beam appears in the blocked cells
+	index = np.flatnonzero(blocked)
+	beams, first = np.unique(beam[index], return_index=True)
+
+	result = np.floor(ends).astype(int)
+	result[beams] = cells[index[first]]
+	hits = np.zeros(len(ends), bool)
+	hits[beams] = True
+
+	return result, hits
+
+
+
+def fan(fov, beams):
+	"""
+	Input: horizontal field of view of a camera (radians) and number of beams
+	Output: angle of every beam relative to the centre of the image
+	(one beam per column of a depth image, from left to right)
+	"""
+	return np.linspace(-fov/2, fov/2, beams)
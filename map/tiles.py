@@ -0,0 +1,62 @@
+"""
+Multi-resolution (tiled) representation of the occupancy grid
+Input:
+- occupancy grid (map.grid.OccupancyGrid)
+Output:
+- coarse level: number of obstacle cells in every tile, so the
+  planners can search large patrol areas tile by tile
+
+The tiles only summarise the grid, they aren't a sparse copy of it:
+the map's layers stay dense (map.grid) since the rest of the tree
+indexes them directly, so a sparse fine level would only have added
+memory on top of them
+"""
+
+import math
+import numpy as np
+
+
+
+class TileMap():
+	def __init__(self, dims, tile=16):
+		self.dims = dims #dimensions of the fine grid (same as the map's dimensions)
+		self.tile = tile #side of a tile in cells
+		#coarse level, indexed [ty][tx]
+		self.counts = np.zeros((math.ceil(dims[0]/tile), math.ceil(dims[1]/tile)), np.int32)
+		self.version = 0
+
+
+
+	@classmethod
+	def from_grid(cls, occupancy, tile=16):
+		"""
+		Input: occupancy grid (map.grid.OccupancyGrid) and size of the tiles
+		Output: TileMap counting the same obstacles
+		"""
+		occupied = occupancy.occupied()
+		tiles = cls(occupied.shape, tile)
+		th, tw = tiles.counts.shape
+
+		#pad the grid so it splits into whole tiles, then count every tile at once
+		padded = np.zeros((th*tile, tw*tile), bool)
+		padded[:occupied.shape[0], :occupied.shape[1]] = occupied
+		blocks = padded.reshape(th, tile, tw, tile).swapaxes(1, 2)
+		tiles.counts = blocks.sum(axis=(2, 3), dtype=np.int32)
+		tiles.version = occupancy.version
+
+		return tiles
+
+
+
+	def blocked(self, fraction=1.0):
+		"""
+		Coarse level used by the planners:
+		True at every tile with at least that fraction of
+		its cells covered by obstacles (all of them by default)
+		"""
+		#tiles on the edges of the map can be smaller than the rest
+		th, tw = self.counts.shape
+		heights = np.minimum(self.tile, self.dims[0] - np.arange(th)*self.tile)
+		widths = np.minimum(self.tile, self.dims[1] - np.arange(tw)*self.tile)
+
+		return self.counts >= fraction * np.outer(heights, widths)
@@ -0,0 +1,92 @@
+"""
+Generates the trajectory the drone follows from the nodes of a path
+Input:
+- nodes of the path (any coordinates)
+Output:
+- (N, 2) array of points along joined bézier curves, evenly
+  spaced by arc length
+"""
+
+import numpy as np
+from math import comb
+
+
+
+def bernstein(n, t):
+	"""
+	Input: degree n of the curve and the values of t to evaluate it at
+	Output: (len(t), n+1) matrix of the Bernstein basis polynomials,
+	so that a curve is the matrix product with its control points
+	"""
+	t = np.asarray(t, dtype=float)[:, None]
+	i = np.arange(n+1)
+	coefficients = np.array([comb(n, k) for k in i], dtype=float)
+
+	return coefficients * t**i * (1-t)**(n-i)
+
+
+
+def bezier(points, samples):
+	"""
+	Input: control points of one bézier curve and the number of samples
+	Output: (samples, 2) array of points of the curve
+	"""
+	points = np.asarray(points, dtype=float)
+	t = np.linspace(0, 1, samples)
+
+	return bernstein(len(points)-1, t) @ points
+
+
+
+def resample(points, spacing):
+	"""
+	Input: points of a curve and the distance required between points
+	Output: points at the same distance from each other along the curve
+	"""
+	lengths = np.linalg.norm(np.diff(points, axis=0), axis=1)
+	arc = np.concatenate(([0], np.cumsum(lengths))) #distance along the curve at every point
+
+	if arc[-1] == 0:
+		return points[:1].copy()
+
+	#the last point of the curve is always kept
+	s = np.append(np.arange(0, arc[-1], spacing), arc[-1])
+	s = np.unique(s)
+
+	return np.column_stack((np.interp(s, arc, points[:, 0]), np.interp(s, arc, points[:, 1])))
+
+
+
+def bezier_spline(path, degree, spacing=None, samples=32):
+	"""
+	Input: nodes of a path, number of nodes in each bézier curve
+	(degree), distance between the points returned (spacing)
+	Output: contiguous (N, 2) float array of the trajectory
+
+	By default the points are as far apart as the nodes of the path are
+	on average, so the curve has about as many points as the path has
+	nodes (the drone stops and turns at every point, see Drone.follow_path)
+
+	The path is split into chunks of degree nodes, where every chunk
+	starts at the last node of the previous one, so the curves join up
+	Every curve is evaluated at once using the Bernstein basis
+	"""
+	path = np.asarray(path, dtype=float).reshape(-1, 2)
+
+	if len(path) < 2:
+		return np.ascontiguousarray(path)
+
+	if spacing is None:
+		spacing = np.linalg.norm(np.diff(path, axis=0), axis=1).sum() / (len(path)-1)
+		if spacing == 0:
+			return np.ascontiguousarray(path[:1])
+
+	step = max(degree-1, 1)
+	curves = []
+
+	for i in range(0, len(path)-1, step):
+		curve = bezier(path[i:i+step+1], samples)
+		#the first point is the last point of the previous curve
+		curves.append(curve if i == 0 else curve[1:])
+
+	return np.ascontiguousarray(resample(np.concatenate(curves), spacing))
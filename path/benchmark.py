@@ -0,0 +1,244 @@
+"""
+Benchmarks the path planning algorithms without a display
+Input:
+- the maps in path/maps and randomly generated grids of growing size
+- seeded start/end pairs for every map
+Output:
+- p50/p95 planning time, nodes expanded, path length, smoothness
+  and memory for every planner on every map (and the time taken
+  by Map.get_bezier_curve to smooth the paths found)
+
+Run from the repository's root directory:
+python -m path.benchmark --pairs 20 --sizes 50 100 200
+"""
+
+import argparse, contextlib, io, json, math, os, random, time, tracemalloc
+import cv2
+import numpy as np
+from scipy import ndimage
+from path import path_planning
+from path import planners
+from map import grid
+
+
+MAPS = "path/maps"
+SCALE = 5 #pixels of the screen per cell of the grid (same as the Drone class)
+
+
+
+def load_map(directory, size):
+	"""
+	Input: directory of a map image and the size of the grid
+	Output: occupancy grid with the dark pixels of the image as obstacles
+	"""
+	img = cv2.imread(directory, cv2.IMREAD_GRAYSCALE)
+	img = cv2.resize(img, (size, size), interpolation=cv2.INTER_AREA)
+
+	data = np.where(img < 128, grid.OBSTACLE, grid.FREE).astype(np.uint8)
+
+	return grid.OccupancyGrid(data.shape, data)
+
+
+
+def random_map(size, density, rng):
+	"""
+	Input: size of the grid (or its (height, width)), fraction of the grid covered by obstacles
+	Output: occupancy grid with random square obstacles
+	"""
+	h, w = (size, size) if isinstance(size, int) else size
+	data = np.zeros((h, w), np.uint8)
+	side = max(min(h, w)//20, 1)
+
+	while (data == grid.OBSTACLE).mean() < density:
+		x, y = rng.integers(0, (w, h))
+		data[y:y+side, x:x+side] = grid.OBSTACLE
+
+	return grid.OccupancyGrid(data.shape, data)
+
+
+
+def get_pairs(occupancy, n, rng):
+	"""
+	Picks n start/end pairs of free cells connected to each other
+	(so that every planner can find a path)
+	Output: list of (start, end) positions in the screen
+	"""
+	#label the regions of free space (4-connected, so the
+	#planners never need to cut an obstacle's corner)
+	labels, _ = ndimage.label(~occupancy.occupied())
+	sizes = np.bincount(labels.ravel())
+	sizes[0] = 0
+	#cells of the largest free region
+	cells = np.argwhere(labels == sizes.argmax())
+
+	pairs = []
+	for _ in range(n):
+		(y0, x0), (y1, x1) = cells[rng.choice(len(cells), 2, replace=False)]
+		pairs.append((((x0+0.5)*SCALE, (y0+0.5)*SCALE), ((x1+0.5)*SCALE, (y1+0.5)*SCALE)))
+
+	return [((int(s[0]), int(s[1])), (int(e[0]), int(e[1]))) for s, e in pairs]
+
+
+
+def path_metrics(path):
+	"""
+	Input: nodes of a path in the screen
+	Output: length of the path (in cells) and its smoothness
+	(sum of the angles turned at every node, in radians)
+	"""
+	path = np.asarray(path, dtype=float) / SCALE
+	edges = np.diff(path, axis=0)
+	edges = edges[np.any(edges != 0, axis=1)]
+	length = np.linalg.norm(edges, axis=1).sum()
+
+	angles = np.arctan2(edges[:, 1], edges[:, 0])
+	turns = np.abs((np.diff(angles) + np.pi) % (2*np.pi) - np.pi)
+
+	return length, turns.sum()
+
+
+
+def run_planner(name, start, end, occupancy, max_iterations):
+	"""
+	Runs one planner once
+	Output: the planner object (holding the path found)
+	"""
+	dims = occupancy.data.shape
+	screen = (dims[1]*SCALE, dims[0]*SCALE)
+	planner = planners.PLANNERS[name](start, end, screen, (dims[1], dims[0]), occupancy)
+
+	#planners print their progress, which isn't needed here
+	with contextlib.redirect_stdout(io.StringIO()):
+		if isinstance(planner, path_planning.RRT):
+			planner.plan(max_iterations=max_iterations)
+		else:
+			planner.plan()
+
+	return planner
+
+
+
+def expanded(planner):
+	#nodes expanded by grid planners, nodes added to the tree by RRTs
+	if isinstance(planner, path_planning.RRT):
+		return len(planner.tree.nodes)
+
+	return planner.expanded
+
+
+
+def time_curve(map_, path):
+	"""
+	Output: time taken by Map.get_bezier_curve to smooth the path
+	"""
+	map_.path = [list(i) for i in reversed(path)]
+	map_.curve = []
+
+	t = time.perf_counter()
+	map_.get_bezier_curve(degree=3)
+
+	return time.perf_counter() - t
+
+
+
+def benchmark(name, occupancy, pairs, max_iterations, seed, map_):
+	"""
+	Runs a planner over every start/end pair of a map
+	Output: dictionary with the results
+	"""
+	times, nodes, lengths, turns, memory, curves = [], [], [], [], [], []
+	failed = 0
+
+	for count, (start, end) in enumerate(pairs):
+		#RRTs sample randomly, so each pair is seeded (same samples on every run)
+		random.seed(seed + count)
+		t = time.perf_counter()
+		planner = run_planner(name, start, end, occupancy, max_iterations)
+		times.append(time.perf_counter() - t)
+		nodes.append(expanded(planner))
+
+		if not planner.found or len(planner.path) < 2:
+			failed += 1
+			continue
+
+		length, turn = path_metrics(planner.path)
+		lengths.append(length)
+		turns.append(turn)
+
+		if map_ is not None:
+			curves.append(time_curve(map_, planner.path))
+
+		#memory is measured on a separate run (tracemalloc slows planning down)
+		random.seed(seed + count)
+		tracemalloc.start()
+		run_planner(name, start, end, occupancy, max_iterations)
+		memory.append(tracemalloc.get_traced_memory()[1])
+		tracemalloc.stop()
+
+	def percentile(values, q):
+		return float(np.percentile(values, q)) if values else math.nan
+
+	return {
+		"planner": name,
+		"runs": len(pairs),
+		"failed": failed,
+		"time_p50": percentile(times, 50),
+		"time_p95": percentile(times, 95),
+		"nodes_p50": percentile(nodes, 50),
+		"length_p50": percentile(lengths, 50),
+		"turns_p50": percentile(turns, 50),
+		"memory_p50": percentile(memory, 50),
+		"curve_p50": percentile(curves, 50),
+	}
+
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmark the path planning algorithms")
+	parser.add_argument("--planners", nargs="+", default=list(planners.PLANNERS), choices=list(planners.PLANNERS))
+	parser.add_argument("--pairs", type=int, default=20, help="start/end pairs per map")
+	parser.add_argument("--size", type=int, default=100, help="size of the grid the bundled maps are loaded into")
+	parser.add_argument("--sizes", type=int, nargs="*", default=[50, 100, 200], help="sizes of the random grids")
+	parser.add_argument("--density", type=float, default=0.2, help="fraction of the random grids covered by obstacles")
+	parser.add_argument("--max-iterations", type=int, default=20000, help="iterations before an RRT gives up")
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--curve", action="store_true", help="also time Map.get_bezier_curve on every path")
+	parser.add_argument("--json", help="file to write the results to")
+	args = parser.parse_args()
+
+	rng = np.random.default_rng(args.seed)
+
+	maps = []
+	for f in sorted(os.listdir(MAPS)):
+		maps.append((f, load_map(os.path.join(MAPS, f), args.size)))
+	for size in args.sizes:
+		maps.append((f"random_{size}", random_map(size, args.density, rng)))
+
+	map_ = None
+	if args.curve:
+		#imported here since the map module needs path/path.txt
+		from map import map_ as m
+		map_ = m.Map([args.size, args.size], [args.size*SCALE, args.size*SCALE], [args.size*10, args.size*10])
+
+	results = []
+	print(f"{'map':<16}{'planner':<12}{'fail':>5}{'p50 ms':>10}{'p95 ms':>10}{'nodes':>9}{'length':>9}{'turns':>8}{'mem KB':>9}{'curve ms':>10}")
+
+	for map_name, occupancy in maps:
+		pairs = get_pairs(occupancy, args.pairs, rng)
+
+		for name in args.planners:
+			r = benchmark(name, occupancy, pairs, args.max_iterations, args.seed, map_)
+			r["map"] = map_name
+			results.append(r)
+
+			print(f"{map_name:<16}{name:<12}{r['failed']:>5}{r['time_p50']*1000:>10.2f}{r['time_p95']*1000:>10.2f}"
+				f"{r['nodes_p50']:>9.0f}{r['length_p50']:>9.1f}{r['turns_p50']:>8.2f}{r['memory_p50']/1024:>9.1f}{r['curve_p50']*1000:>10.2f}")
+
+	if args.json:
+		with open(args.json, "w") as f:
+			json.dump(results, f, indent=2)
+
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,64 @@
+"""
+Headless collision checking against the occupancy grid
+Input:
+- boolean array of occupied cells (map.grid.OccupancyGrid.occupied())
+- edges between nodes, in grid coordinates
+Output:
+- cells crossed by each edge and whether any of them is an obstacle
+"""
+
+import numpy as np
+
+
+
+def segment_cells(p1, p2):
+	"""
+	Input: start and end positions of an edge in grid coordinates
+	Output: (x, y) indices of every cell the edge passes through
+
+	The cells are found exactly (same cells as a DDA traversal) by
+	getting every point where the edge crosses a vertical or horizontal
+	grid line, and taking the cell at the midpoint between crossings
+	This is done in one vectorized step instead of sampling points
+	The cells holding both ends are always included, even if an end
+	lies exactly on a grid line
+	"""
+	p1 = np.asarray(p1, dtype=float)
+	p2 = np.asarray(p2, dtype=float)
+	d = p2 - p1
+
+	#the edge is parametrised as p1 + t*d, for t between 0 and 1
+	t = [np.array([0.0, 1.0])]
+
+	for axis in range(2):
+		if d[axis] != 0:
+			#grid lines strictly between both ends of the edge
+			lo, hi = sorted((p1[axis], p2[axis]))
+			lines = np.arange(np.floor(lo) + 1, np.ceil(hi))
+			t.append((lines - p1[axis]) / d[axis])
+
+	t = np.unique(np.concatenate(t))
+	#the midpoint between two consecutive crossings lies inside one cell
+	mid = (t[:-1] + t[1:]) / 2
+	cells = np.floor(p1 + mid[:, None]*d).astype(int)
+
+	#an end on a grid line is in a cell no midpoint falls in, so both
+	#end cells are added (cells repeated one after the other are removed)
+	cells = np.concatenate((np.floor(p1).astype(int)[None], cells, np.floor(p2).astype(int)[None]))
+	keep = np.concatenate(([True], np.any(cells[1:] != cells[:-1], axis=1)))
+
+	return cells[keep]
+
+
+
+def collides(occupied, cells):
+	"""
+	Input: boolean occupancy array (indexed [y][x]) and cells of an edge
+	Output: True if any of the cells inside the map is an obstacle
+	"""
+	x = cells[:, 0]
+	y = cells[:, 1]
+	#cells outside the map can't hold obstacles
+	inside = (x >= 0) & (x < occupied.shape[1]) & (y >= 0) & (y < occupied.shape[0])
+
+	return bool(occupied[y[inside], x[inside]].any())
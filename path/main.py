@@ -1,38 +1,90 @@
-import pygame, sys, math, time #import all libraries necessary
+import pygame, sys, math, time, os #import all libraries necessary
 import numpy as np
 #import other files from path planning module
 from path import env
 from path import path_planning
-sys.setrecursionlimit(10000)
+from path import planners
+from map import grid
 
 
-def check_path(nodes, dims, screen):
+def load_occupancy(occupancy):
+	"""
+	Returns the occupancy grid shared by the map module
+	If no grid is given, the last snapshot of the map (saved when
+	the drone lands) is loaded instead, or the map bundled with
+	the repository if the drone hasn't landed yet
+	"""
+	if occupancy is None:
+		for directory in (grid.SNAPSHOT, grid.LEGACY):
+			if os.path.exists(directory):
+				return grid.OccupancyGrid.load(directory)
+
+		raise FileNotFoundError(f"No occupancy grid given and no map at {grid.SNAPSHOT} or {grid.LEGACY}")
+
+	return occupancy
+
+
+def check_path(nodes, dims, screen, occupancy=None):
 	"""
 	Checks if the remaining path collides with any obstacles
 	when a new obstacle is added to the map
-	Used while flying
+	Used while flying (no display is needed)
 	"""
-	#create objects for environment and path planning
-	environment = env.Environment(dims, screen, "map")
-	path = path_planning.RRT((900, 450), (1700, 800), environment.screen, environment.dims, environment.map_location)
-	environment.update_map() #update map to take into account any new obstacles
+	#create object for path planning (reads the obstacles from the grid)
+	path = path_planning.RRT((900, 450), (1700, 800), screen, dims, load_occupancy(occupancy))
 	nodes = [[nodes[i], nodes[i+1]] for i in range(len(nodes)) if i+1 < len(nodes)] #puts nodes in the form [parent, child]
 	for i in nodes:
-		collision = path.collide_obs(i[0], i[1]) #Checks for collision between nodes
+		if path.collide_obs(i[0], i[1]): #Checks for collision between nodes
+			return True
+
+	return False
+
+
+def write_path(path):
+	"""
+	Writes the traced path into the path.txt file
+	(from start to end)
+	"""
+	f = open("path/path.txt", "w+")
 
-		return collision
+	for i in reversed(path):
+		f.write(f"{i[0]},{i[1]}\n")
+	f.close()
 
 
-def main(start, end, dims, screen):
+def main(start, end, dims, screen, occupancy=None, display=True, planner="rrt"):
 	"""
 	Input: start position (usually drone's current position), end (destination), 
-	dims --> dimensions of the map, screen--> pygame's screen size
+	dims --> dimensions of the map, screen--> pygame's screen size,
+	occupancy --> occupancy grid shared with the map module (map.grid.OccupancyGrid),
+	display --> whether the search is drawn with pygame (False runs headless),
+	planner --> name of the path planning algorithm (see planners.PLANNERS),
+	or an incremental planner object to reuse
 	Output: writes to path.txt file with nodes of path foun 
+	(returns None and leaves path.txt as it was if no path was found)
 	"""
-	#generate objects for the environment and RRT classes
-	environment = env.Environment(dims, screen, "map")
-	path = path_planning.RRT(start, end, environment.screen, environment.dims, environment.map_location)
-	write = False
+	if isinstance(planner, str):
+		#generate object for the selected path planning algorithm
+		path = planners.PLANNERS[planner](start, end, screen, dims, load_occupancy(occupancy))
+	else:
+		#incremental planner kept between calls (e.g. planners.DStarLite),
+		#its search is reused from the drone's new position
+		path = planner
+		path.move(start)
+
+	if not display:
+		#plan without opening a pygame window
+		path.plan()
+		if not path.found:
+			return None
+
+		write_path(path.path)
+		print("Found path.")
+
+		return path.path
+
+	#generate object for the environment to draw the search
+	environment = env.Environment(dims, screen, path.occupancy)
 
 	while True:
 		environment.update_map()
@@ -45,24 +97,16 @@ def main(start, end, dims, screen):
 				sys.exit()
 
 
-
 		if not path.found:
-			nodes = path.new_node() #generates a new node radomly
-			select_nodes = path.select_node(nodes) #selects closest node to new node
-			#checks if the edge between these two nodes collide with an obstacle
-			collision = path.collide_obs(select_nodes[0], select_nodes[1])
-
+			#a new node is generated and joined to the closest node
+			select_nodes = path.step()
 
-			if not collision:
+			if select_nodes is not None:
 				#parent node, child node, and edge are drawn
 				environment.draw_node(select_nodes[0], (255, 0, 0)) 
 				environment.draw_node(select_nodes[1], (255, 0, 0))
 				environment.draw_edge(select_nodes, (255, 0, 0), 1)
 
-			else:
-				#Remove node from tree
-				path.tree.nodes.pop()
-
 
 		else:
 			if path.found:
@@ -70,11 +114,7 @@ def main(start, end, dims, screen):
 
 				if path.trace:
 					#writes the traced path into a text file
-					f = open("path/path.txt", "w+")
-
-					for i in reversed(path.path):
-						f.write(f"{i[0]},{i[1]}\n")
-					f.close()
+					write_path(path.path)
 
 					#draws the traced path's nodes and edges to represent the path found
 					for count, i in enumerate(path.path):
@@ -87,7 +127,7 @@ def main(start, end, dims, screen):
 					break
 
 				else:
-					path.traverse_tree(end) #tree is traversed to trace path
+					path.step() #tree is traversed to trace path
 
 
 
@@ -97,5 +137,8 @@ def main(start, end, dims, screen):
 
 		pygame.display.update()
 
+	return path.path
+
 if __name__ == "__main__":
-	main((1, 1), (450, 450), (100, 100), (500, 500))
+	occupancy = load_occupancy(None)
+	main((1, 1), (450, 450), occupancy.data.shape, (500, 500), occupancy)
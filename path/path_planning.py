@@ -1,5 +1,5 @@
-import numpy, random, math, pygame
-from path import env
+import numpy, random, math
+from path import collision
 
 class Node():
 	def __init__(self, parent, data):
@@ -8,10 +8,106 @@ class Node():
 		self.child = None
 
 
+class SpatialHash():
+	"""
+	Nearest-neighbour index for the nodes of the tree
+	Nodes are stored in square buckets of side cell_size, so
+	only the buckets around a point have to be searched
+	"""
+	def __init__(self, cell_size):
+		self.cell_size = cell_size
+		self.cells = {} #(i, j) bucket --> nodes inside it
+		#smallest and largest bucket indices used (bounds the search)
+		self.low = None
+		self.high = None
+
+	def key(self, point):
+		#bucket that a point falls into
+		return (math.floor(point[0]/self.cell_size), math.floor(point[1]/self.cell_size))
+
+	def insert(self, node):
+		k = self.key(node.data)
+		self.cells.setdefault(k, []).append(node)
+
+		if self.low is None:
+			self.low = list(k)
+			self.high = list(k)
+		else:
+			self.low = [min(self.low[0], k[0]), min(self.low[1], k[1])]
+			self.high = [max(self.high[0], k[0]), max(self.high[1], k[1])]
+
+	def remove(self, node):
+		k = self.key(node.data)
+		self.cells[k].remove(node)
+		if not self.cells[k]:
+			del self.cells[k]
+
+	def ring(self, k, r):
+		"""
+		Buckets at a Chebyshev distance of exactly r from bucket k
+		"""
+		if r == 0:
+			return [k]
+
+		keys = [(k[0]+i, k[1]+j) for i in (-r, r) for j in range(-r, r+1)]
+		keys += [(k[0]+i, k[1]+j) for i in range(-r+1, r) for j in (-r, r)]
+
+		return keys
+
+	def nearest(self, point):
+		"""
+		Input: position of a point
+		Output: node closest to the point
+
+		Rings of buckets are searched outwards until no bucket
+		left can hold a node closer than the best one found
+		"""
+		k = self.key(point)
+		best = None
+		best_distance = math.inf
+		#furthest ring that can hold any node
+		max_ring = max(abs(k[0]-self.low[0]), abs(k[0]-self.high[0]), abs(k[1]-self.low[1]), abs(k[1]-self.high[1]))
+
+		for r in range(0, max_ring+1):
+			for c in self.ring(k, r):
+				for node in self.cells.get(c, ()):
+					d = math.dist(node.data, point)
+					if d < best_distance:
+						best = node
+						best_distance = d
+
+			#any node in the next ring is at least r*cell_size away
+			if best is not None and best_distance <= r*self.cell_size:
+				break
+
+		return best
+
+	def near(self, point, radius):
+		"""
+		Input: position of a point and a radius
+		Output: nodes at a distance of radius or less from the point
+		"""
+		k = self.key(point)
+		rings = math.ceil(radius/self.cell_size)
+		nodes = []
+
+		for i in range(k[0]-rings, k[0]+rings+1):
+			for j in range(k[1]-rings, k[1]+rings+1):
+				for node in self.cells.get((i, j), ()):
+					if math.dist(node.data, point) <= radius:
+						nodes.append(node)
+
+		return nodes
+
+
+
 class Tree():
-	def __init__(self, root):
+	def __init__(self, root, cell_size):
 		self.root = Node(None, root)
 		self.nodes = [self.root]
+		#index used to find the closest node without checking every node
+		self.index = SpatialHash(cell_size)
+		self.index.insert(self.root)
 
 	def add_node(self, node):
 		"""
@@ -23,14 +119,32 @@ class Tree():
 			self.nodes[-1].child = node
 		
 		self.nodes.append(node) #add node to tree
+		self.index.insert(node) #keep the index up to date
 
 		return self.nodes
 
+	def pop_node(self):
+		"""
+		Removes the last node added to the tree
+		"""
+		node = self.nodes.pop()
+		self.index.remove(node)
+
+		return node
+
+	def nearest(self, point):
+		#closest node in the tree to the point
+		return self.index.nearest(point)
+
+	def near(self, point, radius):
+		#nodes in the tree around the point
+		return self.index.near(point, radius)
+
 
  
 
 class RRT():
-	def __init__(self, start, end, dims, grid, map_location):
+	def __init__(self, start, end, dims, grid, occupancy):
 		self.start = start
 		self.end = end
 		self.dims = dims
@@ -38,10 +152,15 @@ class RRT():
 		self.node = self.start #holds current node
 		self.found = False
 		self.trace = False
-		#create environment and tree objects
-		self.environment = env.Environment(grid, self.dims, map_location)
-		self.tree = Tree(start)
-		self.environment.update_map()
+		#occupancy grid shared with the map module (no pygame display needed)
+		self.occupancy = occupancy
+		#converts a position in the screen into a position in the grid
+		self.scale = (grid[0]/self.dims[0], grid[1]/self.dims[1])
+		self.version = None #version of the grid self.occupied was read from
+		self.occupied = None #boolean array, True at obstacles
+		#create tree object
+		self.tree = Tree(start, self.max_distance)
+		self.update_map()
 		self.trace_node = end
 		self.path = [] #queue holding nodes of final path
 
@@ -61,28 +180,29 @@ class RRT():
 
 		return (x, y)
 
-	def collide_obs(self, p1, p2):
+	def update_map(self):
 		"""
-		Checks if there is an obstacle between two nodes
-		Done by checking any black in the edge created by two nodes
+		Reads the obstacles from the occupancy grid
+		again only if the grid has changed
 		"""
-		collide = False
-		num_subpoints = 200
-
-		for i in range(0, num_subpoints+1):
-			#use interpolation to check all points between two nodes
-			u = i/num_subpoints
-			x = round(p1[0]*u + p2[0]*(1-u)) #interpolation formula for x and y values in edge
-			y = round(p1[1]*u + p2[1]*(1-u))
+		if self.version != self.occupancy.version:
+			self.occupied = self.occupancy.occupied()
+			self.version = self.occupancy.version
 
-			if 0 < x < self.dims[0] and 0 < y < self.dims[1]:
-				#checks if at the (x, y) pixel there is black
-				#which means there is an obstacle, therefore a collision
-				if self.environment.map.get_at((x, y)) == (0, 0, 0, 255):
-					collide = True
+		return self.occupied
 
+	def collide_obs(self, p1, p2):
+		"""
+		Checks if there is an obstacle between two nodes
+		Done by checking every cell of the grid crossed
+		by the edge created by two nodes
+		"""
+		self.update_map()
+		#turn both nodes into positions in the grid
+		p1 = (p1[0]*self.scale[0], p1[1]*self.scale[1])
+		p2 = (p2[0]*self.scale[0], p2[1]*self.scale[1])
 
-		return collide
+		return collision.collides(self.occupied, collision.segment_cells(p1, p2))
 
 
 	def select_node(self, new_node):
@@ -93,8 +213,8 @@ class RRT():
 		Output: adds new node to tree
 		"""
 
-		dists = [self.distance(i, new_node) for i in [x.data for x in self.tree.nodes]] #holds all distances from previous nodes to new node
-		self.node = self.tree.nodes[dists.index(min(dists))].data #selects the closest node
+		parent = self.tree.nearest(new_node) #selects the closest node (using the tree's index)
+		self.node = parent.data
 
 		#checks if selected node has reached the final node, and path has been found
 		if not self.collide_obs(self.node, self.end) and self.distance(self.node, self.end) <= self.max_distance*2:
@@ -107,36 +227,86 @@ class RRT():
 			#new node is moved at self.max_distance away, at the same angle
 			new_node = (self.node[0] + round(self.max_distance*math.cos(theta)), self.node[1] + round(self.max_distance*math.sin(theta)))
 
-		node = Node(self.node, new_node) #create new Node object
+		node = Node(parent, new_node) #create new Node object (holding a reference to its parent)
 		self.tree.add_node(node) #add node to the tree
 
 		return self.node, new_node
 
 
 
-	def traverse_tree(self, trace_node):
+	def traverse_tree(self, trace_node=None):
 		"""
-		Traces path by finding each node's parent
+		Traces path by following each node's parent
 		(starts from end node) until it reaches the
 		start node
 		self.path holds the actual positions of the
 		nodes of the final path
-		Input: current node
+		Input: node to start tracing from (by default,
+		the last node added, which holds the end position)
+		Output: positions of the path as an array (from end to start)
+		"""
+		if trace_node is None:
+			trace_node = self.tree.nodes[-1]
+
+		path = []
+		#the root is the only node without a parent, so the
+		#path has been traced once it has been reached
+		while trace_node is not None:
+			path.append(trace_node.data) #enqueue node's position
+			trace_node = trace_node.parent #set trace node as it's parent
 
+		self.path = numpy.array(path)
+		self.trace = True
+
+		return self.path
+
+
+
+	def step(self):
+		"""
+		Runs one iteration of the algorithm:
+		a new node is added to the tree, or once the end
+		has been reached, the path is traced
+		Output: parent and child nodes added (None if
+		the node collided or the path is being traced)
 		"""
-		#base case: if trace_node is the same as the initial node,
-		#it means that the path has been traced
-		if trace_node == self.tree.root.data:
-			self.path.append(self.tree.root.data)
-			self.trace = True
+		if self.found:
+			self.traverse_tree() #tree is traversed to trace path
+			return None
 
-		else:
-			for n in self.tree.nodes:
-				if n.data == trace_node:
-					self.path.append(n.data) #enqueue node's position
-					trace_node = n.parent #set trace node as it's parent
-					self.traverse_tree(trace_node)
+		nodes = self.new_node() #generates a new node radomly
+		select_nodes = self.select_node(nodes) #selects closest node to new node
 
+		#checks if the edge between these two nodes collide with an obstacle
+		if self.collide_obs(select_nodes[0], select_nodes[1]):
+			#Remove node from tree
+			self.tree.pop_node()
+			return None
+
+		return select_nodes
+
+
+	def plan(self, max_iterations=20000):
+		"""
+		Runs the algorithm without displaying it
+		until the path has been traced
+		max_iterations --> gives up after that many iterations (None never gives up),
+		so an end that can't be reached doesn't run forever
+		Output: nodes of the path (from end to start), empty if no path was found
+		"""
+		iterations = 0
+		while not self.trace:
+			if max_iterations is not None and iterations >= max_iterations:
+				if self.found:
+					#the end has been reached, the path is traced as it is
+					self.traverse_tree()
+				else:
+					print("No path found.")
+				break
+			self.step()
+			iterations += 1
+
+		return self.path
 
 
 
@@ -0,0 +1,633 @@
+"""
+Path planning algorithms that can be used instead of the RRT
+Input:
+- start and end positions in the screen
+- occupancy grid shared with the map module
+Output:
+- nodes of the path found (from end to start, like RRT.path)
+
+Every planner has the same interface as path_planning.RRT:
+Planner(start, end, dims, grid, occupancy), .step(), .plan(),
+.found, .trace and .path, so path.main can use any of them
+"""
+
+import heapq, math
+import numpy as np
+from path import collision
+from path import path_planning
+from map import tiles
+
+
+
+class GridPlanner():
+	"""
+	Parent class of the planners that search the cells
+	of the occupancy grid directly (A* and Theta*)
+	"""
+	def __init__(self, start, end, dims, grid, occupancy):
+		self.start = start
+		self.end = end
+		self.dims = dims #dimensions of the screen
+		self.occupancy = occupancy #occupancy grid shared with the map module
+		#converts a position in the screen into a position in the grid
+		self.scale = (grid[0]/self.dims[0], grid[1]/self.dims[1])
+		self.found = False
+		self.trace = False
+		self.path = [] #queue holding nodes of final path
+		self.expanded = 0 #number of cells expanded by the search
+
+
+	def to_cell(self, pos):
+		"""
+		Input: position in the screen
+		Output: (x, y) cell of the grid holding that position
+		"""
+		shape = self.occupancy.data.shape
+		x = min(max(int(pos[0]*self.scale[0]), 0), shape[1]-1)
+		y = min(max(int(pos[1]*self.scale[1]), 0), shape[0]-1)
+
+		return (x, y)
+
+
+	def to_screen(self, cell):
+		"""
+		Input: (x, y) cell of the grid
+		Output: position of the centre of the cell in the screen
+		(not rounded, a rounded centre can fall in a neighbouring cell)
+		"""
+		return ((cell[0]+0.5)/self.scale[0], (cell[1]+0.5)/self.scale[1])
+
+
+	def collides(self, p1, p2, occupied):
+		#checks if the edge between two positions in the screen crosses an obstacle
+		p1 = (p1[0]*self.scale[0], p1[1]*self.scale[1])
+		p2 = (p2[0]*self.scale[0], p2[1]*self.scale[1])
+
+		return collision.collides(occupied, collision.segment_cells(p1, p2))
+
+
+	def prune(self, nodes, occupied):
+		"""
+		Input: nodes of a path in the screen (the edges between them are clear)
+		Output: the nodes that can't be skipped: a node is removed if
+		there is a line of sight between the nodes before and after it
+		(collinear nodes and the steps of a staircase)
+		"""
+		pruned = [nodes[0]]
+
+		for i in range(1, len(nodes)-1):
+			#the last node kept has to see the next one to skip node i
+			if self.collides(pruned[-1], nodes[i+1], occupied):
+				pruned.append(nodes[i])
+
+		pruned.append(nodes[-1])
+
+		return pruned
+
+
+	def neighbours(self, cell, occupied):
+		"""
+		Input: cell and boolean occupancy array
+		Output: free neighbouring cells (8-connected) and the cost to move to them
+		Diagonal moves are only allowed if they don't cut an obstacle's corner
+		"""
+		x, y = cell
+		h, w = occupied.shape
+		cells = []
+
+		for dx in (-1, 0, 1):
+			for dy in (-1, 0, 1):
+				nx, ny = x+dx, y+dy
+				if (dx == 0 and dy == 0) or not (0 <= nx < w and 0 <= ny < h) or occupied[ny, nx]:
+					continue
+				if dx != 0 and dy != 0 and (occupied[y, nx] or occupied[ny, x]):
+					continue
+
+				cells.append(((nx, ny), math.hypot(dx, dy)))
+
+		return cells
+
+
+	def heuristic(self, cell, end):
+		#octile distance (exact distance with no obstacles on an 8-connected grid)
+		dx = abs(cell[0]-end[0])
+		dy = abs(cell[1]-end[1])
+
+		return max(dx, dy) + (math.sqrt(2)-1)*min(dx, dy)
+
+
+	def update(self, cell, n, cost, g, parent, occupied):
+		"""
+		Input: expanded cell, neighbouring cell n and the cost to move to n
+		Output: cost to reach n through cell, and the parent n would have
+		"""
+		return g[cell] + cost, cell
+
+
+	def check(self, cell, g, parent, closed, occupied):
+		"""
+		Called once a cell is taken from the open list, before
+		it is expanded (used by Theta* to verify its parent)
+		"""
+		pass
+
+
+	def search(self, occupied, start, end):
+		"""
+		Searches the grid from start to end using a binary heap
+		as the open list
+		Output: cells of the path (from start to end), None if there is no path
+		"""
+		g = {start: 0}
+		parent = {start: None}
+		#(f, counter, cell) --> counter breaks ties in insertion order
+		heap = [(self.heuristic(start, end), 0, start)]
+		closed = set()
+		count = 1
+
+		while heap:
+			_, _, cell = heapq.heappop(heap)
+
+			if cell in closed:
+				continue
+			self.check(cell, g, parent, closed, occupied)
+			closed.add(cell)
+			self.expanded += 1
+
+			if cell == end:
+				#backtrack through the parents
+				cells = []
+				while cell is not None:
+					cells.append(cell)
+					cell = parent[cell]
+
+				return cells[::-1]
+
+			for n, cost in self.neighbours(cell, occupied):
+				if n in closed:
+					continue
+
+				new_g, new_parent = self.update(cell, n, cost, g, parent, occupied)
+				if new_g < g.get(n, math.inf):
+					g[n] = new_g
+					parent[n] = new_parent
+					heapq.heappush(heap, (new_g + self.heuristic(n, end), count, n))
+					count += 1
+
+		return None
+
+
+	def plan(self):
+		"""
+		Runs the search over the current occupancy grid
+		Output: nodes of the path in the screen (from end to start),
+		empty if there is no path (self.found stays False)
+		"""
+		start = self.to_cell(self.start)
+		end = self.to_cell(self.end)
+
+		occupied = self.occupancy.occupied()
+		cells = self.search(occupied, start, end)
+		self.trace = True
+
+		if cells is None:
+			print("No path found.")
+			self.path = np.zeros((0, 2))
+			self.found = False
+
+			return self.path
+
+		#the exact start and end positions are added around the centres of
+		#the cells, the cells of the staircase that can be skipped are then removed
+		nodes = self.prune([self.start] + [self.to_screen(c) for c in cells] + [self.end], occupied)
+
+		self.path = np.array(nodes[::-1], dtype=float)
+		self.found = True
+
+		return self.path
+
+
+	def step(self):
+		"""
+		The search is done in one go, so a step
+		runs the whole algorithm
+		"""
+		if not self.trace:
+			self.plan()
+
+		return None
+
+
+
+class AStar(GridPlanner):
+	"""
+	A* over the 8-connected grid (inherits the search from GridPlanner)
+	"""
+	pass
+
+
+
+class Hierarchical(AStar):
+	"""
+	A* over two levels of the grid, for large areas: a path is first
+	found between tiles of the coarse level (map.tiles.TileMap) and
+	then refined with A* on the cells of the tiles around that path
+	only, so most of the free space is never expanded
+	Falls back to a search of the whole grid if the corridor is blocked
+
+	Slower than AStar on path.benchmark's maps (the coarse search and
+	the corridor cost more than the cells they save), so the Drone
+	doesn't select it
+	"""
+	def __init__(self, start, end, dims, grid, occupancy, tile=16):
+		AStar.__init__(self, start, end, dims, grid, occupancy)
+		self.tile = tile #side of a tile in cells
+		self.tiles = None #coarse level, rebuilt when the grid changes
+
+
+	def corridor(self, path, shape):
+		"""
+		Input: tiles of the coarse path and shape of the coarse level
+		Output: slices of the grid covering the tiles of the path and
+		their neighbours, and a boolean array True at those cells
+		"""
+		coarse = np.zeros(shape, bool)
+		for tx, ty in path:
+			coarse[max(ty-1, 0):ty+2, max(tx-1, 0):tx+2] = True
+
+		ty, tx = np.nonzero(coarse)
+		y0, y1 = ty.min(), ty.max()+1
+		x0, x1 = tx.min(), tx.max()+1
+		#every tile is expanded into its cells
+		cells = np.kron(coarse[y0:y1, x0:x1], np.ones((self.tile, self.tile), bool))
+
+		h, w = self.occupancy.data.shape
+		window = (slice(y0*self.tile, min(y1*self.tile, h)), slice(x0*self.tile, min(x1*self.tile, w)))
+
+		return window, cells[:window[0].stop-window[0].start, :window[1].stop-window[1].start]
+
+
+	def search(self, occupied, start, end):
+		if self.tiles is None or self.tiles.version != self.occupancy.version:
+			self.tiles = tiles.TileMap.from_grid(self.occupancy, self.tile)
+
+		#coarse level: tiles mostly covered by obstacles are avoided first,
+		#then only the tiles completely covered by obstacles are blocked
+		for blocked in (self.tiles.blocked(0.5), self.tiles.blocked()):
+			coarse = AStar.search(self, blocked, (start[0]//self.tile, start[1]//self.tile), (end[0]//self.tile, end[1]//self.tile))
+			if coarse is None:
+				continue
+
+			window, cells = self.corridor(coarse, blocked.shape)
+			y0, x0 = window[0].start, window[1].start
+			#cells outside the corridor are treated as obstacles
+			path = AStar.search(self, occupied[window] | ~cells, (start[0]-x0, start[1]-y0), (end[0]-x0, end[1]-y0))
+
+			if path is not None:
+				return [(x+x0, y+y0) for x, y in path]
+
+		return AStar.search(self, occupied, start, end)
+
+
+
+class ThetaStar(GridPlanner):
+	"""
+	Any-angle version of A*: a cell can take the parent of the
+	expanded cell as its own parent if there is a line of sight
+	between them, so the path isn't restricted to 45 degree turns
+
+	The line of sight is only checked once a cell is expanded
+	(Lazy Theta*), so there is one check per cell rather than
+	one for every neighbour
+	"""
+	def heuristic(self, cell, end):
+		#straight line distance, since paths can have any angle
+		return math.dist(cell, end)
+
+
+	def line_of_sight(self, a, b, occupied):
+		#checks that the segment between the centres of both cells is free
+		cells = collision.segment_cells((a[0]+0.5, a[1]+0.5), (b[0]+0.5, b[1]+0.5))
+
+		return not collision.collides(occupied, cells)
+
+
+	def update(self, cell, n, cost, g, parent, occupied):
+		p = parent[cell]
+		if p is not None:
+			#assume n can be reached straight from the parent of the
+			#expanded cell (checked when n is expanded)
+			return g[p] + math.dist(p, n), p
+
+		return g[cell] + cost, cell
+
+
+	def check(self, cell, g, parent, closed, occupied):
+		p = parent[cell]
+		if p is None or self.line_of_sight(p, cell, occupied):
+			return
+
+		#no line of sight, so the best expanded neighbour is used as the parent
+		g[cell] = math.inf
+		for n, cost in self.neighbours(cell, occupied):
+			if n in closed and g[n] + cost < g[cell]:
+				g[cell] = g[n] + cost
+				parent[cell] = n
+
+
+
+class RRTStar(path_planning.RRT):
+	"""
+	RRT that chooses the cheapest parent for every new node and
+	rewires the nodes around it, so the path gets shorter as
+	the tree grows
+	"""
+	def __init__(self, start, end, dims, grid, occupancy, refine=500):
+		path_planning.RRT.__init__(self, start, end, dims, grid, occupancy)
+		self.radius = self.max_distance*2 #radius of the neighbourhood searched for parents
+		self.refine = refine #iterations run after reaching the end to shorten the path
+		self.iterations = 0
+		self.end_node = None #node holding the end position
+
+
+	def traverse_tree(self, trace_node=None):
+		#the path is traced from the node holding the end by default
+		#(the last node added isn't always that node)
+		return path_planning.RRT.traverse_tree(self, trace_node or self.end_node)
+
+
+	def cost(self, node):
+		"""
+		Length of the path from the root to the node
+		(found through the parents, so rewired nodes are always up to date)
+		"""
+		cost = 0
+		while node.parent is not None:
+			cost += math.dist(node.data, node.parent.data)
+			node = node.parent
+
+		return cost
+
+
+	def steer(self, node, point):
+		"""
+		Moves point at self.max_distance away from node (at the same angle)
+		if it is further away than that
+		"""
+		if math.dist(node, point) <= self.max_distance:
+			return point
+
+		theta = math.atan2((point[1]-node[1]), (point[0]-node[0]))
+
+		return (node[0] + round(self.max_distance*math.cos(theta)), node[1] + round(self.max_distance*math.sin(theta)))
+
+
+	def step(self):
+		"""
+		Runs one iteration of the algorithm
+		Output: parent and child nodes added (None if no node was added)
+		"""
+		if self.found and self.iterations >= self.refine:
+			self.traverse_tree(self.end_node) #tree is traversed to trace path
+			return None
+		if self.found:
+			self.iterations += 1
+
+		sample = self.new_node() #generates a new node radomly
+		new_node = self.steer(self.tree.nearest(sample).data, sample)
+		#the end node is only connected to through the check below
+		near = [n for n in self.tree.near(new_node, self.radius) if n is not self.end_node]
+
+		#choose the parent that gives the shortest path to the new node
+		costs = sorted((self.cost(n) + math.dist(n.data, new_node), count, n) for count, n in enumerate(near))
+		parent = None
+		for cost, _, n in costs:
+			if not self.collide_obs(n.data, new_node):
+				parent = n
+				break
+
+		if parent is None:
+			return None
+
+		node = path_planning.Node(parent, new_node)
+		self.tree.add_node(node)
+		self.node = parent.data
+
+		#rewire the neighbours through the new node if their path gets shorter
+		for n in near:
+			if n is parent:
+				continue
+			if cost + math.dist(new_node, n.data) < self.cost(n) and not self.collide_obs(new_node, n.data):
+				n.parent = node
+
+		#connect to the end (or shorten the connection to it)
+		if math.dist(new_node, self.end) <= self.max_distance*2 and not self.collide_obs(new_node, self.end):
+			if self.end_node is None:
+				self.end_node = path_planning.Node(node, self.end)
+				self.tree.add_node(self.end_node)
+				print("Found")
+				self.found = True
+			elif cost + math.dist(new_node, self.end) < self.cost(self.end_node):
+				self.end_node.parent = node
+
+		return parent.data, new_node
+
+
+
+class DStarLite(GridPlanner):
+	"""
+	Incremental planner (D* Lite) that keeps its search between calls
+	The search runs from the end back to the drone, so when the drone
+	moves or new obstacles are added, only the cells whose cost has
+	changed are searched again instead of planning from scratch
+	"""
+	def __init__(self, start, end, dims, grid, occupancy):
+		GridPlanner.__init__(self, start, end, dims, grid, occupancy)
+		self.g = {} #cost from each cell to the end
+		self.rhs = {} #one-step lookahead of self.g
+		self.queue = [] #binary heap holding (key, counter, cell)
+		self.open = {} #cell --> current key (entries in self.queue with another key are outdated)
+		self.count = 0
+		self.km = 0 #accumulated heuristic offset as the drone moves
+		self.last = None #cell the drone was at when last planned
+		self.goal = None
+		self.seen = None #version of Map.obs already processed
+		self.blocked = None #obstacles known by the search (list of rows)
+
+
+	def cells_around(self, cell):
+		#cells of the grid neighbouring cell (8-connected)
+		h, w = self.occupancy.data.shape
+
+		return [(cell[0]+dx, cell[1]+dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+				if (dx != 0 or dy != 0) and 0 <= cell[0]+dx < w and 0 <= cell[1]+dy < h]
+
+
+	def cost(self, u, s):
+		"""
+		Cost of moving from cell u to the neighbouring cell s
+		(same rules as GridPlanner.neighbours)
+		"""
+		blocked = self.blocked
+		if blocked[s[1]][s[0]]:
+			return math.inf
+		if s[0] != u[0] and s[1] != u[1] and (blocked[u[1]][s[0]] or blocked[s[1]][u[0]]):
+			return math.inf
+
+		return math.hypot(s[0]-u[0], s[1]-u[1])
+
+
+	def refresh(self):
+		#reads the obstacles from the occupancy grid (as lists, faster to index one by one)
+		self.blocked = self.occupancy.occupied().tolist()
+
+
+	def key(self, cell):
+		k = min(self.g.get(cell, math.inf), self.rhs.get(cell, math.inf))
+
+		#keys are rounded so that equal costs summed in a different
+		#order compare as equal (the second value breaks the tie)
+		return (round(k + self.heuristic(self.last, cell) + self.km, 9), round(k, 9))
+
+
+	def push(self, cell):
+		k = self.key(cell)
+		self.open[cell] = k
+		heapq.heappush(self.queue, (k, self.count, cell))
+		self.count += 1
+
+
+	def top(self):
+		#removes outdated entries until the top of the heap is valid
+		while self.queue and self.open.get(self.queue[0][2]) != self.queue[0][0]:
+			heapq.heappop(self.queue)
+
+		return self.queue[0][0] if self.queue else (math.inf, math.inf)
+
+
+	def update_queue(self, u):
+		self.open.pop(u, None)
+		if self.g.get(u, math.inf) != self.rhs.get(u, math.inf):
+			self.push(u)
+
+
+	def update_vertex(self, u):
+		#recalculates rhs of u from all its neighbours
+		if u != self.goal:
+			self.rhs[u] = min([self.cost(u, s) + self.g.get(s, math.inf) for s in self.cells_around(u)], default=math.inf)
+
+		self.update_queue(u)
+
+
+	def compute_shortest_path(self):
+		start = self.last
+
+		while self.top() < self.key(start) or self.rhs.get(start, math.inf) != self.g.get(start, math.inf):
+			if not self.queue:
+				break
+
+			k_old, _, u = heapq.heappop(self.queue)
+			del self.open[u]
+			self.expanded += 1
+			k_new = self.key(u)
+
+			if k_old < k_new:
+				#key is outdated (the drone has moved)
+				self.push(u)
+			elif self.g.get(u, math.inf) > self.rhs[u]:
+				#cost to the end has decreased, neighbours can only improve through u
+				self.g[u] = self.rhs[u]
+				for s in self.cells_around(u):
+					if s != self.goal:
+						self.rhs[s] = min(self.rhs.get(s, math.inf), self.cost(s, u) + self.g[u])
+					self.update_queue(s)
+			else:
+				#cost to the end has increased, neighbours that went
+				#through u have to find their best neighbour again
+				g_old = self.g.get(u, math.inf)
+				self.g[u] = math.inf
+				for s in self.cells_around(u) + [u]:
+					if s == u or self.rhs.get(s, math.inf) == self.cost(s, u) + g_old:
+						self.update_vertex(s)
+					else:
+						self.update_queue(s)
+
+
+	def move(self, start):
+		"""
+		Input: new position of the drone in the screen
+		The search is kept, the path is traced again on the next plan()
+		"""
+		self.start = start
+		self.found = False
+		self.trace = False
+
+
+	def update_obs(self, obs):
+		"""
+		Input: set of obstacle cells (Map.obs, a map.grid.ObstacleSet)
+		Only the cells added since the last call are processed: the cost
+		of every edge next to them has changed, so their neighbours are updated
+		"""
+		if self.seen is None or self.goal is None:
+			#cells added before the first search are already in the grid
+			self.seen = obs.version
+			return
+
+		changed = obs.changed_since(self.seen)
+		self.seen = obs.version
+		self.refresh()
+
+		if changed is None:
+			#too many changes to repair, search from scratch on the next plan()
+			self.goal = None
+			return
+
+		for cell in map(tuple, changed.tolist()):
+			for u in [cell] + self.cells_around(cell):
+				self.update_vertex(u)
+
+
+	def search(self, occupied, start, end):
+		"""
+		Output: cells of the path (from start to end), None if there is no path
+		"""
+		if self.goal != end:
+			#first search (or the end has changed), start from scratch
+			self.refresh()
+			self.g, self.rhs, self.open, self.queue = {}, {end: 0}, {}, []
+			self.km = 0
+			self.goal = end
+			self.last = start
+			self.push(end)
+		else:
+			self.km += self.heuristic(self.last, start)
+			self.last = start
+
+		self.compute_shortest_path()
+
+		if self.g.get(start, math.inf) == math.inf:
+			return None
+
+		#follow the cheapest neighbour from the drone to the end
+		cells = [start]
+		while cells[-1] != end and len(cells) <= occupied.size:
+			u = cells[-1]
+			cells.append(min(self.cells_around(u), key=lambda s: self.cost(u, s) + self.g.get(s, math.inf)))
+
+		return cells
+
+
+
+#planners that keep their search between calls (see DStarLite)
+INCREMENTAL = {"dstar_lite"}
+
+#planners that can be selected by name (e.g. Drone.planner)
+PLANNERS = {
+	"rrt": path_planning.RRT,
+	"rrt_star": RRTStar,
+	"astar": AStar,
+	"hierarchical": Hierarchical,
+	"theta_star": ThetaStar,
+	"dstar_lite": DStarLite,
+}
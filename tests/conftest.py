@@ -0,0 +1,23 @@
+import pytest
+
+
+
+@pytest.fixture
+def list_source():
+	"""
+	Frame sources that return the images given, then end once they run out:
+	False finishes the source, None keeps it waiting for images (like a stream)
+	"""
+	#imported here, so only the tests using it need OpenCV
+	from camera import frames
+
+	class ListSource(frames.FrameSource):
+		def __init__(self, images, buffer=4, end=False):
+			frames.FrameSource.__init__(self, buffer)
+			self.images = list(images)
+			self.end = end
+
+		def read(self):
+			return self.images.pop(0) if self.images else self.end
+
+	return ListSource
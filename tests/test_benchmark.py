@@ -0,0 +1,45 @@
+import math, os
+import numpy as np
+from scipy import ndimage
+from path import benchmark
+
+
+
+def test_path_metrics():
+	#an L shaped path, 10 cells long with one right angle turn
+	length, turns = benchmark.path_metrics(np.array([(0, 0), (25, 0), (25, 25)]) * 1.0)
+
+	assert math.isclose(length, 10)
+	assert math.isclose(turns, math.pi/2)
+
+
+
+def test_pairs_are_connected():
+	rng = np.random.default_rng(0)
+	occupancy = benchmark.random_map(40, 0.3, rng)
+	labels, _ = ndimage.label(~occupancy.occupied())
+
+	for start, end in benchmark.get_pairs(occupancy, 10, rng):
+		s = labels[int(start[1]/benchmark.SCALE), int(start[0]/benchmark.SCALE)]
+		e = labels[int(end[1]/benchmark.SCALE), int(end[0]/benchmark.SCALE)]
+		assert s != 0 and s == e
+
+
+
+def test_bundled_maps_load():
+	for f in os.listdir(benchmark.MAPS):
+		occupancy = benchmark.load_map(os.path.join(benchmark.MAPS, f), 50)
+		assert occupancy.data.shape == (50, 50)
+		assert 0 < occupancy.occupied().mean() < 1
+
+
+
+def test_every_planner_finds_the_pairs():
+	rng = np.random.default_rng(1)
+	occupancy = benchmark.random_map(30, 0.15, rng)
+	pairs = benchmark.get_pairs(occupancy, 3, rng)
+
+	for name in ("astar", "theta_star", "dstar_lite", "hierarchical", "rrt"):
+		result = benchmark.benchmark(name, occupancy, pairs, 20000, 0, None)
+		assert result["failed"] == 0, name
+		assert result["time_p50"] > 0 and result["length_p50"] > 0
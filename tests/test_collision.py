@@ -0,0 +1,96 @@
+import numpy as np
+from map import grid
+from path import collision
+from path import path_planning
+
+
+
+def brute_force(p1, p2):
+	"""
+	Every cell [x, x+1) x [y, y+1) the segment covers a part of (of
+	any length), plus the cells holding both ends
+	"""
+	p1, p2 = np.asarray(p1, float), np.asarray(p2, float)
+	d = p2 - p1
+	cells = {tuple(np.floor(p1).astype(int)), tuple(np.floor(p2).astype(int))}
+
+	lo = np.floor(np.minimum(p1, p2)).astype(int) - 1
+	hi = np.floor(np.maximum(p1, p2)).astype(int) + 1
+	for x in range(lo[0], hi[0]+1):
+		for y in range(lo[1], hi[1]+1):
+			#part of the segment inside the closed cell (Liang-Barsky)
+			t0, t1 = 0.0, 1.0
+			for axis, (a, b) in enumerate(((x, x+1), (y, y+1))):
+				if d[axis] == 0:
+					if not a <= p1[axis] <= b:
+						t0, t1 = 1, 0
+				else:
+					ta, tb = sorted(((a - p1[axis]) / d[axis], (b - p1[axis]) / d[axis]))
+					t0, t1 = max(t0, ta), min(t1, tb)
+			if t1 > t0 and tuple(np.floor(p1 + (t0+t1)/2*d).astype(int)) == (x, y):
+				cells.add((x, y))
+
+	return cells
+
+
+
+def test_end_on_a_grid_line_is_included():
+	cells = collision.segment_cells((0, 0), (3, 0))
+
+	assert [tuple(c) for c in cells] == [(0, 0), (1, 0), (2, 0), (3, 0)]
+	assert [tuple(c) for c in collision.segment_cells((3, 0), (0, 0))] == [(3, 0), (2, 0), (1, 0), (0, 0)]
+
+
+
+def test_matches_brute_force():
+	rng = np.random.default_rng(0)
+
+	for i in range(400):
+		if i % 2:
+			#ends on grid lines (like RRT nodes every 5 pixels)
+			p1, p2 = rng.integers(0, 12, 2), rng.integers(0, 12, 2)
+		else:
+			p1, p2 = rng.uniform(0, 12, 2), rng.uniform(0, 12, 2)
+
+		cells = collision.segment_cells(p1, p2)
+		assert {tuple(c) for c in cells.tolist()} == brute_force(p1, p2)
+		#cells are in order, every one next to the previous one
+		assert np.all(np.abs(np.diff(cells, axis=0)).max(axis=1, initial=1) <= 1)
+
+
+
+def test_zero_length_edge():
+	assert collision.segment_cells((2.5, 3.5), (2.5, 3.5)).tolist() == [[2, 3]]
+
+
+
+def test_collides_ignores_cells_outside_the_map():
+	occupied = np.zeros((4, 4), bool)
+	occupied[1, 2] = True
+
+	assert collision.collides(occupied, np.array([[2, 1]]))
+	assert not collision.collides(occupied, np.array([[-1, 0], [4, 4], [0, 0]]))
+
+
+
+def test_rrt_node_on_a_grid_line_is_checked():
+	#an obstacle only in the cell holding the end of the edge
+	occupancy = grid.OccupancyGrid((100, 100))
+	occupancy.mark([(10, 4)])
+	rrt = path_planning.RRT((0, 20), (450, 450), (500, 500), (100, 100), occupancy)
+
+	assert rrt.collide_obs((25, 20), (50, 20))
+
+
+
+def test_rrt_gives_up_on_an_unreachable_end():
+	occupancy = grid.OccupancyGrid((100, 100))
+	#the end is walled in
+	occupancy.data[80:100, 80] = grid.OBSTACLE
+	occupancy.data[80, 80:100] = grid.OBSTACLE
+	rrt = path_planning.RRT((10, 10), (450, 450), (500, 500), (100, 100), occupancy)
+
+	path = rrt.plan(max_iterations=300)
+
+	assert not rrt.found
+	assert len(path) == 0
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+cv2 = pytest.importorskip("cv2")
+from threats import detector
+
+
+
+class Cascade():
+	#records the images detection runs on and returns fixed rects (x, y, w, h)
+	def __init__(self, rects):
+		self.rects = rects
+		self.images = []
+
+	def detectMultiScale(self, img, scale_factor, min_neighbours, minSize, maxSize):
+		self.images.append(img)
+		return self.rects
+
+
+
+def fake_detector(rects, downscale=1.0):
+	#detector around a cascade that doesn't need the model (or cv2.CascadeClassifier)
+	d = detector.Detector.__new__(detector.Detector)
+	d.cascade = Cascade(rects)
+	d.scale_factor, d.min_neighbours, d.downscale = 1.2, 8, downscale
+	d.gray = d.small = None
+
+	return d
+
+
+
+def test_detection_centre():
+	assert detector.Detection(10, 20, 30, 40).centre == (25, 40)
+
+
+
+def test_rects_are_read_as_x_y_w_h():
+	d = fake_detector([(10, 20, 30, 60)])
+	found = d.detect(np.zeros((120, 160, 3), np.uint8))
+
+	assert found == [detector.Detection(10, 20, 30, 60)]
+	assert found[0].w == 30 and found[0].h == 60
+
+
+
+def test_downscale_and_roi_map_back_to_the_frame():
+	d = fake_detector([(5, 10, 15, 15)], downscale=0.5)
+	frame = np.zeros((120, 160, 3), np.uint8)
+	found = d.detect(frame, roi=(40, 20, 80, 60))
+
+	assert d.cascade.images[0].shape == (30, 40)
+	assert found == [detector.Detection(50, 40, 30, 30)]
+
+
+
+def test_buffers_are_reused_between_frames():
+	d = fake_detector([], downscale=0.5)
+	frame = np.zeros((120, 160, 3), np.uint8)
+	d.detect(frame)
+	gray, small = d.gray, d.small
+	d.detect(np.full((120, 160, 3), 255, np.uint8))
+
+	assert d.gray is gray and d.small is small
+	assert d.small.shape == (60, 80) and np.all(d.small == 255)
+
+
+
+def test_roi_outside_the_frame_finds_nothing():
+	d = fake_detector([(0, 0, 5, 5)])
+
+	assert d.detect(np.zeros((50, 50, 3), np.uint8), roi=(60, 60, 10, 10)) == []
+	assert d.cascade.images == []
+
+
+
+@pytest.mark.skipif(not hasattr(cv2, "CascadeClassifier"), reason="cv2 was built without CascadeClassifier")
+def test_model_loads():
+	d = detector.Detector()
+
+	assert d.detect(np.zeros((120, 160, 3), np.uint8)) == []
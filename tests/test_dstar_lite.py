@@ -0,0 +1,86 @@
+import math
+import numpy as np
+from map import grid
+from path import planners
+
+
+
+def cost(cells):
+	return sum(math.dist(a, b) for a, b in zip(cells[:-1], cells[1:]))
+
+
+
+def astar_cost(occupancy, start, end):
+	cells = planners.AStar((0, 0), (0, 0), (200, 200), (40, 40), occupancy).search(occupancy.occupied(), start, end)
+
+	return None if cells is None else cost(cells)
+
+
+
+def test_replans_match_astar_after_new_obstacles():
+	rng = np.random.default_rng(3)
+
+	for _ in range(20):
+		occupancy = grid.OccupancyGrid((40, 40))
+		obs = grid.ObstacleSet((40, 40))
+		start, end = (2, 2), (37, 37)
+		dstar = planners.DStarLite((12, 12), (187, 187), (200, 200), (40, 40), occupancy)
+		dstar.update_obs(obs)
+		dstar.search(occupancy.occupied(), start, end)
+
+		for _ in range(5):
+			#new obstacles are seen and the drone moves along the path
+			cells = rng.integers(0, 40, (30, 2))
+			cells = cells[~np.all(cells == end, axis=1)]
+			occupancy.mark(cells)
+			obs.add(cells)
+			start = (min(start[0] + int(rng.integers(0, 3)), 36), start[1])
+			occupancy.data[start[1], start[0]] = grid.FREE
+			obs.remove([start])
+
+			dstar.update_obs(obs)
+			path = dstar.search(occupancy.occupied(), start, end)
+			expected = astar_cost(occupancy, start, end)
+
+			if expected is None:
+				assert path is None
+			else:
+				assert path[0] == start and path[-1] == end
+				assert math.isclose(cost(path), expected)
+				assert not occupancy.occupied()[[c[1] for c in path], [c[0] for c in path]].any()
+
+
+
+def test_obstacles_away_from_the_path_are_cheap_to_repair():
+	occupancy = grid.OccupancyGrid((60, 60))
+	obs = grid.ObstacleSet((60, 60))
+	dstar = planners.DStarLite((0, 0), (0, 0), (300, 300), (60, 60), occupancy)
+	dstar.update_obs(obs)
+	path = dstar.search(occupancy.occupied(), (2, 2), (57, 57))
+	first = dstar.expanded
+
+	far = [(5, 50), (6, 50), (50, 5)]
+	occupancy.mark(far)
+	obs.add(far)
+	dstar.update_obs(obs)
+
+	assert dstar.search(occupancy.occupied(), (2, 2), (57, 57)) == path
+	assert dstar.expanded - first < 10
+
+
+
+def test_too_many_changes_search_from_scratch():
+	occupancy = grid.OccupancyGrid((20, 20))
+	obs = grid.ObstacleSet((20, 20), history=2)
+	dstar = planners.DStarLite((0, 0), (0, 0), (100, 100), (20, 20), occupancy)
+	dstar.update_obs(obs)
+	dstar.search(occupancy.occupied(), (1, 1), (18, 18))
+
+	for x in range(5):
+		occupancy.mark([(x+5, 10)])
+		obs.add([(x+5, 10)])
+	dstar.update_obs(obs)
+
+	assert dstar.goal is None
+	path = dstar.search(occupancy.occupied(), (1, 1), (18, 18))
+	assert math.isclose(cost(path), astar_cost(occupancy, (1, 1), (18, 18)))
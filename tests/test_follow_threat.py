@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+from threats import detector
+from threats import follow_threat
+
+
+
+class Detector():
+	#returns the detections of the frame's first pixel and records every call
+	def __init__(self, detections):
+		self.detections = detections #value of the frame's first pixel --> detections
+		self.calls = []
+
+	def detect(self, frame, min_size=(0, 0), max_size=(0, 0), roi=None):
+		self.calls.append((min_size, max_size, roi))
+		return list(self.detections.get(int(frame[0, 0, 0]), []))
+
+
+
+@pytest.fixture
+def threat(monkeypatch):
+	monkeypatch.setattr(detector, "Detector", lambda: Detector({}))
+
+	return follow_threat.Threat()
+
+
+
+def frame(value=0):
+	img = np.zeros((360, 480, 3), np.uint8)
+	img[0, 0] = value
+
+	return img
+
+
+
+def test_one_detection_per_frame(threat):
+	threat.detector.detections = {1: [detector.Detection(200, 150, 40, 40)]}
+	img = frame(1)
+
+	first = threat.follow(img, 35, 40, frame_id=7)
+	again = threat.analyse(img, 7, 35, 40)
+
+	assert len(threat.detector.calls) == 1
+	assert again is threat.analysis and first == (again.distance, again.angle, again.vz)
+	assert again.detections == (detector.Detection(200, 150, 40, 40),)
+
+
+
+def test_every_new_frame_is_detected(threat):
+	for frame_id in range(3):
+		threat.follow(frame(), 35, 40, frame_id=frame_id)
+	threat.follow(frame(), 35, 40)
+	threat.follow(frame(), 35, 40)
+
+	assert len(threat.detector.calls) == 5
+	assert threat.analysis.distance is None and threat.analysis.vz == 0
+
+
+
+def test_threat_is_tracked_between_detections(monkeypatch):
+	monkeypatch.setattr(detector, "Detector", lambda: Detector({}))
+	threat = follow_threat.Threat(detect_every=3)
+	rng = np.random.default_rng(0)
+	img = np.full((360, 480, 3), 40, np.uint8)
+	img[150:210, 200:260] = rng.integers(0, 255, (60, 60, 1), np.uint8)
+	img[0, 0] = 1
+	threat.detector.detections = {1: [detector.Detection(200, 150, 60, 60)]}
+
+	for frame_id in range(6):
+		threat.analyse(img, frame_id, 35, 40)
+		#a threat is only followed once it has been detected twice
+		assert threat.is_threat == (frame_id > 0)
+
+	#detection runs on frames 0, 1 and 4, the tracker follows the threat in between
+	assert len(threat.detector.calls) == 3
+
+
+
+def test_detection_searches_around_the_last_threat(threat):
+	threat.detector.detections = {1: [detector.Detection(200, 150, 40, 40)]}
+	threat.detect(frame(1))
+	threat.detect(frame(1))
+
+	#whole frame first, then a square of roi_scale times the threat's size
+	assert threat.detector.calls[0] == ((0, 0), (0, 0), None)
+	assert threat.detector.calls[1] == ((20, 20), (80, 80), (160, 110, 120, 120))
+
+
+
+def test_region_is_clipped_to_the_frame(threat):
+	threat.last = detector.Detection(0, 0, 20, 20)
+
+	assert threat.search_area(frame()) == (0, 0, 50, 50)
+
+
+
+def test_whole_frame_is_searched_after_too_many_misses(threat):
+	threat.detector.detections = {1: [detector.Detection(200, 150, 40, 40)]}
+	threat.detect(frame(1))
+
+	for _ in range(threat.max_misses):
+		assert threat.detect(frame()) == []
+		assert threat.detector.calls[-1][2] is not None
+
+	threat.detect(frame())
+	assert threat.detector.calls[-1][2] is None
+	assert threat.last is None
@@ -0,0 +1,80 @@
+import os, types
+import numpy as np
+import pytest
+cv2 = pytest.importorskip("cv2")
+from camera import frames
+
+
+
+def image(value):
+	return np.full((8, 8, 3), value, np.uint8)
+
+
+
+def test_read_has_to_be_implemented():
+	with pytest.raises(TypeError):
+		frames.FrameSource()
+
+
+
+def test_latest_frame_wins(list_source):
+	source = list_source([image(i) for i in range(10)], buffer=4)
+	assert source.latest() is None
+
+	source.start()
+	source.thread.join(timeout=5)
+
+	assert not source.running
+	assert source.latest().id == 9 and source.latest().img[0, 0, 0] == 9
+	assert [f.id for f in source.frames()] == [6, 7, 8, 9]
+
+
+
+def test_wait_for_a_newer_frame(list_source):
+	source = list_source([image(i) for i in range(3)]).start()
+
+	frame = source.wait(timeout=5)
+	assert frame is not None
+
+	source.thread.join(timeout=5)
+	#no frame newer than the last one will arrive once the source has finished
+	assert source.wait(after=2, timeout=0.1) is None
+	assert source.wait(after=0, timeout=0.1).id == 2
+
+
+
+def test_video_source(tmp_path):
+	path = os.path.join(str(tmp_path), "video.avi")
+	writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (32, 24))
+	for i in range(5):
+		writer.write(np.full((24, 32, 3), 50*i, np.uint8))
+	writer.release()
+
+	source = frames.VideoSource(path, realtime=False).start()
+	source.thread.join(timeout=5)
+
+	assert source.count == 5
+	assert source.latest().img.shape == (24, 32, 3)
+
+
+
+def test_tello_source_skips_repeated_images():
+	img = image(1)
+	reader = types.SimpleNamespace(frame=img)
+	drone = types.SimpleNamespace(get_frame_read=lambda: reader)
+	source = frames.TelloSource(drone)
+
+	assert source.read() is img
+	assert source.read() is None
+	reader.frame = image(2)
+	assert source.read() is reader.frame
+
+
+
+def test_synthetic_source():
+	source = frames.SyntheticSource(size=(64, 48), fps=1000).start()
+	frame = source.wait(timeout=5)
+	source.stop()
+
+	assert frame.img.shape == (48, 64, 3)
+	assert not source.running and not source.thread.is_alive()
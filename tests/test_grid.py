@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from map import grid
+from path import main as path
+
+
+
+def test_planners_read_the_same_grid_object():
+	occupancy = grid.OccupancyGrid((10, 20))
+	occupancy.mark([(3, 7)])
+
+	assert occupancy.data.shape == (10, 20)
+	assert occupancy.occupied()[7, 3]
+	assert path.load_occupancy(occupancy) is occupancy
+
+
+
+def test_mark_increments_version():
+	occupancy = grid.OccupancyGrid((5, 5))
+	version = occupancy.version
+	occupancy.mark([(0, 0), (4, 4)])
+
+	assert occupancy.version == version + 1
+	assert occupancy.occupied().sum() == 2
+
+
+
+def test_snapshot_round_trip(tmp_path):
+	occupancy = grid.OccupancyGrid((8, 6))
+	occupancy.mark([(1, 2), (5, 7)])
+	directory = str(tmp_path / "map.npy")
+	occupancy.snapshot(directory)
+
+	loaded = grid.OccupancyGrid.load(directory)
+	assert loaded.dims == (8, 6)
+	assert np.array_equal(loaded.data, occupancy.data)
+
+	mapped = grid.OccupancyGrid.load(directory, mmap=True)
+	assert np.array_equal(mapped.data, occupancy.data)
+
+
+
+def test_no_grid_and_no_map_fails(tmp_path, monkeypatch):
+	monkeypatch.setattr(grid, "SNAPSHOT", str(tmp_path / "missing.npy"))
+	monkeypatch.setattr(grid, "LEGACY", str(tmp_path / "missing.txt"))
+
+	with pytest.raises(FileNotFoundError):
+		path.load_occupancy(None)
+
+
+
+def test_no_snapshot_loads_the_bundled_map(tmp_path, monkeypatch):
+	monkeypatch.setattr(grid, "SNAPSHOT", str(tmp_path / "missing.npy"))
+
+	assert path.load_occupancy(None).data.shape == (50, 50)
+
+
+
+def test_no_grid_loads_the_snapshot(tmp_path, monkeypatch):
+	directory = str(tmp_path / "snapshot.npy")
+	monkeypatch.setattr(grid, "SNAPSHOT", directory)
+	occupancy = grid.OccupancyGrid((4, 4))
+	occupancy.mark([(2, 1)])
+	occupancy.snapshot(directory)
+
+	assert path.load_occupancy(None).occupied()[1, 2]
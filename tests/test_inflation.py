@@ -0,0 +1,33 @@
+import numpy as np
+from map import grid
+
+
+
+def test_diamond_is_the_manhattan_ball():
+	for radius in range(6):
+		mask = grid.diamond(radius)
+		y, x = np.mgrid[-radius:radius+1, -radius:radius+1]
+
+		assert np.array_equal(mask, np.abs(x) + np.abs(y) <= radius)
+
+
+
+def test_diamond_is_cached_and_read_only():
+	assert grid.diamond(3) is grid.diamond(3)
+	assert not grid.diamond(3).flags.writeable
+
+
+
+def test_window_is_clipped_to_the_grid():
+	occupancy = grid.OccupancyGrid((10, 12))
+	rng = np.random.default_rng(0)
+
+	for _ in range(200):
+		cell = tuple(rng.integers(-4, 16, 2))
+		radius = int(rng.integers(0, 5))
+		window, mask = occupancy.window(cell, radius)
+
+		covered = np.zeros((10, 12), bool)
+		covered[window][mask] = True
+		y, x = np.mgrid[0:10, 0:12]
+		assert np.array_equal(covered, np.abs(x - cell[0]) + np.abs(y - cell[1]) <= radius)
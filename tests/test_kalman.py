@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from threats import kalman
+
+
+
+def test_velocity_is_learnt_from_the_measurements():
+	kf = kalman.KalmanFilter((0, 0), process_noise=1, measurement_noise=1)
+
+	for step in range(1, 30):
+		kf.predict(0.1)
+		kf.update((5*step*0.1, -2*step*0.1))
+
+	assert kf.velocity == pytest.approx([5, -2], abs=0.1)
+	assert kf.extrapolate(1.0) == pytest.approx(kf.position + kf.velocity)
+
+
+
+def test_noise_is_smoothed():
+	rng = np.random.default_rng(0)
+	kf = kalman.KalmanFilter([100], process_noise=1, measurement_noise=25)
+	raw, filtered = [], []
+
+	for _ in range(200):
+		kf.predict(1/30)
+		measurement = 100 + rng.normal(0, 5)
+		raw.append(measurement)
+		filtered.append(kf.update([measurement])[0])
+
+	assert np.std(filtered[50:]) < np.std(raw[50:]) / 3
+	assert np.mean(filtered[50:]) == pytest.approx(100, abs=1)
+
+
+
+def test_prediction_keeps_moving_and_grows_uncertain():
+	kf = kalman.KalmanFilter((0,), process_noise=1, measurement_noise=1)
+	kf.x[1] = 10
+	before = kf.P[0, 0]
+
+	assert kf.predict(0.5) == pytest.approx([5])
+	assert kf.P[0, 0] > before
+
+
+
+def test_extrapolate_does_not_change_the_state():
+	kf = kalman.KalmanFilter((1, 2))
+	kf.x[2:] = (3, 4)
+	state = kf.x.copy()
+
+	assert kf.extrapolate(2) == pytest.approx([7, 10])
+	assert np.array_equal(kf.x, state)
+	#position and velocity are copies of the state
+	kf.position[0] = 100
+	assert kf.x[0] == 1
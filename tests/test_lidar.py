@@ -0,0 +1,81 @@
+import os, importlib.util
+import numpy as np
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+pygame = pytest.importorskip("pygame")
+
+LIDAR = os.path.join(os.path.dirname(__file__), "..", "dev", "lidar_example")
+
+
+
+def load(name):
+	#the lidar example isn't a package, its modules are loaded from their files
+	spec = importlib.util.spec_from_file_location(f"lidar_{name}", os.path.join(LIDAR, f"{name}.py"))
+	module = importlib.util.module_from_spec(spec)
+	spec.loader.exec_module(module)
+
+	return module
+
+
+env = load("env")
+sensors = load("sensors")
+
+
+
+def test_point_cloud_keeps_one_point_per_voxel():
+	cloud = env.PointCloud((20, 10), voxel=2)
+	new = cloud.add([(0, 0), (1, 1), (4, 4), (4, 4), (25, 3), (3, -1)])
+
+	assert new.tolist() == [[0, 0], [4, 4]]
+	assert len(cloud.add([(5, 5), (6, 6)])) == 1
+	assert list(cloud) == [(0, 0), (4, 4), (6, 6)]
+
+
+
+@pytest.fixture
+def walled_map():
+	#white map with a black wall 50 pixels to the right of the sensor
+	pygame.display.init()
+	pygame.display.set_mode((200, 100))
+	surface = pygame.Surface((200, 100))
+	surface.fill((255, 255, 255))
+	pygame.draw.rect(surface, (0, 0, 0), (150, 0, 10, 100))
+	yield surface
+	pygame.display.quit()
+
+
+
+def test_sensor_finds_the_wall(walled_map):
+	laser = sensors.Sensor(60, walled_map, uncertainty=(0, 0), beams=8)
+	laser.pos = (100, 50)
+	data = laser.sense_obstacles()
+
+	#only the beam pointing right (angle 0) reaches the wall
+	assert len(data) == 1
+	distance, angle, pos = data[0]
+	assert distance == pytest.approx(50)
+	assert angle == 0 and pos == (100, 50)
+
+
+
+def test_sensor_data_lands_on_the_wall(walled_map):
+	laser = sensors.Sensor(80, walled_map, uncertainty=(0, 0), beams=90)
+	laser.pos = (100, 50)
+	data = laser.sense_obstacles()
+	assert len(data) > 1
+
+	distance, angle = np.array([d[:2] for d in data]).T
+	x, y = env.Environment.ad2pos(None, distance, angle, laser.pos)
+
+	assert np.all(np.abs(x - 150) <= 1)
+	assert len(env.PointCloud((200, 100)).add(np.column_stack((x, y)))) > 1
+
+
+
+def test_dropout_removes_beams(walled_map):
+	np.random.seed(0)
+	laser = sensors.Sensor(80, walled_map, uncertainty=(0, 0), beams=90, dropout=1.0)
+	laser.pos = (100, 50)
+
+	assert laser.sense_obstacles() == []
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from map import grid
+from map import map_
+
+
+
+def hits_to_mark(sensor):
+	#detections of the same cell needed before it becomes an obstacle
+	m = map_.Map([100, 100], [500, 500], [1000, 1000])
+
+	for hits in range(1, 20):
+		m.inflate((50, 50), 1, sensor)
+		if m.map[50][50] == grid.OBSTACLE:
+			return hits
+
+	return None
+
+
+
+@pytest.mark.parametrize("sensor, hits", [("proximity", 1), ("depth", 2), ("threat", 4)])
+def test_hits_needed_to_mark_an_obstacle(sensor, hits):
+	assert hits_to_mark(sensor) == hits
+
+
+
+def test_only_the_detected_cell_is_marked():
+	m = map_.Map([100, 100], [500, 500], [1000, 1000])
+	m.inflate((50, 50), 1, "proximity")
+
+	assert list(m.obs) == [(50, 50)]
+	assert m.grid.occupied().sum() == 1
+
+
+
+def test_update_is_clamped():
+	logodds = grid.LogOddsGrid((10, 10), limit=2.0)
+	window, mask = grid.OccupancyGrid((10, 10)).window((5, 5), 1)
+
+	for _ in range(10):
+		logodds.update(window, mask, 0.9)
+
+	assert logodds.data.max() == pytest.approx(2.0)
+	assert logodds.occupied().sum() == mask.sum()
+
+
+
+def test_repeated_cells_add_up():
+	logodds = grid.LogOddsGrid((10, 10))
+	logodds.update_cells([(2, 3), (2, 3)], 0.7)
+
+	assert logodds.data[3, 2] == pytest.approx(2*grid.logit(0.7))
+	assert logodds.occupied()[3, 2]
+	assert logodds.occupied().sum() == 1
+
+
+
+def test_only_updated_cells_are_clipped():
+	logodds = grid.LogOddsGrid((10, 10), limit=2.0)
+	logodds.data[0, 0] = 5.0
+	logodds.update_cells([(2, 3)]*10, 0.9)
+
+	assert logodds.data[3, 2] == pytest.approx(2.0)
+	assert logodds.data[0, 0] == 5.0
+
+
+
+def test_decay_halves_after_the_half_life():
+	logodds = grid.LogOddsGrid((10, 10), half_life=10.0)
+	logodds.update_cells([(1, 1)], 0.9)
+	before = logodds.data[1, 1]
+	logodds.decay(10.0)
+
+	assert logodds.data[1, 1] == pytest.approx(before/2)
+	assert np.all(logodds.probability()[logodds.data == 0] == 0.5)
@@ -0,0 +1,32 @@
+import pytest
+pytest.importorskip("pygame")
+from manual_control import manual_control as mc
+
+
+
+FORWARD = [[False, False], [True, False], [False, False], [False, False]]
+
+
+
+def controls():
+	return mc.ManualControl([["d", "a"], ["w", "s"], ["UP", "DOWN"], ["RIGHT", "LEFT"]], 50, drone=None)
+
+
+
+def test_position_follows_dt():
+	fast, slow = controls(), controls()
+
+	for _ in range(10):
+		fast.update_pos(FORWARD, 12, 36, 0.2, dt=0.05)
+	slow.update_pos(FORWARD, 12, 36, 0.2, dt=0.5)
+
+	assert fast.y == pytest.approx(slow.y) and fast.y == pytest.approx(400 - 6)
+	assert fast.x == pytest.approx(400)
+
+
+
+def test_interval_is_used_without_dt():
+	c = controls()
+	c.update_pos(FORWARD, 12, 36, 0.25)
+
+	assert c.y == pytest.approx(400 - 3)
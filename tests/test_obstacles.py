@@ -0,0 +1,55 @@
+from map import grid
+
+
+
+def test_cells_are_stored_once():
+	obs = grid.ObstacleSet((10, 10))
+	new = obs.add([(1, 2), (1, 2), (3, 4)])
+
+	assert len(new) == 2 and len(obs) == 2
+	assert len(obs.add([(1, 2)])) == 0 and len(obs) == 2
+	assert (1, 2) in obs and (2, 1) not in obs
+	assert sorted(obs) == [(1, 2), (3, 4)]
+
+
+
+def test_cells_outside_the_map_are_ignored():
+	obs = grid.ObstacleSet((5, 8))
+	obs.add([(-1, 0), (8, 0), (0, 5), (7, 4)])
+
+	assert list(obs) == [(7, 4)]
+	assert (8, 0) not in obs
+
+
+
+def test_remove():
+	obs = grid.ObstacleSet((10, 10))
+	obs.add([(1, 1), (2, 2)])
+
+	assert obs.remove([(1, 1), (5, 5)]).tolist() == [[1, 1]]
+	assert list(obs) == [(2, 2)]
+
+
+
+def test_changed_since():
+	obs = grid.ObstacleSet((10, 10))
+	v0 = obs.version
+	obs.add([(1, 1)])
+	v1 = obs.version
+	obs.add([(2, 2), (1, 1)])
+	obs.remove([(1, 1)])
+
+	assert len(obs.changed_since(obs.version)) == 0
+	assert sorted(map(tuple, obs.changed_since(v1).tolist())) == [(1, 1), (2, 2)]
+	assert len(obs.changed_since(v0)) == 3
+
+
+
+def test_old_changes_are_forgotten():
+	obs = grid.ObstacleSet((10, 10), history=2)
+	v0 = obs.version
+	for x in range(4):
+		obs.add([(x, 0)])
+
+	assert obs.changed_since(v0) is None
+	assert obs.changed_since(obs.version - 2).tolist() == [[2, 0], [3, 0]]
@@ -0,0 +1,94 @@
+import threading
+import numpy as np
+from camera import pipeline
+from map import map_
+
+
+
+class Threat():
+	#draws on the image it's given, like Threat.analyse
+	def __init__(self):
+		self.threads = set()
+
+	def analyse(self, img, frame_id, min_distance, max_distance):
+		self.threads.add(threading.current_thread())
+		img[:] = 255
+		return ("analysis", frame_id)
+
+
+
+def test_stage_keeps_the_newest_items():
+	stage = pipeline.Stage("test", lambda item: item, size=2)
+	for i in range(5):
+		stage.put(i)
+
+	assert list(stage.queue.queue) == [3, 4]
+	assert stage.dropped == 3
+
+
+
+def test_failing_item_does_not_stop_the_stage():
+	stage = pipeline.Stage("test", lambda item: 10 // item, size=4)
+	for item in (0, 5, None):
+		stage.put(item)
+	stage.run()
+
+	assert stage.processed == 2 and stage.result == 2
+
+
+
+def test_results_are_passed_on():
+	first = pipeline.Stage("first", lambda item: item*2, size=4)
+	second = pipeline.Stage("second", lambda item: item + 1, size=4)
+	first.outputs.append(second)
+	for item in (1, 2, None):
+		first.put(item)
+
+	first.run()
+	second.run()
+
+	assert second.result == 5 and second.processed == 2
+
+
+
+def test_pipeline_analyses_a_copy_of_the_frames(list_source):
+	camera = list_source([np.zeros((4, 4, 3), np.uint8) for _ in range(3)], end=None).start()
+	threat = Threat()
+	p = pipeline.Pipeline(camera, threat).start()
+
+	camera.wait(1, timeout=5)
+	for _ in range(500):
+		result = p.latest("threat")
+		if result is not None and result[0].id == 2:
+			break
+		threading.Event().wait(0.01)
+	p.stop()
+	camera.stop()
+
+	frame, analysis, img = result
+	assert analysis == ("analysis", 2)
+	#the drawing went into the copy, the camera's frame is left as it was
+	assert np.all(img == 255) and np.all(frame.img == 0)
+	assert threat.threads == {p.stages["threat"].thread}
+	assert "map" not in p.stages
+
+
+
+def test_map_stage_adds_obstacles_where_they_were_detected(list_source):
+	m = map_.Map([100, 100], [500, 500], [1000, 1000])
+	m.x, m.y, m.angle = 50.0, 50.0, 0.0
+	p = pipeline.Pipeline(list_source([], end=None), Threat(), m).start()
+
+	#obstacle 100 cm in front of the drone, which then moves on
+	for _ in range(3):
+		p.add_obs(100, 0, error=1)
+	m.x = 200.0
+	for _ in range(500):
+		if p.stages["map"].processed == 3:
+			break
+		threading.Event().wait(0.01)
+	p.stop()
+
+	assert (20, 10) in m.obs
+	added, removed = p.latest("map")
+	assert len(removed) == 0
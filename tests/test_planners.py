@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+from map import grid
+from path import benchmark
+from path import collision
+from path import main as path
+from path import planners
+
+
+SCALE = 5 #pixels of the screen per cell (same as the Drone class)
+
+
+
+def free_position(occupancy, rng):
+	#random position in the screen (not a whole cell) inside a free cell
+	occupied = occupancy.occupied()
+	while True:
+		p = rng.uniform(0, occupied.shape[0]*SCALE, 2)
+		if not occupied[int(p[1]/SCALE), int(p[0]/SCALE)]:
+			return (float(p[0]), float(p[1]))
+
+
+
+def assert_clear(nodes, occupied, start, end):
+	#every edge of the path is checked against the grid, in grid coordinates
+	nodes = np.asarray(nodes, dtype=float)
+	assert tuple(nodes[0]) == end and tuple(nodes[-1]) == start
+
+	for a, b in zip(nodes[:-1], nodes[1:]):
+		cells = collision.segment_cells(a/SCALE, b/SCALE)
+		assert not collision.collides(occupied, cells), (a, b)
+
+
+
+@pytest.mark.parametrize("name, size, maps", [
+	("astar", 40, 100),
+	("theta_star", 40, 300),
+	("dstar_lite", 40, 40),
+	("hierarchical", 96, 30),
+])
+def test_no_edge_crosses_an_obstacle(name, size, maps):
+	rng = np.random.default_rng(5)
+	screen = (size*SCALE, size*SCALE)
+	found = 0
+
+	for _ in range(maps):
+		occupancy = benchmark.random_map(size, 0.2, rng)
+		start, end = free_position(occupancy, rng), free_position(occupancy, rng)
+		planner = planners.PLANNERS[name](start, end, screen, (size, size), occupancy)
+		nodes = planner.plan()
+
+		if planner.found:
+			found += 1
+			assert_clear(nodes, occupancy.occupied(), start, end)
+		else:
+			assert len(nodes) == 0
+
+	assert found > maps//2
+
+
+
+def test_path_cost_matches_astar():
+	#Theta* paths are never longer than the 45 degree paths of A* before
+	#they are pruned, and pruning never makes a path longer
+	rng = np.random.default_rng(6)
+	length = lambda p: np.linalg.norm(np.diff(p, axis=0), axis=1).sum()
+	for _ in range(30):
+		occupancy = benchmark.random_map(40, 0.2, rng)
+		start, end = free_position(occupancy, rng), free_position(occupancy, rng)
+		a = planners.AStar(start, end, (200, 200), (40, 40), occupancy)
+		cells = planners.AStar(start, end, (200, 200), (40, 40), occupancy)
+		cells.prune = lambda nodes, occupied: nodes
+		t = planners.ThetaStar(start, end, (200, 200), (40, 40), occupancy)
+		a.plan(), cells.plan(), t.plan()
+
+		assert a.found == t.found
+		if a.found:
+			assert length(t.path) <= length(cells.path) + 1e-6
+			assert length(a.path) <= length(cells.path) + 1e-6
+
+
+
+def test_no_path_is_not_found(tmp_path, monkeypatch):
+	occupancy = grid.OccupancyGrid((40, 40))
+	occupancy.data[:, 20] = grid.OBSTACLE
+	planner = planners.AStar((10, 10), (190, 190), (200, 200), (40, 40), occupancy)
+
+	assert len(planner.plan()) == 0
+	assert not planner.found
+
+	#headless planning reports it and leaves the last path as it was
+	monkeypatch.chdir(tmp_path)
+	(tmp_path / "path").mkdir()
+	(tmp_path / "path" / "path.txt").write_text("1,2\n")
+	assert path.main((10, 10), (190, 190), (40, 40), (200, 200), occupancy, display=False, planner="astar") is None
+	assert (tmp_path / "path" / "path.txt").read_text() == "1,2\n"
+
+
+
+def test_registry_names():
+	assert set(planners.PLANNERS) >= {"rrt", "rrt_star", "astar", "theta_star", "dstar_lite", "hierarchical"}
+
+
+
+@pytest.mark.parametrize("name", ["astar", "dstar_lite", "theta_star"])
+def test_redundant_nodes_are_pruned(name):
+	#a diagonal path on an open grid is a staircase of cells, but a straight line
+	occupancy = grid.OccupancyGrid((100, 100))
+	planner = planners.PLANNERS[name]((12, 7), (480, 301), (500, 500), (100, 100), occupancy)
+
+	assert planner.plan().tolist() == [[480, 301], [12, 7]]
+
+	#two nodes are needed to go around the end of a wall (one on each side)
+	occupancy.data[20:80, 50] = grid.OBSTACLE
+	planner = planners.PLANNERS[name]((200, 250), (300, 250), (500, 500), (100, 100), occupancy)
+	nodes = planner.plan()
+
+	assert len(nodes) == 4
+	assert_clear(nodes, occupancy.occupied(), (200, 250), (300, 250))
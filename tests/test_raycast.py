@@ -0,0 +1,76 @@
+import numpy as np
+from map import grid
+from map import map_
+from map import raycast
+from path import collision
+
+
+
+def test_traverse_matches_segment_cells():
+	rng = np.random.default_rng(0)
+	origin = rng.uniform(0, 20, 2)
+	#random ends, ends on grid lines and a beam of length 0
+	ends = np.concatenate((rng.uniform(-5, 25, (200, 2)), rng.integers(0, 20, (50, 2)), origin[None]))
+
+	cells, beam = raycast.traverse(origin, ends)
+
+	for i, end in enumerate(ends):
+		assert np.array_equal(cells[beam == i], collision.segment_cells(origin, end)), end
+
+
+
+def test_traverse_includes_both_end_cells():
+	cells, beam = raycast.traverse((0.5, 0.5), [(3, 0.5), (0.5, 2.0)])
+
+	assert cells[beam == 0].tolist() == [[0, 0], [1, 0], [2, 0], [3, 0]]
+	assert cells[beam == 1].tolist() == [[0, 0], [0, 1], [0, 2]]
+
+
+
+def test_traverse_with_one_origin_per_beam():
+	origins = np.array([(0.5, 0.5), (4.5, 4.5)])
+	ends = np.array([(2.5, 0.5), (4.5, 2.5)])
+	cells, beam = raycast.traverse(origins, ends)
+
+	assert cells[beam == 0].tolist() == [[0, 0], [1, 0], [2, 0]]
+	assert cells[beam == 1].tolist() == [[4, 4], [4, 3], [4, 2]]
+
+
+
+def test_cast_only_frees_cells_before_a_hit():
+	free, hit = raycast.cast((0.5, 0.5), [(3.5, 0.5), (0.5, 3.5)], hits=[True, False])
+
+	assert hit.tolist() == [[3, 0]]
+	assert [3, 0] not in free.tolist()
+	assert [0, 3] in free.tolist()
+
+
+
+def test_first_hit():
+	occupied = np.zeros((10, 10), bool)
+	occupied[5, 3] = True
+	cells, hits = raycast.first_hit(occupied, (0.5, 5.5), [(9.5, 5.5), (0.5, 0.5)])
+
+	assert hits.tolist() == [True, False]
+	assert cells.tolist() == [[3, 5], [0, 0]]
+
+
+
+def test_scan_clears_an_obstacle_that_moved():
+	m = map_.Map([100, 100], [500, 500], [1000, 1000])
+	m.x, m.y, m.angle = 50.0, 50.0, 0.0
+
+	#obstacle 100 cm in front of the drone (cell 10 cells away)
+	for _ in range(3):
+		m.add_scan([100], [0], error=1)
+	assert (20, 10) in m.obs
+
+	#the obstacle is gone, beams now reach further and pass through its cell
+	for _ in range(10):
+		added, removed = m.add_scan([200], [0], error=1)
+		if (20, 10) not in m.obs:
+			break
+
+	assert (20, 10) not in m.obs
+	assert m.map[10][20] == grid.FREE
+	assert (30, 10) in m.obs
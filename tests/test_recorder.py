@@ -0,0 +1,126 @@
+import itertools, os, time
+import numpy as np
+import pytest
+cv2 = pytest.importorskip("cv2")
+from threats import recorder
+
+
+
+def frame(value=0, shape=(48, 64)):
+	return np.full(shape + (3,), value, np.uint8)
+
+
+
+def clock(fps):
+	#a frame arrives every time the clock is read
+	times = itertools.count(0, 1/fps)
+
+	return lambda: next(times)
+
+
+
+def test_drop_oldest_keeps_messages():
+	queue = recorder.FrameQueue(size=2, policy="drop_oldest")
+	queue.put(("start", "video.mp4", 30, (64, 48)))
+	for i in range(4):
+		assert queue.put(("frame", i))
+
+	assert [item[1] for item in queue.items] == ["video.mp4", 2, 3]
+	assert len(queue) == 2 and queue.dropped == 2 and queue.high == 2
+
+
+
+def test_drop_newest():
+	queue = recorder.FrameQueue(size=2, policy="drop_newest")
+	results = [queue.put(("frame", i)) for i in range(4)]
+
+	assert results == [True, True, False, False]
+	assert [item[1] for item in queue.items] == [0, 1]
+	#messages are never dropped
+	assert queue.put(("stop",)) and queue.dropped == 2
+
+
+
+def test_block_waits_then_drops():
+	queue = recorder.FrameQueue(size=1, policy="block", timeout=0.05)
+	queue.put(("frame", 0))
+
+	t = time.monotonic()
+	assert not queue.put(("frame", 1))
+	assert time.monotonic() - t >= 0.04
+	assert queue.get() == ("frame", 0) and len(queue) == 0
+
+
+
+def test_preroll_is_bounded_and_encoded():
+	#frames arrive at 10 fps, not at the 30 fps given
+	rec = recorder.Recorder(fps=30, preroll=1.0, clock=clock(10))
+	for i in range(25):
+		rec.add(frame(i))
+	#the frames are encoded by the writer thread
+	rec.close()
+
+	assert rec.preroll_size() == 10 and len(rec.preroll) == 10
+	assert all(buffer.ndim == 1 for buffer in rec.preroll)
+	assert sum(buffer.nbytes for buffer in rec.preroll) < 10*frame().nbytes
+
+
+
+def test_raw_preroll():
+	rec = recorder.Recorder(fps=10, preroll=1.0, quality=None)
+	img = frame(7)
+	rec.add(img)
+	img[:] = 0
+	rec.close()
+
+	#a copy is kept, since the camera can reuse the frame
+	assert rec.preroll[0].shape == img.shape and np.all(rec.preroll[0] == 7)
+
+
+
+def test_video_starts_with_the_preroll(tmp_path):
+	rec = recorder.Recorder(directory=str(tmp_path), preroll=0.5, clock=clock(10))
+	for i in range(8):
+		rec.add(frame(20*i))
+
+	name = rec.start()
+	for i in range(3):
+		rec.add(frame(200))
+	assert rec.stop() == 3
+	rec.close()
+
+	video = cv2.VideoCapture(os.path.join(str(tmp_path), name + ".mp4"))
+	assert video.get(cv2.CAP_PROP_FRAME_COUNT) == 8
+	ok, first = video.read()
+	#the first frame written is the oldest frame in the pre-roll
+	assert ok and first.shape == (48, 64, 3)
+	assert abs(int(first.mean()) - 60) <= 4
+	assert rec.stats()["written"] == 8
+
+
+
+def test_writer_thread_starts_with_the_first_frame(tmp_path):
+	rec = recorder.Recorder(directory=str(tmp_path))
+	assert rec.thread is None
+
+	rec.add(frame())
+	thread = rec.thread
+	assert thread.is_alive()
+
+	rec.close()
+	assert rec.thread is None and not thread.is_alive()
+	assert not rec.recording
+
+
+
+def test_recorder_can_be_closed_and_used_again(tmp_path):
+	rec = recorder.Recorder(directory=str(tmp_path))
+	rec.close()
+
+	for _ in range(2):
+		rec.add(frame())
+		rec.start()
+		rec.add(frame())
+		rec.close()
+
+	assert rec.stats()["written"] == 4
@@ -0,0 +1,71 @@
+import math, random
+from map import grid
+from path import path_planning
+
+
+
+def test_nearest_matches_brute_force():
+	rng = random.Random(0)
+	points = [(rng.uniform(-50, 550), rng.uniform(-50, 550)) for _ in range(300)]
+	tree = path_planning.Tree(points[0], 40)
+	for p in points[1:]:
+		tree.add_node(path_planning.Node(None, p))
+
+	for _ in range(200):
+		q = (rng.uniform(-100, 600), rng.uniform(-100, 600))
+		best = min(math.dist(p, q) for p in points)
+		assert math.dist(tree.nearest(q).data, q) == best
+
+
+
+def test_near_matches_brute_force():
+	rng = random.Random(1)
+	points = [(rng.randint(0, 500), rng.randint(0, 500)) for _ in range(300)]
+	tree = path_planning.Tree(points[0], 40)
+	for p in points[1:]:
+		tree.add_node(path_planning.Node(None, p))
+
+	q = (250, 250)
+	near = sorted(n.data for n in tree.near(q, 75))
+	assert near == sorted(p for p in points if math.dist(p, q) <= 75)
+
+
+
+def test_popped_nodes_are_removed_from_the_index():
+	tree = path_planning.Tree((0, 0), 10)
+	tree.add_node(path_planning.Node(tree.root, (100, 100)))
+	tree.pop_node()
+
+	assert tree.nearest((100, 100)).data == (0, 0)
+
+
+
+def test_traverse_tree_follows_the_parents():
+	tree = path_planning.Tree((0, 0), 10)
+	node = tree.root
+	#a chain far longer than the recursion limit
+	for i in range(1, 5000):
+		node = path_planning.Node(node, (i, 0))
+		tree.add_node(node)
+
+	rrt = path_planning.RRT((0, 0), (4999, 0), (500, 500), (100, 100), grid.OccupancyGrid((100, 100)))
+	rrt.tree = tree
+	path = rrt.traverse_tree()
+
+	assert rrt.trace
+	assert len(path) == 5000
+	assert tuple(path[0]) == (4999, 0) and tuple(path[-1]) == (0, 0)
+
+
+
+def test_plan_reaches_the_end():
+	random.seed(2)
+	occupancy = grid.OccupancyGrid((100, 100))
+	occupancy.data[40:60, 0:70] = grid.OBSTACLE
+	rrt = path_planning.RRT((10, 10), (450, 450), (500, 500), (100, 100), occupancy)
+	path = rrt.plan()
+
+	assert rrt.found
+	assert tuple(path[0]) == (450, 450) and tuple(path[-1]) == (10, 10)
+	for a, b in zip(path[:-1], path[1:]):
+		assert not rrt.collide_obs(a, b)
@@ -0,0 +1,94 @@
+import math
+import pytest
+from control import scheduler
+from map import map_
+
+
+
+class Clock():
+	#clock moved by hand
+	def __init__(self):
+		self.t = 0.0
+
+	def __call__(self):
+		return self.t
+
+
+
+def test_tasks_run_at_their_rates():
+	clock = Clock()
+	s = scheduler.Scheduler(clock)
+	runs = {"fast": [], "slow": []}
+	s.add("fast", runs["fast"].append, 20)
+	s.add("slow", runs["slow"].append, 2)
+
+	for i in range(200):
+		clock.t = i*0.005
+		s.run_pending()
+
+	#every dt is the period, give or take one step of the loop
+	assert len(runs["fast"]) == 20 and len(runs["slow"]) == 2
+	assert runs["fast"] == pytest.approx([0.05]*20, abs=0.0051)
+	assert runs["slow"] == pytest.approx([0.5, 0.5], abs=0.0051)
+
+
+
+def test_late_runs_skip_missed_deadlines():
+	clock = Clock()
+	s = scheduler.Scheduler(clock)
+	dts = []
+	task = s.add("control", dts.append, 10)
+
+	s.run_pending()
+	clock.t = 0.35
+	s.run_pending()
+	clock.t = 0.4
+	s.run_pending()
+
+	#the deadlines at 0.1 and 0.2 were missed, the grid is kept (0.3, 0.4, ...)
+	assert task.missed == 2 and task.runs == 3
+	assert dts == pytest.approx([0.1, 0.35, 0.05])
+	assert task.next == pytest.approx(0.5)
+
+
+
+def test_stats_and_until_next():
+	clock = Clock()
+	s = scheduler.Scheduler(clock)
+	s.add("control", lambda dt: None, 20)
+	assert s.until_next() == 0
+
+	s.run_pending()
+	clock.t = 0.01
+	assert s.until_next() == pytest.approx(0.04)
+
+	stats = s.tasks["control"].stats()
+	assert stats["runs"] == 1 and stats["rate"] == 20
+	assert sum(stats["jitter"]["buckets"].values()) == 1
+
+
+
+def test_rates_must_be_positive():
+	s = scheduler.Scheduler()
+	with pytest.raises(ValueError):
+		s.add("control", lambda dt: None, 0)
+
+	s.add("control", lambda dt: None, 5)
+	with pytest.raises(ValueError):
+		s.set_rate("control", -1)
+
+
+
+@pytest.mark.parametrize("rate", [10, 20, 50])
+def test_dead_reckoning_does_not_depend_on_the_rate(rate):
+	m = map_.Map([100, 100], [500, 500], [1000, 1000])
+	m.x, m.y = 100.0, 100.0
+	n1, n2 = (100, 100), (300, 100)
+
+	#the drone is given 2 seconds to travel between both nodes
+	for _ in range(2*rate):
+		m.map_drone(n1, n2, False, 2, 100, 1/rate)
+
+	distance = math.dist(n1, n2) * (100/1000) * (500/1000) * (117/150) * 1.07
+	assert m.x - 100 == pytest.approx(distance)
+	assert m.y == pytest.approx(100)
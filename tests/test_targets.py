@@ -0,0 +1,81 @@
+import pytest
+from threats import detector
+from threats import targets
+
+
+
+def test_iou():
+	overlap = targets.iou([(0, 0, 10, 10), (0, 0, 0, 0)], [(0, 0, 10, 10), (5, 0, 10, 10), (20, 20, 5, 5)])
+
+	assert overlap.shape == (2, 3)
+	assert overlap[0].tolist() == pytest.approx([1, 50/150, 0])
+	assert overlap[1].tolist() == [0, 0, 0]
+
+
+
+def test_iou_of_no_rects():
+	assert targets.iou([], [(0, 0, 10, 10)]).shape == (0, 1)
+
+
+
+def test_tracks_are_confirmed_after_min_hits():
+	tracker = targets.MultiTracker(min_hits=2)
+
+	assert tracker.update([detector.Detection(10, 10, 20, 20)]) == []
+	confirmed = tracker.update([detector.Detection(12, 10, 20, 20)])
+	assert [t.id for t in confirmed] == [0]
+
+
+
+def test_ids_stay_with_their_threats():
+	#two threats crossing paths keep their ids (matched as a whole, not greedily)
+	tracker = targets.MultiTracker(min_hits=1)
+	tracker.update([detector.Detection(0, 0, 40, 40), detector.Detection(100, 0, 40, 40)])
+
+	for step in range(1, 6):
+		a = detector.Detection(0 + 8*step, 0, 40, 40)
+		b = detector.Detection(100 - 8*step, 0, 40, 40)
+		#the detections arrive in any order
+		tracks = tracker.update([b, a] if step % 2 else [a, b])
+
+	by_id = {t.id: t.box for t in tracks}
+	assert sorted(by_id) == [0, 1]
+	assert by_id[0].x > 20 and by_id[1].x < 80
+	assert len(tracker.tracks) == 2
+
+
+
+def test_lost_tracks_are_removed():
+	tracker = targets.MultiTracker(min_hits=1, max_misses=3)
+	tracker.update([detector.Detection(0, 0, 40, 40)])
+
+	for _ in range(3):
+		tracker.update([])
+	assert len(tracker.tracks) == 1 and tracker.tracks[0].misses == 3
+
+	tracker.update([])
+	assert tracker.tracks == []
+
+
+
+def test_followed_threat_is_kept():
+	tracker = targets.MultiTracker(min_hits=1)
+	tracker.update([detector.Detection(100, 100, 40, 40)])
+	assert tracker.follow((360, 480)).id == 0
+
+	#a larger threat appears, but the one followed is still there
+	tracker.update([detector.Detection(100, 100, 40, 40), detector.Detection(300, 100, 80, 80)])
+	assert tracker.follow((360, 480)).id == 0
+
+	#once it's gone, the largest threat in view is followed
+	for _ in range(tracker.max_misses + 1):
+		tracker.update([detector.Detection(300, 100, 80, 80)])
+	assert tracker.follow((360, 480)).id == 1
+
+
+
+def test_nothing_is_followed_without_threats():
+	tracker = targets.MultiTracker()
+
+	assert tracker.follow((360, 480)) is None
+	assert tracker.target is None
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from map import grid
+from map import tiles
+from path import benchmark
+from path import planners
+
+
+SCALE = 5 #pixels of the screen per cell (same as the Drone class)
+
+
+
+@pytest.mark.parametrize("shape, tile", [((32, 32), 16), ((37, 50), 16), ((10, 7), 4), ((5, 5), 8)])
+def test_counts_match_every_tile(shape, tile):
+	occupancy = benchmark.random_map(shape, 0.3, np.random.default_rng(1))
+	tilemap = tiles.TileMap.from_grid(occupancy, tile)
+	occupied = occupancy.occupied()
+
+	assert tilemap.counts.shape == (-(-shape[0]//tile), -(-shape[1]//tile))
+	for ty, tx in np.ndindex(tilemap.counts.shape):
+		block = occupied[ty*tile:(ty+1)*tile, tx*tile:(tx+1)*tile]
+		assert tilemap.counts[ty, tx] == block.sum()
+
+	assert tilemap.version == occupancy.version
+
+
+
+def test_blocked_handles_smaller_edge_tiles():
+	#the last row and column of tiles only hold 2 cells on that side
+	occupancy = grid.OccupancyGrid((10, 10))
+	occupancy.mark([(x, y) for x in range(8, 10) for y in range(10)])
+	tilemap = tiles.TileMap.from_grid(occupancy, 4)
+
+	assert np.array_equal(tilemap.blocked(), [[False, False, True]]*3)
+	assert tilemap.blocked(0.5)[:, 1].sum() == 0
+
+
+
+def test_blocked_fraction():
+	occupancy = grid.OccupancyGrid((8, 8))
+	occupancy.mark([(x, y) for x in range(4) for y in range(2)])
+	tilemap = tiles.TileMap.from_grid(occupancy, 4)
+
+	assert not tilemap.blocked()[0, 0]
+	assert tilemap.blocked(0.5)[0, 0]
+	assert tilemap.blocked(0.5).sum() == 1
+
+
+
+def test_hierarchical_finds_a_path_whenever_astar_does():
+	rng = np.random.default_rng(3)
+	size = 64
+	screen = (size*SCALE, size*SCALE)
+
+	for _ in range(20):
+		occupancy = benchmark.random_map(size, 0.25, rng)
+		start = (SCALE/2, SCALE/2)
+		end = (screen[0]-SCALE/2, screen[1]-SCALE/2)
+		occupancy.data[0, 0] = occupancy.data[-1, -1] = grid.FREE
+
+		astar = planners.AStar(start, end, screen, (size, size), occupancy)
+		hierarchical = planners.Hierarchical(start, end, screen, (size, size), occupancy, tile=8)
+		astar.plan()
+		hierarchical.plan()
+
+		assert hierarchical.found == astar.found
+
+
+
+def test_hierarchical_rebuilds_tiles_when_the_grid_changes():
+	size = 32
+	screen = (size*SCALE, size*SCALE)
+	occupancy = grid.OccupancyGrid((size, size))
+	planner = planners.Hierarchical((2, 2), (150, 150), screen, (size, size), occupancy, tile=8)
+	planner.plan()
+	before = planner.tiles
+
+	occupancy.mark([(x, 16) for x in range(size-1)])
+	planner = planners.Hierarchical((2, 2), (150, 150), screen, (size, size), occupancy, tile=8)
+	planner.tiles = before
+	planner.plan()
+
+	assert planner.tiles is not before
+	assert planner.tiles.counts.sum() == size-1
+	assert planner.found
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+cv2 = pytest.importorskip("cv2")
+from threats import detector
+from threats import tracker
+
+
+
+def scene(x, y, size=60, shape=(240, 320)):
+	#textured square on a plain background, with its top left corner at (x, y)
+	rng = np.random.default_rng(0)
+	img = np.full(shape + (3,), 40, np.uint8)
+	img[y:y+size, x:x+size] = rng.integers(0, 255, (size, size, 1), np.uint8)
+
+	return img
+
+
+
+def test_flow_follows_a_moving_rect():
+	t = tracker.Tracker("flow")
+	t.start(scene(100, 80), (100, 80, 60, 60))
+	assert t.active
+
+	for step in range(1, 6):
+		box, confidence = t.update(scene(100 + 3*step, 80 + 2*step))
+		assert confidence > 0.5
+
+	assert abs(box.x - 115) <= 2 and abs(box.y - 90) <= 2
+	assert abs(box.w - 60) <= 3 and abs(box.h - 60) <= 3
+	assert isinstance(box, detector.Detection)
+
+
+
+def test_flow_loses_the_rect_when_it_disappears():
+	t = tracker.Tracker("flow")
+	t.start(scene(100, 80), (100, 80, 60, 60))
+	box, confidence = t.update(np.full((240, 320, 3), 40, np.uint8))
+
+	assert confidence == 0.0 and not t.active
+	assert box == detector.Detection(100, 80, 60, 60)
+
+
+
+def test_flat_rect_is_not_tracked():
+	t = tracker.Tracker("flow")
+	t.start(np.full((240, 320, 3), 40, np.uint8), (100, 80, 60, 60))
+
+	assert not t.active
+	assert t.update(scene(100, 80))[1] == 0.0
+
+
+
+def test_frame_of_another_size_is_not_tracked():
+	t = tracker.Tracker("flow")
+	t.start(scene(100, 80), (100, 80, 60, 60))
+
+	assert t.update(scene(50, 40, shape=(120, 160)))[1] == 0.0
+
+
+
+def test_missing_opencv_tracker_falls_back_to_flow(monkeypatch):
+	monkeypatch.setattr(tracker, "create", lambda method: None)
+
+	assert tracker.Tracker("csrt").method == "flow"
@@ -0,0 +1,60 @@
+import numpy as np
+from map import trajectory
+
+
+
+def test_bernstein_basis_sums_to_one():
+	basis = trajectory.bernstein(4, np.linspace(0, 1, 11))
+
+	assert basis.shape == (11, 5)
+	assert np.allclose(basis.sum(axis=1), 1)
+
+
+
+def test_bezier_matches_de_casteljau():
+	points = np.array([(0, 0), (1, 3), (4, 3), (5, 0)], float)
+
+	def casteljau(p, t):
+		while len(p) > 1:
+			p = (1-t)*p[:-1] + t*p[1:]
+		return p[0]
+
+	curve = trajectory.bezier(points, 9)
+	for t, point in zip(np.linspace(0, 1, 9), curve):
+		assert np.allclose(point, casteljau(points, t))
+
+
+
+def test_spline_starts_and_ends_at_the_path():
+	path = np.array([(0, 0), (10, 0), (10, 10), (20, 10), (20, 20)], float)
+	curve = trajectory.bezier_spline(path, 3)
+
+	assert np.allclose(curve[0], path[0]) and np.allclose(curve[-1], path[-1])
+	assert curve.flags["C_CONTIGUOUS"] and curve.dtype == float
+
+
+
+def test_default_density_follows_the_path():
+	#about as many points as the path has nodes (the drone stops at every point)
+	rng = np.random.default_rng(0)
+	for n in (3, 7, 13, 40):
+		path = np.cumsum(rng.uniform(5, 30, (n, 2)), axis=0)
+		curve = trajectory.bezier_spline(path, 3)
+		assert n//2 <= len(curve) <= n + 1
+
+
+
+def test_spacing_is_even():
+	path = np.array([(0, 0), (30, 0), (30, 30), (60, 30)], float)
+	curve = trajectory.bezier_spline(path, 3, spacing=2.0)
+	steps = np.linalg.norm(np.diff(curve, axis=0), axis=1)
+
+	#every step but the last one (to the end of the path) is the spacing along the curve
+	#(the straight distance is shorter on bends, at least sqrt(2) at the right angle)
+	assert np.all(steps[:-1] <= 2.0 + 1e-9) and np.all(steps[:-1] > 1.4)
+
+
+
+def test_short_paths():
+	assert len(trajectory.bezier_spline([(3, 4)], 3)) == 1
+	assert len(trajectory.bezier_spline([(3, 4), (3, 4)], 3)) == 1
@@ -0,0 +1,100 @@
+"""
+Threat detector used by the Threat class
+Input:
+- frames from the drone's camera (BGR)
+Output:
+- bounding rects of the threats detected in every frame
+
+The cascade is loaded only once and the grayscale (and downscaled)
+images are written into the same buffers on every frame, so the
+detection doesn't allocate or parse anything in the camera loop
+"""
+
+import cv2
+from typing import NamedTuple
+
+
+MODEL = "threats/resources/threat_tracking_file.xml" #pre-trained model to detect human faces
+
+
+
+class Detection(NamedTuple):
+	"""
+	Bounding rect of a threat in the frame (in pixels)
+	"""
+	x: int
+	y: int
+	w: int
+	h: int
+
+	@property
+	def centre(self):
+		return ((self.x+self.x+self.w)//2, (self.y+self.y+self.h)//2)
+
+
+
+class Detector():
+	def __init__(self, model=MODEL, scale_factor=1.2, min_neighbours=8, downscale=1.0):
+		self.cascade = cv2.CascadeClassifier(model)
+		if self.cascade.empty():
+			raise FileNotFoundError(f"Could not load the cascade at {model}")
+
+		self.scale_factor = scale_factor #step between the scales of the image searched
+		self.min_neighbours = min_neighbours #detections needed around a rect to keep it
+		#fraction of the frame's size the detection runs at (faster
+		#when lower, but small/far threats might be missed)
+		self.downscale = downscale
+
+		self.gray = None #grayscale frame
+		self.small = None #grayscale frame at the size detection runs at
+
+
+
+	def prepare(self, frame):
+		"""
+		Converts frame into the image the cascade runs on,
+		reusing the buffers of the previous frame if they fit
+		"""
+		h, w = frame.shape[:2]
+		if self.gray is None or self.gray.shape != (h, w):
+			self.gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+		else:
+			cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self.gray)
+
+		if self.downscale == 1:
+			return self.gray
+
+		size = (max(round(w*self.downscale), 1), max(round(h*self.downscale), 1))
+		if self.small is None or self.small.shape != (size[1], size[0]):
+			self.small = cv2.resize(self.gray, size, interpolation=cv2.INTER_AREA)
+		else:
+			cv2.resize(self.gray, size, dst=self.small, interpolation=cv2.INTER_AREA)
+
+		return self.small
+
+
+
+	def detect(self, frame, min_size=(0, 0), max_size=(0, 0), roi=None):
+		"""
+		Input: BGR frame, smallest and largest size of the threats searched
+		(in pixels of the frame, (0, 0) means no limit) and the (x, y, w, h)
+		region of the frame searched (None searches the whole frame)
+		Output: list of Detection objects
+		"""
+		img = self.prepare(frame)
+		scale = img.shape[1] / frame.shape[1]
+
+		x0 = y0 = 0
+		if roi is not None:
+			#only the region is scanned (a view of the image, no copy)
+			x0, y0 = round(roi[0]*scale), round(roi[1]*scale)
+			img = img[y0:y0+round(roi[3]*scale), x0:x0+round(roi[2]*scale)]
+			if img.size == 0:
+				return []
+
+		rects = self.cascade.detectMultiScale(img, self.scale_factor, self.min_neighbours,
+			minSize=(round(min_size[0]*scale), round(min_size[1]*scale)),
+			maxSize=(round(max_size[0]*scale), round(max_size[1]*scale)))
+
+		#rects are (x, y, w, h), turned back into positions in the frame
+		return [Detection(round((x+x0)/scale), round((y+y0)/scale), round(w/scale), round(h/scale)) for x, y, w, h in rects]
@@ -1,8 +1,10 @@
 # install opencv "pip install opencv-python"
 import cv2, math
 import numpy as np
-import os
-from djitellopy import tello
+from threats import detector
+from threats import tracker
+from threats import targets
+from threats import recorder
 #import depth_map as dm
 """
 drone = tello.Tello()
@@ -14,20 +16,79 @@ drone.streamon()
 
 
 
-import cv2, math
-from datetime import datetime
+import cv2, math, time
+from typing import NamedTuple
+from threats import kalman
+
+
+#manually measured values to calculate the focal length
+#the average of repeated measurements (reduces uncertainty)
+KNOWN_DISTANCE = 38.6
+KNOWN_WIDTH = 14
+KNOWN_IMG_WIDTH = 129
+
+
+
+class Analysis(NamedTuple):
+	"""
+	Everything found about the threat in one frame
+	(computed once per frame by Threat.analyse, it isn't changed
+	afterwards so it can be read from any thread)
+	"""
+	frame_id: int
+	detections: tuple #threats detected (see detector.Detection)
+	distance: float #distance to the threat, None if no threat is detected
+	angle: float #angle to turn towards the threat
+	yaw: float #yaw velocity command
+	ud: float #up/down velocity command
+	vz: float #forward/backward velocity command
 
 
 
 class Threat:
-	def __init__(self):
+	def __init__(self, detect_every=1, tracking="flow", min_confidence=0.5, roi_scale=3, max_misses=5, latency=0.2, max_predict=5):
 		self.threat_pos = (0, 0) #center value of threat's bounding rect
-		self.focal_length = 0 #focal length of drone's camera
+		#focal length of drone's camera (it doesn't change, so it's only calculated once)
+		self.focal_length = self.find_focal_length(KNOWN_DISTANCE, KNOWN_WIDTH, KNOWN_IMG_WIDTH)
 		self.threat_width = 0 #width of threat's bounding rect
 		self.is_threat = False
 		self.record = False
 		self.dt_string = ""
-		self.img_list = []
+		#encodes the recordings while frames arrive (keeps the 2 seconds before a threat)
+		self.recorder = recorder.Recorder()
+		self.detector = detector.Detector() #loads the model once
+		self.detections = [] #threats detected in the last frame
+		self.analysis = None #analysis of the last frame (see self.analyse)
+
+		#full detection only runs every detect_every frames, the threat is
+		#tracked in between (1 means detection runs on every frame)
+		self.detect_every = detect_every
+		self.tracker = tracker.Tracker(tracking)
+		self.min_confidence = min_confidence #threat is detected again if tracking gets less confident
+		self.since_detection = 0 #frames since the last full detection
+
+		#while a threat is followed, detection only searches a region around
+		#it (roi_scale times its width), with threats from half to twice its size
+		self.roi_scale = roi_scale
+		self.size_range = (0.5, 2)
+		self.min_roi = 80 #smallest side of the region (pixels)
+		self.max_misses = max_misses #misses in the region before searching the whole frame again
+		self.last = None #last threat detected (see detector.Detection)
+		self.misses = 0 #consecutive detections that missed the threat
+
+		#every threat in view gets an id, and only one of them is followed
+		self.targets = targets.MultiTracker()
+		self.target = None #track being followed (see targets.Track)
+
+		#the followed threat's position and distance are filtered, predicted through
+		#up to max_predict frames without a detection and extrapolated by latency
+		#(seconds between a frame being captured and the command reaching the drone)
+		self.latency = latency
+		self.max_predict = max_predict
+		self.range = None #filter over the distance to the threat (see kalman.KalmanFilter)
+		self.range_id = None #id of the track self.range is filtering
+		self.last_frame = None #time the last frame was analysed
+		self.dt = 1/30 #seconds between the last two frames
 
 
 
@@ -38,32 +99,117 @@ class Threat:
 		Creates a bounding rect to identify threat's position
 		Output: the width and position of the bounding rect
 		"""
-		#pre-trained machine learning model to detect human faces
-		cascade = cv2.CascadeClassifier("threats/resources/threat_tracking_file.xml")
-		img_gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-
 		#creates bounding rect around detected threat
-		threats = cascade.detectMultiScale(img_gray, 1.2, 8)
+		threats = self.detections = self.find_threats(img)
+		#detections are matched to the threats already seen, and
+		#the threat followed is kept until it disappears
+		now = time.monotonic()
+		if self.last_frame is not None:
+			self.dt = now - self.last_frame
+		self.last_frame = now
+
+		self.targets.update(threats, self.dt)
+		target = self.target = self.targets.follow(img.shape)
 	 
-		for (x, y, h, w) in threats:
+		for (x, y, w, h) in threats:
 			cv2.rectangle(img, (x, y), (x+w, y+h), (0, 255, 0), 2) #draw a rectangle around threat
-			#get the width and position of the threat in the camera
-			self.threat_width = w
-			self.threat_pos = ((x+x+w)//2, (y+y+h)//2)
 
 
-		if threats == (): #means no threat is detected
+		if target is None or target.misses > self.max_predict: #means no threat is detected
 			self.is_threat = False
 			self.threat_width = 0
 			self.threat_pos = (0, 0)
 		else:
+			#get the width and position of the threat followed in the camera
+			#(where it will be once the command reaches the drone)
+			x, y, w, h = target.box
+			cx, cy = target.kf.extrapolate(self.latency)
+			cv2.putText(img, str(target.id), (x, y-5), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+			self.threat_width = w
+			self.threat_pos = (min(max(int(cx), 0), img.shape[1]-1), min(max(int(cy), 0), img.shape[0]-1))
 			self.is_threat = True
+			if target.misses == 0:
+				self.last = target.box #region searched by the next detection
+
+		if self.since_detection == 1:
+			#the threat followed is tracked until the next detection
+			if self.is_threat and target.misses == 0 and self.detect_every > 1:
+				self.tracker.start(img, target.box)
+			else:
+				self.tracker.stop()
 	 
 		return self.threat_width, self.threat_pos
 
 
 
 
+	def find_threats(self, img):
+		"""
+		Tracks the threat found by the last detection while it's recent and
+		the tracker is confident, otherwise runs the detector (see self.detect)
+		Output: list of detections (see detector.Detection)
+		"""
+		if self.tracker.active and self.since_detection < self.detect_every:
+			box, confidence = self.tracker.update(img)
+			if confidence >= self.min_confidence:
+				self.since_detection += 1
+				return [box]
+
+		threats = self.detect(img)
+		self.since_detection = 1
+
+		return threats
+
+
+
+
+	def search_area(self, img):
+		"""
+		Output: (x, y, w, h) region of img around the last threat
+		detected, None if the whole frame has to be searched
+		"""
+		if self.last is None or self.misses >= self.max_misses:
+			return None
+
+		side = min(max(self.roi_scale*max(self.last.w, self.last.h), self.min_roi), max(img.shape[:2]))
+		cx, cy = self.last.centre
+		x0, y0 = max(int(cx - side/2), 0), max(int(cy - side/2), 0)
+		x1, y1 = min(int(cx + side/2), img.shape[1]), min(int(cy + side/2), img.shape[0])
+
+		return (x0, y0, x1-x0, y1-y0)
+
+
+
+
+	def detect(self, img):
+		"""
+		Runs the detector around the last threat detected, and
+		over the whole frame if it has been missed too many times
+		"""
+		roi = self.search_area(img)
+
+		if roi is None:
+			threats = self.detector.detect(img)
+		else:
+			size = max(self.last.w, self.last.h)
+			min_size = (round(size*self.size_range[0]),)*2
+			max_size = (round(size*self.size_range[1]),)*2
+			threats = self.detector.detect(img, min_size, max_size, roi)
+
+		if threats:
+			self.last = threats[-1]
+			self.misses = 0
+		elif roi is None:
+			self.last = None
+			self.misses = 0
+		else:
+			self.misses += 1
+
+		return threats
+
+
+
+
 	def find_focal_length(self, measured_distance, real_width, width_in_rf_image):
 		"""
 		Input: measured/known values of face in the real world
@@ -91,30 +237,43 @@ class Threat:
 
 	def get_distance(self, img):
 		"""
-		Focal length and distance methods are called along
-		with threat detection to get the distance to the threat
+		Threat detection is called along with the distance
+		method to get the distance to the threat
 		"""
-		#manually measured values to calculate the focal length
-		#the average of repeated measurements (reduces uncertainty)
-		known_distance = 38.6
-		known_width = 14
-		known_img_width = 129
-
 		self.threat_data(img) #detects threat
-		#calculate focal length
-		self.focal_length = self.find_focal_length(known_distance, known_width, known_img_width)
 	 
 		if self.is_threat: #if False, it means no threat is detected
-			distance = self.find_distance(known_width) #calculate distance
+			distance = self.find_distance(KNOWN_WIDTH) #calculate distance
 			#print("Distance: ", round(distance, 2))
 
-			return distance
+			return self.filter_distance(distance)
 		else:
 			return None
 
 
 
 
+	def filter_distance(self, distance):
+		"""
+		Filters the distance to the threat followed (constant velocity),
+		so detection noise doesn't turn into jittery commands
+		Output: distance expected once the command reaches the drone
+		"""
+		if self.range is None or self.range_id != self.target.id:
+			#a new threat is followed
+			self.range = kalman.KalmanFilter([distance], process_noise=2500, measurement_noise=100, velocity_noise=10000)
+			self.range_id = self.target.id
+		else:
+			self.range.predict(self.dt)
+			if self.target.misses == 0:
+				#the distance is only measured when the threat was detected
+				self.range.update([distance])
+
+		return max(float(self.range.extrapolate(self.latency)[0]), 0)
+
+
+
+
 	def vector_to_command(self, distance, angle):
 		"""
 		Break down vector representing threat into
@@ -163,22 +322,25 @@ class Threat:
 
 
 
-	def follow(self, img, min_distance, max_distance):
+	def analyse(self, img, frame_id, min_distance, max_distance):
 		"""
-		Input: lower (min_distance) and upper (max_distance) bounds
-		of accepted distance range to the threat
+		Input: frame, its id, lower (min_distance) and upper (max_distance)
+		bounds of accepted distance range to the threat
 
-		Creates vector in the z axis (vz) to follow the threat
-		by using it as a forward/backward velocity command
-
-		Gets distance and angle to map the following and keep track
-		of drone's position
+		Runs the detection, distance, vector and following commands
+		once for the frame, so every caller reading the same frame
+		(frame_id) gets the same Analysis without detecting again
+		(frames without an id are always analysed)
 		"""
+		if frame_id is not None and self.analysis is not None and self.analysis.frame_id == frame_id:
+			return self.analysis
+
 		vz = 0 #z vector
 		z_speed = 2 #multiplier to increase drone's following speed
 
 		dist = self.get_distance(img) #distance to threat
-		angle = self.cmd_to_angle(self.vector(img)[0]) #yaw command
+		yaw, ud = self.vector(img) #yaw and up/down commands
+		angle = self.cmd_to_angle(yaw)
 
 		if self.is_threat:
 			if dist < min_distance:
@@ -188,56 +350,69 @@ class Threat:
 				#move towards threat as it moves away
 				vz = (dist - max_distance)*z_speed
 
+		self.analysis = Analysis(frame_id, tuple(self.detections), dist, angle, yaw, ud, vz)
 
-		return dist, angle, vz
+		return self.analysis
 
 
 
 
-	def record_video(self, record, img):
+	def follow(self, img, min_distance, max_distance, frame_id=None):
+		"""
+		Input: lower (min_distance) and upper (max_distance) bounds
+		of accepted distance range to the threat
+
+		Creates vector in the z axis (vz) to follow the threat
+		by using it as a forward/backward velocity command
+
+		Gets distance and angle to map the following and keep track
+		of drone's position
+		"""
+		analysis = self.analyse(img, frame_id, min_distance, max_distance)
+
+		return analysis.distance, analysis.angle, analysis.vz
+
+
+
+
+	def record_video(self, record, img, video_dims=None):
 		"""
 		Records threat if one is detected
+		Frames are encoded as they arrive, the ones before the threat
+		is detected are kept for a couple of seconds (pre-roll)
+		video_dims specifies the dimensions at which
+		the video should be stored (the frame's by default)
 		"""
 
 		if record:
 
 			if not self.record:
-				#get the date and time when the threat is first detected
-				now = datetime.now()
-				#turn date and time into a string of the form:
-				#dd-mm-YY,H:M:S
-				self.dt_string = now.strftime("%d-%m-%Y,%H:%M:%S")
+				#the video is named after the date and time when the threat
+				#is first detected (dd-mm-YY,H:M:S), frames since the threat
+				#was last lost are kept, so the video stays continuous
+				self.dt_string = self.recorder.start(video_dims or (img.shape[1], img.shape[0]))
 
 				self.record = True
-			#add frame to img_list
-			self.img_list.append(img)
 
 		else:
 			self.record = False
 
+		#write frame into the video (or the pre-roll)
+		self.recorder.add(img)
 
 
 
-	def store_video(self, video_dims):
+
+	def store_video(self, video_dims=None):
 		"""
-		Stores video of threat previously captured
+		Finishes the video of threat captured
 		by the record_video method
-		video_dims specifies the dimensions at which
-		the video should be stored
+		(frames are written by the recorder's thread, so this
+		returns straight away and doesn't hold the control loop)
 		"""
-
-		os.mkdir(f"threats/recordings/{self.dt_string}")
-
-		#create video object
-		video = cv2.VideoWriter(f"threats/recordings/{self.dt_string}.avi", 0, 1, video_dims) 
-
-		#iterate through all the images captured and write them into the video object
-		for count, img in enumerate(self.img_list):
-			video.write(img)
-			cv2.imwrite(f"threats/recordings/{self.dt_string}/{count}.jpg", img)
-
-		video.release() #finish video
-		self.img_list = [] #empty img_list
+		frames = self.recorder.stop()
+		stats = self.recorder.stats()
+		print(f"Stored video {self.dt_string} ({frames} frames after the pre-roll, {stats['dropped']} dropped, encoder at {stats['encode_fps']:.0f} fps)")
 
 
 
@@ -0,0 +1,95 @@
+"""
+Constant velocity Kalman filter
+Input:
+- noisy measurements of a position (any number of dimensions),
+  e.g. the centre of a threat in the camera
+Output:
+- filtered position and velocity, which can also be predicted
+  forward in time when there are no measurements
+"""
+
+import numpy as np
+
+
+
+class KalmanFilter():
+	def __init__(self, position, process_noise=1.0, measurement_noise=1.0, velocity_noise=100.0):
+		"""
+		position --> first measurement of the position
+		process_noise --> how quickly the velocity can change (acceleration variance)
+		measurement_noise --> variance of the measurements
+		velocity_noise --> variance of the initial velocity (unknown)
+		"""
+		position = np.asarray(position, dtype=float).reshape(-1)
+		self.n = len(position) #dimensions of the position
+
+		#state holds the position followed by the velocity
+		self.x = np.concatenate((position, np.zeros(self.n)))
+		self.P = np.diag(np.concatenate((np.full(self.n, measurement_noise), np.full(self.n, velocity_noise))))
+		self.q = process_noise
+		self.R = np.eye(self.n) * measurement_noise
+		#only the position is measured
+		self.H = np.hstack((np.eye(self.n), np.zeros((self.n, self.n))))
+
+
+
+	def transition(self, dt):
+		#state transition and process noise matrices for a step of dt
+		F = np.eye(2*self.n)
+		F[:self.n, self.n:] = np.eye(self.n) * dt
+
+		#noise of a random (white) acceleration
+		Q = np.block([
+			[np.eye(self.n) * dt**4/4, np.eye(self.n) * dt**3/2],
+			[np.eye(self.n) * dt**3/2, np.eye(self.n) * dt**2],
+		]) * self.q
+
+		return F, Q
+
+
+
+	def predict(self, dt=1.0):
+		"""
+		Moves the state forward by dt (e.g. through a frame
+		where the threat wasn't detected)
+		Output: predicted position
+		"""
+		F, Q = self.transition(dt)
+		self.x = F @ self.x
+		self.P = F @ self.P @ F.T + Q
+
+		return self.position
+
+
+
+	def update(self, measurement):
+		"""
+		Corrects the state with a measurement of the position
+		Output: filtered position
+		"""
+		y = np.asarray(measurement, dtype=float).reshape(-1) - self.H @ self.x
+		S = self.H @ self.P @ self.H.T + self.R
+		K = self.P @ self.H.T @ np.linalg.inv(S)
+
+		self.x = self.x + K @ y
+		self.P = (np.eye(2*self.n) - K @ self.H) @ self.P
+
+		return self.position
+
+
+
+	def extrapolate(self, dt):
+		#position dt ahead of the current state (the state isn't changed)
+		return self.position + self.velocity * dt
+
+
+
+	@property
+	def position(self):
+		return self.x[:self.n].copy()
+
+
+
+	@property
+	def velocity(self):
+		return self.x[self.n:].copy()
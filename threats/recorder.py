@@ -0,0 +1,334 @@
+"""
+Records videos of the threats detected
+Input:
+- every frame of the drone's camera
+Output:
+- video files encoded while the frames arrive (at the rate they
+  arrive at), starting a few seconds before the threat was detected
+
+Only the last few seconds of frames are kept in memory (pre-roll),
+so memory doesn't grow with the length of the recording, and they
+are kept JPEG encoded (a 960x720 frame takes about 60 KB instead of 2 MB)
+
+Frames are encoded and written by a background thread, which also
+keeps the pre-roll, so the control loop only copies the frame into a
+bounded queue and never waits for the encoder or the disk
+(see FrameQueue for what happens when it's full)
+"""
+
+import collections, os, threading, time
+from datetime import datetime
+import cv2
+
+
+#codecs that can be used and the extension of their files
+CODECS = {
+	"mp4v": ".mp4",
+	"XVID": ".avi",
+	"MJPG": ".avi",
+}
+
+#what the queue does with a new frame when it's full
+POLICIES = {
+	"drop_oldest", #the oldest frame waiting is dropped (the video skips ahead)
+	"drop_newest", #the new frame is dropped
+	"block", #the control loop waits for space (up to a timeout), then drops the new frame
+}
+
+
+
+class FrameQueue():
+	"""
+	Bounded queue between the control loop and the writer thread
+	Only frames count towards the bound, messages starting and
+	stopping a video are never dropped
+	"""
+	def __init__(self, size=120, policy="drop_oldest", timeout=0.02):
+		self.items = collections.deque() #("frame", img), ("start", ...), ("stop",) or None
+		self.size = size #most frames waiting at once
+		self.policy = policy #one of POLICIES
+		self.timeout = timeout #longest wait (seconds) with the "block" policy
+		self.condition = threading.Condition()
+		self.frames = 0 #frames waiting
+		self.dropped = 0 #frames dropped since the queue was created
+		self.high = 0 #most frames that have been waiting at once
+
+
+
+	def put(self, item):
+		"""
+		Output: False if the item was a frame and it was dropped
+		"""
+		with self.condition:
+			frame = item is not None and item[0] == "frame"
+
+			if frame and self.frames >= self.size:
+				if self.policy == "block":
+					self.condition.wait_for(lambda: self.frames < self.size, self.timeout)
+
+				if self.policy == "drop_oldest":
+					#the oldest frame is removed (messages are kept in order)
+					for i, old in enumerate(self.items):
+						if old is not None and old[0] == "frame":
+							del self.items[i]
+							self.frames -= 1
+							break
+					self.dropped += 1
+
+				elif self.frames >= self.size:
+					self.dropped += 1
+					return False
+
+			self.items.append(item)
+			if frame:
+				self.frames += 1
+				self.high = max(self.high, self.frames)
+			self.condition.notify_all()
+
+		return True
+
+
+
+	def get(self):
+		#waits for the next item (used by the writer thread)
+		with self.condition:
+			self.condition.wait_for(lambda: self.items)
+			item = self.items.popleft()
+			if item is not None and item[0] == "frame":
+				self.frames -= 1
+			self.condition.notify_all()
+
+		return item
+
+
+
+	def __len__(self):
+		return self.frames
+
+
+
+class Recorder():
+	def __init__(self, directory="threats/recordings", codec="mp4v", fps=30, preroll=2.0, quality=90, queue_size=120, policy="drop_oldest", clock=time.monotonic):
+		self.directory = directory #where the videos are stored
+		self.codec = codec #one of CODECS
+		self.fps = fps #frame rate used until the real one has been measured
+		self.clock = clock #returns the time in seconds
+		self.preroll_time = preroll #seconds of frames kept before the recording starts
+		#frames before the recording starts (only used by the writer thread)
+		self.preroll = collections.deque()
+		self.quality = quality #JPEG quality of the frames in the pre-roll (None keeps them as they are)
+		self.frame_size = None #(width, height) of the last frame
+		self.size = None #(width, height) of the current recording
+		self.name = "" #name of the current recording (date and time it started)
+		self.frames = 0 #frames sent to the current recording
+		self.interval = None #average time between frames (seconds)
+		self.last = None #time the last frame arrived
+		self.active = False #a video is being recorded
+
+		#frames waiting to be written by the writer thread
+		self.queue = FrameQueue(queue_size, policy)
+		#encoder throughput (only changed by the writer thread)
+		self.written = 0 #frames written since the recorder was created
+		self.busy = 0.0 #seconds spent encoding and writing
+		self.started = clock()
+		#writer thread, only started once the first frame arrives (see start_writer)
+		self.thread = None
+
+
+
+	@property
+	def recording(self):
+		return self.active
+
+
+
+	def preroll_size(self):
+		#frames in the pre-roll, from the frame rate measured (the
+		#camera's rate changes with the link, so fps is only a default)
+		interval = self.interval or 1/self.fps
+
+		return max(round(self.preroll_time/interval), 1)
+
+
+
+	def start_writer(self):
+		#the writer thread is started when it's first needed (see close)
+		if self.thread is None:
+			self.thread = threading.Thread(target=self.run, daemon=True)
+			self.thread.start()
+
+
+
+	def add(self, img):
+		"""
+		Called with every frame: the frame is queued for the writer
+		thread, which writes it if a video is being recorded, otherwise
+		it's kept in the pre-roll (frames can be reused by the camera,
+		so a copy is queued, encoded by the writer thread)
+		"""
+		now = self.clock()
+		if self.last is not None:
+			#the frame rate is measured as frames arrive (moving average)
+			dt = now - self.last
+			self.interval = dt if self.interval is None else 0.9*self.interval + 0.1*dt
+		self.last = now
+		self.frame_size = (img.shape[1], img.shape[0])
+
+		self.start_writer()
+
+		if self.queue.put(("frame", img.copy())) and self.recording:
+			self.frames += 1
+
+
+
+	def start(self, size=None):
+		"""
+		Starts a new video (if there isn't one being recorded)
+		with the frames in the pre-roll
+		size --> (width, height) of the video, the size of the frames by default
+		Output: name of the video
+		"""
+		if self.recording:
+			return self.name
+
+		if size is None:
+			size = self.frame_size or (960, 720)
+
+		self.start_writer()
+
+		#the date and time the threat is first detected, of the form dd-mm-YY,H:M:S
+		self.name = datetime.now().strftime("%d-%m-%Y,%H:%M:%S")
+		fps = 1/self.interval if self.interval else self.fps
+		fps = min(max(round(fps), 1), 120) #codecs only accept sensible (whole) frame rates
+		path = os.path.join(self.directory, self.name + CODECS[self.codec])
+
+		self.size = tuple(size)
+		self.frames = 0
+		self.active = True
+		#the writer thread writes the frames in the pre-roll first
+		self.queue.put(("start", path, fps, self.size))
+
+		return self.name
+
+
+
+	def stop(self):
+		"""
+		Finishes the current video (the frames still in the
+		queue are written in the background)
+		Output: number of frames sent to the video since it started
+		(the writer thread adds the frames of the pre-roll before them)
+		"""
+		if not self.recording:
+			return 0
+
+		self.queue.put(("stop",))
+		self.active = False
+
+		return self.frames
+
+
+
+	def close(self):
+		"""
+		Finishes the current video and waits for every frame to be
+		written (the writer thread is started again by the next frame)
+		"""
+		self.stop()
+		if self.thread is not None:
+			self.queue.put(None)
+			self.thread.join()
+			self.thread = None
+
+
+
+	def keep(self, img):
+		"""
+		Keeps a frame in the pre-roll (called by the writer thread),
+		JPEG encoded since most of these frames are never written
+		"""
+		if self.quality is not None:
+			ok, img = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+			if not ok:
+				return
+
+		self.preroll.append(img)
+		while len(self.preroll) > self.preroll_size():
+			self.preroll.popleft()
+
+
+
+	def run(self):
+		"""
+		Writer thread: keeps the pre-roll, and encodes
+		and writes the frames of every video
+		"""
+		writer = None
+		size = None
+		recording = False
+
+		while True:
+			item = self.queue.get()
+			if item is None:
+				break
+
+			if item[0] == "frame" and not recording:
+				self.keep(item[1])
+				continue
+
+			t = time.perf_counter()
+			frames = []
+			if item[0] == "start":
+				_, path, fps, size = item
+				recording = True
+				os.makedirs(self.directory, exist_ok=True)
+				writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*self.codec), fps, size)
+				if not writer.isOpened():
+					print(f"Could not open {path} for recording.")
+					writer = None
+
+				#the video starts with the frames in the pre-roll
+				frames = list(self.preroll)
+				self.preroll.clear()
+
+			elif item[0] == "stop":
+				if writer is not None:
+					writer.release()
+				writer = None
+				recording = False
+
+			else:
+				frames = [item[1]]
+
+			for img in frames:
+				if writer is None:
+					break
+				if img.ndim == 1:
+					#frame from the pre-roll, encoded as JPEG
+					img = cv2.imdecode(img, cv2.IMREAD_COLOR)
+				if (img.shape[1], img.shape[0]) != size:
+					img = cv2.resize(img, size)
+				writer.write(img)
+				self.written += 1
+
+			self.busy += time.perf_counter() - t
+
+		if writer is not None:
+			writer.release()
+
+
+
+	def stats(self):
+		"""
+		Output: dictionary with the throughput of the writer thread
+		"""
+		elapsed = self.clock() - self.started
+
+		return {
+			"written": self.written,
+			"dropped": self.queue.dropped,
+			"waiting": len(self.queue),
+			"max_waiting": self.queue.high,
+			"encode_fps": self.written / self.busy if self.busy > 0 else 0.0, #rate the encoder can keep up
+			"write_fps": self.written / elapsed if elapsed > 0 else 0.0, #rate frames have been written at
+		}
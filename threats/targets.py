@@ -0,0 +1,158 @@
+"""
+Follows every threat in view, giving each one a persistent id
+Input:
+- detections of every frame (see detector.Detection)
+Output:
+- tracks with filtered positions and ids that don't change
+  between frames, and the track the drone should follow
+
+Detections are matched to the tracks by the overlap (IoU) of their
+rects, solved as an assignment problem (Hungarian algorithm)
+"""
+
+import itertools
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from threats import detector
+from threats import kalman
+
+
+
+def iou(a, b):
+	"""
+	Input: (N, 4) and (M, 4) arrays of (x, y, w, h) rects
+	Output: (N, M) array with the intersection over union of every pair
+	"""
+	a = np.asarray(a, dtype=float).reshape(-1, 4)
+	b = np.asarray(b, dtype=float).reshape(-1, 4)
+
+	x0 = np.maximum(a[:, None, 0], b[None, :, 0])
+	y0 = np.maximum(a[:, None, 1], b[None, :, 1])
+	x1 = np.minimum(a[:, None, 0] + a[:, None, 2], b[None, :, 0] + b[None, :, 2])
+	y1 = np.minimum(a[:, None, 1] + a[:, None, 3], b[None, :, 1] + b[None, :, 3])
+
+	intersection = np.clip(x1 - x0, 0, None) * np.clip(y1 - y0, 0, None)
+	union = (a[:, 2]*a[:, 3])[:, None] + (b[:, 2]*b[:, 3])[None, :] - intersection
+
+	return np.where(union > 0, intersection / np.where(union > 0, union, 1), 0)
+
+
+
+#noise of the filters over the centre of the threats, in pixels and seconds
+PROCESS_NOISE = 250000 #variance of the acceleration (about 500 px/s^2)
+MEASUREMENT_NOISE = 100 #variance of the detections (about 10 px)
+VELOCITY_NOISE = 10000 #variance of the initial velocity (about 100 px/s)
+
+
+
+class Track():
+	def __init__(self, id_, box):
+		self.id = id_
+		x, y, w, h = box
+		#the centre of the rect is filtered, its size is smoothed
+		self.kf = kalman.KalmanFilter((x + w/2, y + h/2), PROCESS_NOISE, MEASUREMENT_NOISE, VELOCITY_NOISE)
+		self.size = np.array([w, h], dtype=float)
+		self.hits = 1 #frames the track has been detected in
+		self.misses = 0 #consecutive frames it wasn't detected
+
+
+
+	@property
+	def box(self):
+		#filtered (x, y, w, h) rect of the track
+		(cx, cy), (w, h) = self.kf.position, self.size
+		return detector.Detection(round(cx - w/2), round(cy - h/2), round(w), round(h))
+
+
+
+	def predict(self, dt):
+		self.kf.predict(dt)
+
+
+
+	def update(self, box):
+		x, y, w, h = box
+		self.kf.update((x + w/2, y + h/2))
+		self.size = 0.7*self.size + 0.3*np.array([w, h])
+		self.hits += 1
+		self.misses = 0
+
+
+
+class MultiTracker():
+	def __init__(self, min_iou=0.2, min_hits=2, max_misses=10):
+		self.min_iou = min_iou #smallest overlap for a detection to be matched to a track
+		self.min_hits = min_hits #detections before a track is confirmed (filters false detections)
+		self.max_misses = max_misses #frames a track is kept without being detected
+		self.tracks = [] #tracks being followed
+		self.ids = itertools.count() #ids given to new tracks
+		self.target = None #id of the track the drone is following
+
+
+
+	def update(self, detections, dt=1/30):
+		"""
+		Input: detections of a frame and time since the last frame (in seconds)
+		Output: confirmed tracks
+		"""
+		for track in self.tracks:
+			track.predict(dt)
+
+		matched = set()
+		if self.tracks and detections:
+			overlap = iou([t.box for t in self.tracks], detections)
+			rows, cols = linear_sum_assignment(-overlap)
+
+			for r, c in zip(rows, cols):
+				if overlap[r, c] >= self.min_iou:
+					self.tracks[r].update(detections[c])
+					matched.add(r)
+
+			new = set(range(len(detections))) - {c for r, c in zip(rows, cols) if r in matched}
+		else:
+			new = set(range(len(detections)))
+
+		for i, track in enumerate(self.tracks):
+			if i not in matched:
+				track.misses += 1
+
+		#tracks lost for too long are removed, unmatched detections start new ones
+		self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+		for i in sorted(new):
+			self.tracks.append(Track(next(self.ids), detections[i]))
+
+		return self.confirmed()
+
+
+
+	def confirmed(self):
+		return [t for t in self.tracks if t.hits >= self.min_hits]
+
+
+
+	def follow(self, shape):
+		"""
+		Input: shape of the frame
+		Output: track the drone should follow (None if there isn't one)
+
+		The same track is followed while it exists, so the drone doesn't
+		jump between threats. Otherwise the largest (closest) threat
+		currently detected is chosen, the one nearest to the centre of
+		the frame if they have the same size
+		"""
+		tracks = self.confirmed()
+
+		for track in tracks:
+			if track.id == self.target:
+				return track
+
+		visible = [t for t in tracks if t.misses == 0]
+		if not visible:
+			self.target = None
+			return None
+
+		centre = np.array([shape[1]/2, shape[0]/2])
+		track = max(visible, key=lambda t: (t.size.prod(), -np.linalg.norm(t.kf.position - centre)))
+		self.target = track.id
+
+		return track
@@ -0,0 +1,173 @@
+"""
+Tracks a threat between detections
+Input:
+- bounding rect of a threat found by the detector (see detector.Detection)
+- the following frames from the drone's camera
+Output:
+- bounding rect of the threat in every frame and how confident
+  the tracker is about it (so the threat can be detected again)
+
+Tracking a rect from one frame to the next is much cheaper than a
+full detection, so detection only has to run every few frames
+"""
+
+import cv2
+import numpy as np
+from threats import detector
+
+
+#OpenCV trackers that can be used instead of optical flow
+#(only available with opencv-contrib-python)
+TRACKERS = {
+	"kcf": "TrackerKCF_create",
+	"csrt": "TrackerCSRT_create",
+	"mosse": "TrackerMOSSE_create",
+}
+
+
+
+def create(method):
+	"""
+	Input: name of an OpenCV tracker (one of TRACKERS)
+	Output: tracker object, None if this OpenCV build doesn't have it
+	"""
+	for module in (cv2, getattr(cv2, "legacy", None)):
+		if hasattr(module, TRACKERS[method]):
+			return getattr(module, TRACKERS[method])()
+
+	return None
+
+
+
+class Tracker():
+	def __init__(self, method="flow", points=50, max_error=1.0):
+		"""
+		method --> "flow" (Lucas-Kanade optical flow of points inside
+		the rect) or an OpenCV tracker (one of TRACKERS)
+		"""
+		if method != "flow" and create(method) is None:
+			print(f"Tracker {method} isn't available, using optical flow.")
+			method = "flow"
+
+		self.method = method
+		self.points = points #points followed inside the rect (optical flow)
+		self.max_error = max_error #pixels a point can drift when tracked back to the previous frame
+		self.active = False #a threat is being tracked
+		self.box = None #(x, y, w, h) of the threat
+		self.tracker = None #OpenCV tracker object
+
+		self.gray = None #grayscale frames (previous and current), reused every frame
+		self.prev = None
+		self.features = None #points followed by optical flow
+
+
+
+	def to_gray(self, frame):
+		#converts frame into the buffer not holding the previous frame
+		if self.gray is None or self.gray.shape != frame.shape[:2]:
+			self.gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+		else:
+			cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self.gray)
+
+		return self.gray
+
+
+
+	def find_features(self, gray, box):
+		#corners inside the rect that can be followed by optical flow
+		x, y, w, h = box
+		features = cv2.goodFeaturesToTrack(gray[y:y+h, x:x+w], self.points, 0.01, 3)
+		if features is None:
+			return None
+
+		return features + np.array([x, y], np.float32)
+
+
+
+	def start(self, frame, box):
+		"""
+		Starts tracking the rect box (x, y, w, h) in frame
+		"""
+		box = detector.Detection(*(int(i) for i in box))
+		self.box = box
+		self.active = False
+
+		if self.method != "flow":
+			self.tracker = create(self.method)
+			self.tracker.init(frame, box)
+			self.active = True
+			return
+
+		gray = self.to_gray(frame)
+		self.features = self.find_features(gray, box)
+		if self.features is not None and len(self.features) >= 4:
+			self.active = True
+			#the current buffer becomes the previous frame
+			self.prev, self.gray = gray, self.prev
+
+
+
+	def stop(self):
+		self.active = False
+		self.tracker = None
+		self.features = None
+
+
+
+	def update(self, frame):
+		"""
+		Moves the rect to the threat's position in frame
+		Output: (x, y, w, h) rect and the confidence of the tracker
+		(between 0 and 1, 0 means the threat was lost)
+		"""
+		if not self.active or (self.method == "flow" and self.prev.shape != frame.shape[:2]):
+			return self.box, 0.0
+
+		if self.method != "flow":
+			ok, box = self.tracker.update(frame)
+			if ok:
+				self.box = detector.Detection(*(int(i) for i in box))
+			return self.box, 1.0 if ok else 0.0
+
+		gray = self.to_gray(frame)
+		p0 = self.features
+		p1, status, _ = cv2.calcOpticalFlowPyrLK(self.prev, gray, p0, None)
+		#points are tracked back to the previous frame, the ones
+		#that don't return to where they were are discarded
+		back, status_back, _ = cv2.calcOpticalFlowPyrLK(gray, self.prev, p1, None)
+		error = np.linalg.norm((p0 - back).reshape(-1, 2), axis=1)
+		good = (status.ravel() == 1) & (status_back.ravel() == 1) & (error < self.max_error)
+
+		confidence = good.sum() / len(p0)
+		if good.sum() < 4:
+			self.stop()
+			return self.box, 0.0
+
+		p0, p1 = p0.reshape(-1, 2)[good], p1.reshape(-1, 2)[good]
+		#the rect moves with the median motion of the points, and its
+		#size changes with the median change of the distance between them
+		dx, dy = np.median(p1 - p0, axis=0)
+		d0 = np.linalg.norm(p0[:, None] - p0[None], axis=2)
+		d1 = np.linalg.norm(p1[:, None] - p1[None], axis=2)
+		pairs = d0 > 0
+		scale = float(np.median(d1[pairs] / d0[pairs])) if pairs.any() else 1.0
+
+		x, y, w, h = self.box
+		cx, cy = x + w/2 + dx, y + h/2 + dy
+		w, h = w*scale, h*scale
+		self.box = detector.Detection(round(cx - w/2), round(cy - h/2), round(w), round(h))
+
+		self.features = p1.reshape(-1, 1, 2)
+		if len(p1) < self.points // 2:
+			#new points are found once too many have been lost
+			frame_h, frame_w = gray.shape
+			x0, y0 = max(self.box.x, 0), max(self.box.y, 0)
+			box = (x0, y0, min(self.box.x+self.box.w, frame_w) - x0, min(self.box.y+self.box.h, frame_h) - y0)
+			if box[2] > 0 and box[3] > 0:
+				features = self.find_features(gray, box)
+				if features is not None and len(features) >= 4:
+					self.features = features
+
+		self.prev, self.gray = gray, self.prev
+
+		return self.box, confidence